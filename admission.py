@@ -0,0 +1,56 @@
+"""
+Admission control for the decision API.
+
+AdmissionMiddleware counts the requests in flight on the guarded paths from the
+moment they reach the app, so body reads and validation waiting on a busy event
+loop are counted too. The endpoint asks `check(t0)` before doing any work. If too
+many requests are in flight, or this one has already used up its latency budget,
+the endpoint answers with its fallback instead of joining the queue.
+"""
+from time import perf_counter
+from typing import Iterable, Optional
+
+SHED_OVERLOAD = "overload"
+SHED_DEADLINE = "deadline"
+FALLBACKS = ("review", "rules")
+
+
+class AdmissionController:
+    def __init__(self, max_inflight: int = 0, deadline: float = 0.0, fallback: str = "review"):
+        # max_inflight / deadline of 0 disable that check
+        if fallback not in FALLBACKS:
+            raise ValueError(f"fallback must be one of {FALLBACKS}, got {fallback!r}")
+        self.max_inflight = max_inflight
+        self.deadline = deadline
+        self.fallback = fallback
+        self.inflight = 0  # only touched from the event loop
+
+    def check(self, t0: Optional[float]) -> Optional[str]:
+        """Shed reason for a request that started at perf_counter() time t0, or None to admit it."""
+        if self.max_inflight and self.inflight > self.max_inflight:
+            return SHED_OVERLOAD
+        if self.deadline and t0 is not None and perf_counter() - t0 >= self.deadline:
+            return SHED_DEADLINE
+        return None
+
+    def remaining(self, t0: Optional[float]) -> Optional[float]:
+        # Seconds left in the request's budget, None if there is no deadline
+        if not self.deadline or t0 is None:
+            return None
+        return max(self.deadline - (perf_counter() - t0), 0.0)
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController, paths: Iterable[str]):
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+        self.controller.inflight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.inflight -= 1
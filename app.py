@@ -1,8 +1,13 @@
-import os, sys
-from typing import Optional, Literal
-from fastapi import FastAPI
-from pydantic import BaseModel, Field
-import pandas as pd
+import asyncio, os, sys
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import Dict, Optional, Literal, AsyncIterator, List, Tuple
+import orjson
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
 # Ensure local imports work when running from different CWDs
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -10,30 +15,221 @@ if CURRENT_DIR not in sys.path:
     sys.path.append(CURRENT_DIR)
 
 import decision_engine as de  # our previously generated rules engine
+from config_store import ConfigStore
+from decision_cache import DecisionCache
+import metrics
+from velocity_store import VelocityStore
+from bin_table import BinTable
+from ip_index import IpIndex
+from decision_log import DecisionLogWriter
+from microbatch import MicroBatcher
+from admission import AdmissionController, AdmissionMiddleware, SHED_DEADLINE
 
-app = FastAPI(title="CNP Decision Service", version="1.0.0", description="Rules-based decisioning for card-not-present transactions")
+# Active config + precompiled rule plan. DECISION_CONFIG_FILE (JSON) replaces the
+# defaults and can be re-read at runtime through POST /admin/config/reload.
+CONFIG_FILE = os.getenv("DECISION_CONFIG_FILE")
+STORE = ConfigStore.from_file(CONFIG_FILE) if CONFIG_FILE else ConfigStore(de.DEFAULT_CONFIG)
+
+# Admin endpoints only answer to these client addresses
+ADMIN_ALLOWED_HOSTS = {h.strip() for h in os.getenv("ADMIN_ALLOWED_HOSTS", "127.0.0.1,::1").split(",") if h.strip()}
+
+# Optional LRU memoization of decisions; DECISION_CACHE_SIZE=0 disables it
+_cache_size = int(os.getenv("DECISION_CACHE_SIZE", "0"))
+CACHE: Optional[DecisionCache] = DecisionCache(_cache_size) if _cache_size > 0 else None
+
+# Server-side velocity counters (VELOCITY_STORE=1). With VELOCITY_SNAPSHOT set they
+# are restored from that file at startup and written back on shutdown.
+VELOCITY_SNAPSHOT = os.getenv("VELOCITY_SNAPSHOT")
+VELOCITY: Optional[VelocityStore] = None
+if os.getenv("VELOCITY_STORE", "0") == "1" or VELOCITY_SNAPSHOT:
+    _max_keys = int(os.getenv("VELOCITY_MAX_KEYS", "200000"))
+    if VELOCITY_SNAPSHOT and os.path.exists(VELOCITY_SNAPSHOT):
+        VELOCITY = VelocityStore.load(VELOCITY_SNAPSHOT, max_keys=_max_keys)
+    else:
+        VELOCITY = VelocityStore(max_keys=_max_keys)
+
+# Lookup tables that fill in input fields before scoring. BIN_TABLE_FILE (built with
+# `python bin_table.py build`) resolves bin_country from card_bin, and IP_INDEX_FILE
+# (`python ip_index.py build`) ip_country and ip_risk from ip_address.
+ENRICHERS: List = []
+if os.getenv("BIN_TABLE_FILE"):
+    ENRICHERS.append(BinTable(os.environ["BIN_TABLE_FILE"]))
+if os.getenv("IP_INDEX_FILE"):
+    ENRICHERS.append(IpIndex(os.environ["IP_INDEX_FILE"]))
+
+# Asynchronous decision log (DECISION_LOG_DIR); the writer thread runs between startup and shutdown
+DECISION_LOG: Optional[DecisionLogWriter] = None
+if os.getenv("DECISION_LOG_DIR"):
+    DECISION_LOG = DecisionLogWriter(os.environ["DECISION_LOG_DIR"],
+                                     max_queue=int(os.getenv("DECISION_LOG_MAX_QUEUE", "100000")),
+                                     policy=os.getenv("DECISION_LOG_POLICY", "drop"))
+
+# Shadow (challenger) configs, SHADOW_CONFIGS="name=path.json,...". They score each
+# /transaction in a background task after the champion response has been sent.
+SHADOW_PLANS: Dict[str, de.RulePlan] = {}
+for _spec in filter(None, (s.strip() for s in os.getenv("SHADOW_CONFIGS", "").split(","))):
+    _name, _cfg = de.load_challenger(_spec)
+    SHADOW_PLANS[_name] = de.compile_config(_cfg)
+
+# Adaptive micro-batching of concurrent /transaction calls (MICROBATCH=1). Batches of
+# at least MICROBATCH_VECTOR_MIN rows are scored with the vectorized engine.
+MICROBATCH_VECTOR_MIN = int(os.getenv("MICROBATCH_VECTOR_MIN", "128"))
+
+def _score_micro_batch(rows: list) -> List[Tuple[dict, int]]:
+    active = STORE.active
+    if len(rows) >= MICROBATCH_VECTOR_MIN:
+        scored = de.assess_records([r if isinstance(r, dict) else r.model_dump() for r in rows], active.config)
+        results = [{"decision": d, "risk_score": int(s), "reasons": r} for d, s, r in
+                   zip(scored["decision"].tolist(), scored["risk_score"].tolist(), scored["reasons"].tolist())]
+    else:
+        score = CACHE.score if CACHE is not None else de.assess_txn
+        results = [score(row, active.plan) for row in rows]
+    return [(res, active.version) for res in results]
+
+MICROBATCH: Optional[MicroBatcher] = None
+if os.getenv("MICROBATCH", "0") == "1":
+    MICROBATCH = MicroBatcher(_score_micro_batch, max_batch=int(os.getenv("MICROBATCH_MAX_SIZE", "256")),
+                              max_wait=float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2")) / 1000,
+                              offload_min=MICROBATCH_VECTOR_MIN)
+
+# Admission control for /transaction. Past ADMISSION_MAX_INFLIGHT requests in flight,
+# or ADMISSION_DEADLINE_MS after a request arrived, it gets the ADMISSION_FALLBACK
+# answer right away: "review" (IN_REVIEW, reasons shed:<why>) or "rules" (plain rules
+# on the raw transaction, without velocity, cache, micro-batching or shadows).
+ADMISSION: Optional[AdmissionController] = None
+_max_inflight = int(os.getenv("ADMISSION_MAX_INFLIGHT", "0"))
+_deadline_ms = float(os.getenv("ADMISSION_DEADLINE_MS", "0"))
+if _max_inflight > 0 or _deadline_ms > 0:
+    ADMISSION = AdmissionController(_max_inflight, _deadline_ms / 1000,
+                                    fallback=os.getenv("ADMISSION_FALLBACK", "review"))
+
+# Rows scored per vectorized pass on /transactions/batch
+BATCH_CHUNK_ROWS = int(os.getenv("BATCH_CHUNK_ROWS", "1000"))
+
+@asynccontextmanager
+async def lifespan(app):
+    if DECISION_LOG is not None:
+        DECISION_LOG.start()
+    yield
+    if DECISION_LOG is not None:
+        DECISION_LOG.stop()
+    if VELOCITY is not None and VELOCITY_SNAPSHOT:
+        VELOCITY.snapshot(VELOCITY_SNAPSHOT)
+
+app = FastAPI(title="CNP Decision Service", version="1.0.0", description="Rules-based decisioning for card-not-present transactions",
+              default_response_class=ORJSONResponse, lifespan=lifespan)
+
+# --- Metrics ---
+REQUEST_SECONDS = metrics.REGISTRY.histogram(
+    "decision_http_request_duration_seconds", "HTTP request latency by route", ["path"])
+STAGE_SECONDS = metrics.REGISTRY.histogram(
+    "decision_request_stage_seconds", "POST /transaction latency by stage (validate covers body read and Pydantic)", ["stage"])
+DECISIONS = metrics.REGISTRY.counter("decision_decisions_total", "Decisions returned by outcome", ["endpoint", "decision"])
+RULES_FIRED = metrics.REGISTRY.counter("decision_rule_fired_total", "Decisions each rule contributed to", ["rule"])
+SHADOW_DECISIONS = metrics.REGISTRY.counter(
+    "decision_shadow_decisions_total", "Shadow config decisions by champion decision", ["config", "champion", "decision"])
+SHED = metrics.REGISTRY.counter(
+    "decision_shed_total", "POST /transaction requests answered by the admission fallback", ["reason", "fallback"])
+BATCH_ROWS = metrics.REGISTRY.counter("decision_batch_rows_total", "Rows scored through /transactions/batch")
+BATCH_ROWS_PER_SEC = metrics.REGISTRY.gauge(
+    "decision_batch_rows_per_second", "Scoring throughput of the most recent /transactions/batch chunk")
+
+# Children are resolved once so the hot path only does a locked increment
+_STAGE_VALIDATE, _STAGE_SCORE, _STAGE_SERIALIZE = (STAGE_SECONDS.labels(stage=s) for s in ("validate", "score", "serialize"))
+_RULE_COUNTERS = {name: RULES_FIRED.labels(rule=name) for name in de.RULE_NAMES}
+_DECISION_COUNTERS = {(endpoint, d): DECISIONS.labels(endpoint=endpoint, decision=d)
+                      for endpoint in ("transaction", "batch")
+                      for d in (de.DECISION_ACCEPTED, de.DECISION_IN_REVIEW, de.DECISION_REJECTED)}
+
+def _count_decision(endpoint: str, decision: str, reasons: str) -> None:
+    _DECISION_COUNTERS[(endpoint, decision)].inc()
+    for name in de.fired_rules(reasons):
+        counter = _RULE_COUNTERS.get(name)
+        if counter is not None:
+            counter.inc()
+
+def _count_masks(endpoint: str, decisions, masks) -> None:
+    # Batch variant: rules are read from reason_mask bits instead of parsing reasons
+    for decision, n in decisions.value_counts().items():
+        _DECISION_COUNTERS[(endpoint, decision)].inc(int(n))
+    for name, bit in de.RULE_BITS.items():
+        fired = int(((masks & bit) != 0).sum())
+        if fired:
+            _RULE_COUNTERS[name].inc(fired)
+
+def _service_gauges():
+    active = STORE.active
+    yield "decision_config_version", "gauge", "Version of the active scoring config", [({}, active.version)]
+    if VELOCITY is not None:
+        stats = VELOCITY.stats()
+        yield ("decision_velocity_keys", "gauge", "Keys tracked by the velocity store",
+               [({"dimension": d}, n) for d, n in stats["keys"].items()])
+        yield "decision_velocity_evictions_total", "counter", "Velocity keys evicted", [({}, stats["evictions"])]
+    if ADMISSION is not None:
+        yield "decision_inflight_requests", "gauge", "POST /transaction requests in flight", [({}, ADMISSION.inflight)]
+    if CACHE is not None:
+        stats = CACHE.stats()
+        yield "decision_cache_entries", "gauge", "Entries in the decision cache", [({}, stats["size"])]
+        for key in ("hits", "misses", "evictions", "invalidations"):
+            yield f"decision_cache_{key}_total", "counter", f"Decision cache {key}", [({}, stats[key])]
+
+metrics.REGISTRY.register_collector(_service_gauges)
+
+class _RequestTimer:
+    # Pure ASGI middleware: stamps the request start for stage timing and records
+    # total latency per route once the response has been sent
+    def __init__(self, app):
+        self.app = app
+        self._children = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = scope["decision.t0"] = perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            path = scope["path"] if scope["path"] in _ROUTE_PATHS else "other"
+            child = self._children.get(path)
+            if child is None:
+                child = self._children[path] = REQUEST_SECONDS.labels(path=path)
+            child.observe(perf_counter() - start)
+
+app.add_middleware(_RequestTimer)
+if ADMISSION is not None:
+    app.add_middleware(AdmissionMiddleware, controller=ADMISSION, paths={"/transaction"})
 
 # --- Request schema ---
 RiskStr = Literal["low", "medium", "high", "new_domain"]
 Reputation = Literal["trusted", "recurrent", "new", "high_risk"]
 ProductType = Literal["digital", "physical", "subscription"]
 
+_DEFAULTS = de.TRANSACTION_DEFAULTS  # shared with socket_server
+
 class Transaction(BaseModel):
-    transaction_id: Optional[int] = Field(None, description="Your own ID to track the decision")
-    amount_mxn: float = 0.0
-    customer_txn_30d: int = 0
-    geo_state: Optional[str] = None
-    device_type: Optional[str] = None
-    chargeback_count: int = 0
-    hour: int = 12
-    product_type: ProductType = "digital"
-    latency_ms: int = 0
-    user_reputation: Reputation = "new"
-    device_fingerprint_risk: RiskStr = "low"
-    ip_risk: RiskStr = "low"
-    email_risk: RiskStr = "low"
-    bin_country: Optional[str] = "MX"
-    ip_country: Optional[str] = "MX"
+    transaction_id: Optional[int] = Field(_DEFAULTS["transaction_id"], description="Your own ID to track the decision")
+    amount_mxn: float = _DEFAULTS["amount_mxn"]
+    customer_txn_30d: int = _DEFAULTS["customer_txn_30d"]
+    geo_state: Optional[str] = _DEFAULTS["geo_state"]
+    device_type: Optional[str] = _DEFAULTS["device_type"]
+    chargeback_count: int = _DEFAULTS["chargeback_count"]
+    hour: int = _DEFAULTS["hour"]
+    product_type: ProductType = _DEFAULTS["product_type"]
+    latency_ms: int = _DEFAULTS["latency_ms"]
+    user_reputation: Reputation = _DEFAULTS["user_reputation"]
+    device_fingerprint_risk: RiskStr = _DEFAULTS["device_fingerprint_risk"]
+    ip_risk: RiskStr = _DEFAULTS["ip_risk"]
+    email_risk: RiskStr = _DEFAULTS["email_risk"]
+    bin_country: Optional[str] = _DEFAULTS["bin_country"]
+    ip_country: Optional[str] = _DEFAULTS["ip_country"]
+    # Keys for the server-side velocity counters (all optional)
+    customer_id: Optional[str] = _DEFAULTS["customer_id"]
+    card_bin: Optional[str] = _DEFAULTS["card_bin"]
+    ip_address: Optional[str] = _DEFAULTS["ip_address"]
+    device_id: Optional[str] = _DEFAULTS["device_id"]
+
+class Chargeback(BaseModel):
+    customer_id: str
 
 class DecisionResponse(BaseModel):
     transaction_id: Optional[int]
@@ -47,17 +243,234 @@ def health():
 
 @app.get("/config")
 def get_config():
-    # Expose current thresholds for transparency
-    return de.DEFAULT_CONFIG
+    # Expose current thresholds for transparency, with the active version
+    return STORE.active.describe()
+
+def _require_local(request: Request) -> None:
+    if request.client is None or request.client.host not in ADMIN_ALLOWED_HOSTS:
+        raise HTTPException(status_code=403, detail="Admin endpoints are only available locally")
+
+def _publish(load, *args):
+    try:
+        active = load(*args)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"version": active.version, "loaded_at": active.describe()["loaded_at"], "source": active.source}
+
+@app.put("/admin/config")
+def replace_config(config: dict, request: Request):
+    # Sync def: validation and compilation run in the threadpool, off the event loop
+    _require_local(request)
+    return _publish(STORE.load, config, "api")
+
+@app.post("/admin/config/reload")
+def reload_config(request: Request):
+    _require_local(request)
+    if not CONFIG_FILE:
+        raise HTTPException(status_code=409, detail="DECISION_CONFIG_FILE is not set")
+    return _publish(STORE.load_file, CONFIG_FILE)
+
+@app.get("/cache")
+def cache_stats():
+    # Hit/miss/eviction counters of the decision cache, if enabled
+    if CACHE is None:
+        return {"enabled": False}
+    return {"enabled": True, **CACHE.stats()}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.post("/velocity/chargeback")
+def record_chargeback(chargeback: Chargeback):
+    # Feeds chargeback_count for later transactions of this customer
+    if VELOCITY is None:
+        raise HTTPException(status_code=409, detail="Velocity store is disabled (set VELOCITY_STORE=1)")
+    VELOCITY.record_chargeback(chargeback.customer_id)
+    return {"customer_id": chargeback.customer_id,
+            "chargeback_count": VELOCITY.count("customer_chargeback", chargeback.customer_id)}
 
 @app.post("/transaction", response_model=DecisionResponse)
-def evaluate_transaction(txn: Transaction):
-    # Convert the validated model to a pandas Series and score with our engine
-    row = pd.Series(txn.model_dump())
-    res = de.assess_row(row, de.DEFAULT_CONFIG)
-    return {
+async def evaluate_transaction(txn: Transaction, request: Request):
+    # Scoring is a few microseconds of pure CPU, so it runs on the event loop instead
+    # of the threadpool. With MICROBATCH=1 it is batched with concurrent calls.
+    # Returning the response directly skips re-validating it against
+    # DecisionResponse, which is kept for the OpenAPI schema.
+    t_validated = perf_counter()
+    t0 = request.scope.get("decision.t0")
+    if ADMISSION is not None:
+        shed = ADMISSION.check(t0)
+        if shed is not None:
+            return await _shed_response(txn, shed)
+    row = txn
+    if ENRICHERS or VELOCITY is not None:
+        row = txn.model_dump()
+        for enricher in ENRICHERS:
+            enricher.enrich(row)
+    if VELOCITY is not None:
+        VELOCITY.record(VELOCITY.enrich(row))
+    if MICROBATCH is not None:
+        budget = ADMISSION.remaining(t0) if ADMISSION is not None else None
+        try:
+            if budget is None:
+                res, version = await MICROBATCH.submit(row)
+            else:
+                res, version = await asyncio.wait_for(MICROBATCH.submit(row), budget)
+        except asyncio.TimeoutError:
+            return await _shed_response(txn, SHED_DEADLINE)
+    else:
+        active = STORE.active
+        version = active.version
+        res = CACHE.score(row, active.plan) if CACHE is not None else de.assess_txn(row, active.plan)
+    t_scored = perf_counter()
+    response = ORJSONResponse({
         "transaction_id": txn.transaction_id,
         "decision": res["decision"],
-        "risk_score": int(res["risk_score"]),
-        "reasons": res.get("reasons", ""),
-    }
+        "risk_score": res["risk_score"],
+        "reasons": res["reasons"],
+    })
+    t_done = perf_counter()
+    if t0 is not None:
+        _STAGE_VALIDATE.observe(t_validated - t0)
+    _STAGE_SCORE.observe(t_scored - t_validated)
+    _STAGE_SERIALIZE.observe(t_done - t_scored)
+    _count_decision("transaction", res["decision"], res["reasons"])
+    if SHADOW_PLANS:
+        response.background = BackgroundTask(_shadow_score, row, res["decision"])
+    if DECISION_LOG is not None:
+        await DECISION_LOG.log_async(txn.transaction_id, res["decision"], res["risk_score"], res["reasons"], version)
+    return response
+
+async def _shed_response(txn: Transaction, reason: str) -> ORJSONResponse:
+    SHED.labels(reason=reason, fallback=ADMISSION.fallback).inc()
+    active = STORE.active
+    if ADMISSION.fallback == "rules":
+        res = de.assess_txn(txn, active.plan)
+    else:
+        res = {"decision": de.DECISION_IN_REVIEW, "risk_score": 0, "reasons": f"shed:{reason}"}
+    _count_decision("transaction", res["decision"], res["reasons"])
+    if DECISION_LOG is not None:
+        await DECISION_LOG.log_async(txn.transaction_id, res["decision"], res["risk_score"], res["reasons"],
+                                     active.version)
+    return ORJSONResponse({"transaction_id": txn.transaction_id, "decision": res["decision"],
+                           "risk_score": res["risk_score"], "reasons": res["reasons"]},
+                          headers={"X-Decision-Shed": reason})
+
+def _shadow_score(row, champion: str) -> None:
+    for name, plan in SHADOW_PLANS.items():
+        SHADOW_DECISIONS.labels(config=name, champion=champion, decision=de.assess_txn(row, plan)["decision"]).inc()
+
+
+# --- Batch scoring ---
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+class _DuplexStreamingResponse(StreamingResponse):
+    # The request body is still being read while we respond, so the stock
+    # disconnect listener must not compete with request.stream() for messages.
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+async def _ndjson_items(request: Request) -> AsyncIterator[object]:
+    # Yield one parsed object per non-empty line as the body streams in
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if pending.strip():
+        yield _parse_line(pending)
+
+def _parse_line(line: bytes) -> object:
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError as e:
+        return e
+
+async def _read_array(request: Request) -> list:
+    body = await request.body()
+    try:
+        items = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Body is not valid JSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=422, detail="Expected a JSON array of transactions")
+    return items
+
+async def _array_items(items: list) -> AsyncIterator[object]:
+    for item in items:
+        yield item
+
+def _score_chunk(chunk: List[Tuple[int, object]], active) -> bytes:
+    # Invalid rows become error lines; valid ones are scored in one vectorized pass
+    lines: List[Optional[dict]] = []
+    valid: List[Transaction] = []
+    for index, item in chunk:
+        try:
+            if isinstance(item, Exception):
+                raise item
+            valid.append(Transaction.model_validate(item))
+            lines.append(None)
+        except (ValidationError, ValueError) as e:
+            errors = e.errors(include_url=False) if isinstance(e, ValidationError) else [{"msg": str(e)}]
+            lines.append({"index": index, "errors": errors})
+    if valid:
+        start = perf_counter()
+        records = [t.model_dump() for t in valid]
+        for enricher in ENRICHERS:
+            for record in records:
+                enricher.enrich(record)
+        if VELOCITY is not None:
+            # Sequential on purpose: each row sees the rows before it
+            for record in records:
+                VELOCITY.record(VELOCITY.enrich(record))
+        scored = de.assess_records(records, active.config, reasons="both")
+        _count_masks("batch", scored["decision"], scored["reason_mask"])
+        BATCH_ROWS.inc(len(valid))
+        BATCH_ROWS_PER_SEC.set(len(valid) / max(perf_counter() - start, 1e-9))
+        results = iter(zip(valid, scored["decision"], scored["risk_score"], scored["reasons"]))
+        for i, line in enumerate(lines):
+            if line is None:
+                txn, decision, risk_score, reasons = next(results)
+                lines[i] = {"transaction_id": txn.transaction_id, "decision": decision,
+                            "risk_score": int(risk_score), "reasons": reasons}
+                if DECISION_LOG is not None:
+                    DECISION_LOG.log(txn.transaction_id, decision, int(risk_score), reasons, active.version)
+    return b"".join(orjson.dumps(line, default=str, option=orjson.OPT_APPEND_NEWLINE) for line in lines)
+
+async def _stream_decisions(items: AsyncIterator[object], active) -> AsyncIterator[bytes]:
+    chunk: List[Tuple[int, object]] = []
+    index = 0
+    async for item in items:
+        chunk.append((index, item))
+        index += 1
+        if len(chunk) >= BATCH_CHUNK_ROWS:
+            yield await run_in_threadpool(_score_chunk, chunk, active)
+            chunk = []
+    if chunk:
+        yield await run_in_threadpool(_score_chunk, chunk, active)
+
+@app.post("/transactions/batch", responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}})
+async def evaluate_batch(request: Request):
+    """Score a JSON array or an NDJSON stream of transactions.
+
+    Responds with one NDJSON line per input, in input order: a DecisionResponse,
+    or {"index": i, "errors": [...]} for rows that failed validation.
+    """
+    # The whole batch is scored with the config that was active when it arrived
+    active = STORE.active
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        items = _ndjson_items(request)
+    else:
+        # Arrays are parsed up front so a malformed body still gets a 4xx status
+        items = _array_items(await _read_array(request))
+    return _DuplexStreamingResponse(_stream_decisions(items, active), media_type=NDJSON_MEDIA_TYPE)
+
+
+# Routes known at import time; anything else is labelled "other" in metrics
+_ROUTE_PATHS = frozenset(getattr(r, "path", None) for r in app.routes)
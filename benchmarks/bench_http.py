@@ -0,0 +1,133 @@
+"""
+Concurrent latency benchmark for POST /transaction.
+
+Compares the current endpoint (async, orjson, no response re-validation) with the
+previous implementation (sync def in the threadpool, pd.Series + assess_row,
+response_model validation), both in-process over ASGI:
+
+    python benchmarks/bench_http.py --requests 5000 --concurrency 64
+
+Pass --url to measure a running server instead (only the "current" variant).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+EXAMPLE = os.path.join(ROOT, "example_request.json")
+
+
+def legacy_app():
+    # The request path as it was before the async/orjson rewrite
+    import pandas as pd
+    from fastapi import FastAPI
+    import decision_engine as de
+    from app import Transaction, DecisionResponse
+
+    legacy = FastAPI()
+
+    @legacy.post("/transaction", response_model=DecisionResponse)
+    def evaluate_transaction(txn: Transaction):
+        row = pd.Series(txn.model_dump())
+        res = de.assess_row(row, de.DEFAULT_CONFIG)
+        return {
+            "transaction_id": txn.transaction_id,
+            "decision": res["decision"],
+            "risk_score": int(res["risk_score"]),
+            "reasons": res.get("reasons", ""),
+        }
+
+    return legacy
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+def summarize(name: str, latencies: List[float], wall: float) -> Dict[str, float]:
+    lat = sorted(latencies)
+    return {
+        "name": name,
+        "requests": len(lat),
+        "rps": len(lat) / wall if wall else 0.0,
+        "p50_ms": percentile(lat, 50) * 1000,
+        "p90_ms": percentile(lat, 90) * 1000,
+        "p99_ms": percentile(lat, 99) * 1000,
+        "max_ms": lat[-1] * 1000 if lat else 0.0,
+    }
+
+
+async def load(client: httpx.AsyncClient, bodies: List[dict], concurrency: int) -> List[float]:
+    latencies: List[float] = []
+    queue = iter(bodies)
+
+    async def worker():
+        for body in queue:
+            start = time.perf_counter()
+            r = await client.post("/transaction", json=body)
+            latencies.append(time.perf_counter() - start)
+            r.raise_for_status()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+async def bench(name: str, client: httpx.AsyncClient, bodies: List[dict], concurrency: int, warmup: int):
+    await load(client, bodies[:warmup], concurrency)
+    start = time.perf_counter()
+    latencies = await load(client, bodies, concurrency)
+    return summarize(name, latencies, time.perf_counter() - start)
+
+
+def make_bodies(n: int) -> List[dict]:
+    with open(EXAMPLE) as fh:
+        base = json.load(fh)
+    return [dict(base, transaction_id=i, hour=i % 24, amount_mxn=float(500 + (i * 37) % 9000)) for i in range(n)]
+
+
+async def main_async(args) -> List[Dict[str, float]]:
+    bodies = make_bodies(args.requests)
+    results = []
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url) as client:
+            results.append(await bench("current", client, bodies, args.concurrency, args.warmup))
+        return results
+    from app import app as current
+    for name, asgi in [("legacy", legacy_app()), ("current", current)]:
+        transport = httpx.ASGITransport(app=asgi)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results.append(await bench(name, client, bodies, args.concurrency, args.warmup))
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=5000)
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--warmup", type=int, default=200)
+    ap.add_argument("--url", default=None, help="Benchmark a running server instead of in-process ASGI")
+    ap.add_argument("--json", dest="json_out", default=None, help="Also write the results to this JSON file")
+    args = ap.parse_args()
+    results = asyncio.run(main_async(args))
+    print(f"{'variant':<10}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for r in results:
+        print(f"{r['name']:<10}{r['rps']:>10.0f}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}")
+    if args.json_out:
+        with open(args.json_out, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
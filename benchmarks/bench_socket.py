@@ -0,0 +1,111 @@
+"""
+Throughput and latency of the socket front end against POST /transaction.
+
+Starts socket_server.DecisionServer on a Unix socket (or TCP with --tcp) in this
+process and drives it over --connections connections, each keeping --window
+requests in flight. The HTTP baseline is the in-process ASGI run from
+bench_http.py at the same total concurrency:
+
+    python benchmarks/bench_socket.py --requests 20000 --connections 4 --window 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import Dict, List
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.bench_http import bench, make_bodies, summarize  # noqa: E402
+
+
+async def _drive(client, bodies: List[dict], window: int) -> List[float]:
+    # Sender and receiver run concurrently; responses arrive in send order
+    import socket_server
+    latencies: List[float] = []
+    sent_at: deque = deque()
+    slots = asyncio.Semaphore(window)
+
+    async def send():
+        for body in bodies:
+            await slots.acquire()
+            sent_at.append(time.perf_counter())
+            client.writer.write(socket_server.encode_frame(client.dumps(body)))
+            await client.writer.drain()
+
+    async def receive():
+        for _ in bodies:
+            res = await client._next()
+            latencies.append(time.perf_counter() - sent_at.popleft())
+            slots.release()
+            if "error" in res:
+                raise RuntimeError(res["error"])
+
+    await asyncio.gather(send(), receive())
+    return latencies
+
+
+async def bench_socket(bodies: List[dict], connections: int, window: int, codec: str, tcp: bool,
+                       warmup: int) -> Dict[str, float]:
+    import decision_engine as de
+    import socket_server
+    from config_store import ConfigStore
+    server = socket_server.DecisionServer(ConfigStore(de.DEFAULT_CONFIG), codec=codec)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = None if tcp else os.path.join(tmp, "decision.sock")
+        listener = await server.start(unix=path)
+        port = listener.sockets[0].getsockname()[1] if tcp else 0
+        clients = [await socket_server.DecisionClient.connect(unix=path, port=port, codec=codec)
+                   for _ in range(connections)]
+        await _drive(clients[0], bodies[:warmup], window)
+        shards = [bodies[i::connections] for i in range(connections)]
+        start = time.perf_counter()
+        per_conn = await asyncio.gather(*(_drive(c, s, window) for c, s in zip(clients, shards)))
+        wall = time.perf_counter() - start
+        for c in clients:
+            await c.close()
+        listener.close()
+    name = f"{'tcp' if tcp else 'unix'}/{codec}"
+    return summarize(name, [lat for conn in per_conn for lat in conn], wall)
+
+
+async def main_async(args) -> List[Dict[str, float]]:
+    bodies = make_bodies(args.requests)
+    from app import app as http_app
+    transport = httpx.ASGITransport(app=http_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = [await bench("http", client, bodies, args.connections * args.window, args.warmup)]
+    for codec in args.codecs.split(","):
+        results.append(await bench_socket(bodies, args.connections, args.window, codec, args.tcp, args.warmup))
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=20000)
+    ap.add_argument("--connections", type=int, default=4)
+    ap.add_argument("--window", type=int, default=32, help="Requests in flight per connection")
+    ap.add_argument("--codecs", default="json", help="Comma-separated: json,msgpack")
+    ap.add_argument("--tcp", action="store_true", help="Use TCP on localhost instead of a Unix socket")
+    ap.add_argument("--warmup", type=int, default=500)
+    ap.add_argument("--json", dest="json_out", default=None, help="Also write the results to this JSON file")
+    args = ap.parse_args()
+    results = asyncio.run(main_async(args))
+    print(f"{'variant':<14}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for r in results:
+        print(f"{r['name']:<14}{r['rps']:>10.0f}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}")
+    if args.json_out:
+        with open(args.json_out, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
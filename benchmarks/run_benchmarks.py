@@ -0,0 +1,244 @@
+"""
+Reproducible performance suite for the decision engine and API.
+
+Runs every benchmark on seeded synthetic data (benchmarks/synth.py), writes the
+results as JSON and optionally compares them with a saved baseline:
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --sizes 1e4,1e6,1e7 --baseline bench.json --threshold 10
+
+Exits with status 1 if any benchmark is more than --threshold percent worse than
+the baseline. Use --only to run a subset (e.g. --only assess_row,http_transaction).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import decision_engine as de  # noqa: E402
+from benchmarks import synth  # noqa: E402
+
+Result = Dict[str, Any]
+
+
+def _result(value: float, unit: str, higher_is_better: bool, **extra) -> Result:
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better, **extra}
+
+
+def _best_of(repeat: int, fn: Callable[[], Any]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_assess_row(args) -> Dict[str, Result]:
+    import pandas as pd
+    rows = [pd.Series(r) for r in synth.generate_transactions(args.ops, args.seed)]
+    seconds = _best_of(args.repeat, lambda: [de.assess_row(r, de.DEFAULT_CONFIG) for r in rows])
+    return {"assess_row": _result(seconds / len(rows) * 1e6, "us/op", False)}
+
+
+def bench_assess_txn(args) -> Dict[str, Result]:
+    rows = synth.generate_transactions(args.ops, args.seed)
+    plan = de.compile_config(de.DEFAULT_CONFIG)
+    seconds = _best_of(args.repeat, lambda: [de.assess_txn(r, plan) for r in rows])
+    return {"assess_txn": _result(seconds / len(rows) * 1e6, "us/op", False)}
+
+
+def bench_assess_frame(args) -> Dict[str, Result]:
+    df = synth.generate_frame(max(args.ops, 100_000), args.seed)
+    seconds = _best_of(args.repeat, lambda: de.assess_frame(df, de.DEFAULT_CONFIG))
+    return {"assess_frame": _result(len(df) / seconds, "rows/s", True)}
+
+
+def bench_run(args) -> Dict[str, Result]:
+    out: Dict[str, Result] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            src, dst = os.path.join(tmp, f"in_{size}.csv"), os.path.join(tmp, f"out_{size}.csv")
+            synth.write_csv(src, size, args.seed)
+            if size >= 1_000_000:
+                # Whole-file runs at this size are bounded by RAM; measure the streaming path
+                seconds = _best_of(1, lambda: de.run_chunked(src, dst, chunksize=500_000))
+                name = f"run_chunked_{size}"
+            else:
+                seconds = _best_of(args.repeat, lambda: de.run(src, dst))
+                name = f"run_{size}"
+            out[name] = _result(size / seconds, "rows/s", True, rows=size)
+            os.unlink(src)
+    return out
+
+
+def bench_http(args) -> Dict[str, Result]:
+    from fastapi.testclient import TestClient
+    from app import app
+    from benchmarks.bench_http import percentile
+    client = TestClient(app)
+    bodies = synth.generate_transactions(args.http_requests, args.seed)
+    for body in bodies[:50]:
+        client.post("/transaction", json=body)
+    latencies: List[float] = []
+    for body in bodies:
+        start = time.perf_counter()
+        client.post("/transaction", json=body).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "http_transaction_p50": _result(percentile(latencies, 50) * 1e3, "ms", False),
+        "http_transaction_p99": _result(percentile(latencies, 99) * 1e3, "ms", False),
+    }
+
+
+def bench_memory(args) -> Dict[str, Result]:
+    # Peak RSS of a fresh process running run() on each size, plus the size of the
+    # scored frame it returns; a subprocess keeps earlier benchmarks out of the peak
+    import subprocess
+    code = ("import resource, sys, decision_engine as de\n"
+            "out = de.run(sys.argv[1], sys.argv[2])\n"
+            "peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+            "print(peak * (1 if sys.platform == 'darwin' else 1024), int(out.memory_usage(deep=True).sum()))\n")
+    out: Dict[str, Result] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            src, dst = os.path.join(tmp, f"in_{size}.csv"), os.path.join(tmp, f"out_{size}.csv")
+            synth.write_csv(src, size, args.seed)
+            proc = subprocess.run([sys.executable, "-c", code, src, dst], cwd=ROOT, check=True,
+                                  capture_output=True, text=True)
+            peak, frame = (int(v) for v in proc.stdout.split())
+            out[f"run_peak_rss_{size}"] = _result(peak / 2**20, "MiB", False, rows=size)
+            out[f"run_frame_memory_{size}"] = _result(frame / 2**20, "MiB", False, rows=size)
+            os.unlink(src)
+    return out
+
+
+def bench_startup(args) -> Dict[str, Result]:
+    # Cold import of the API in a fresh interpreter, as a worker would start
+    import subprocess
+    code = "import sys, app; print(','.join(m for m in ('pandas', 'numpy') if m in sys.modules))"
+    cmd = [sys.executable, "-c", code]
+    seconds = _best_of(args.repeat, lambda: subprocess.run(cmd, cwd=ROOT, check=True, capture_output=True))
+    heavy = subprocess.run(cmd, cwd=ROOT, check=True, capture_output=True, text=True).stdout.strip()
+    return {"app_import": _result(seconds * 1e3, "ms", False, heavy_modules=heavy.split(",") if heavy else [])}
+
+
+CUSTOM_RULE_TEMPLATES = (
+    "amount_mxn >= {n}00 and device_type == 'desktop' and hour in night",
+    "bin_country != ip_country and ip_risk in ['medium', 'high'] and latency_ms > {n}0",
+    "customer_txn_30d < 2 and product_type == 'digital' and amount_mxn > {n}50",
+)
+
+
+def _custom_config(count: int) -> Dict[str, Any]:
+    import copy
+    cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+    cfg["custom_rules"] = [{"name": f"rule_{i}", "weight": 1,
+                            "when": CUSTOM_RULE_TEMPLATES[i % len(CUSTOM_RULE_TEMPLATES)].format(n=i + 1)}
+                           for i in range(count)]
+    return cfg
+
+
+def bench_custom_rules(args) -> Dict[str, Result]:
+    # Added cost of each config-defined rule, from configs with 0 and 10 custom rules
+    count = 10
+    rows = synth.generate_transactions(args.ops, args.seed)
+    df = synth.generate_frame(max(args.ops, 100_000), args.seed)
+    txn_us, frame_us = [], []
+    for cfg in (de.DEFAULT_CONFIG, _custom_config(count)):
+        plan = de.compile_config(cfg)
+        txn_us.append(_best_of(args.repeat, lambda: [de.assess_txn(r, plan) for r in rows]) / len(rows) * 1e6)
+        frame_us.append(_best_of(args.repeat, lambda: de.assess_frame(df, cfg, reasons="mask")) / len(df) * 1e6)
+    return {
+        "custom_rule_txn": _result((txn_us[1] - txn_us[0]) / count, "us/op per rule", False),
+        "custom_rule_frame": _result((frame_us[1] - frame_us[0]) / count * 1e3, "ns/row per rule", False),
+    }
+
+
+BENCHMARKS: Dict[str, Callable[[Any], Dict[str, Result]]] = {
+    "assess_row": bench_assess_row,
+    "assess_txn": bench_assess_txn,
+    "assess_frame": bench_assess_frame,
+    "run": bench_run,
+    "http_transaction": bench_http,
+    "startup": bench_startup,
+    "memory": bench_memory,
+    "custom_rules": bench_custom_rules,
+}
+
+
+def compare(current: Dict[str, Result], baseline: Dict[str, Result], threshold_pct: float) -> List[Dict[str, Any]]:
+    """Benchmarks in both result sets that got worse than baseline by more than threshold_pct."""
+    regressions = []
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if not base or not base["value"]:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"] * 100
+        worse = -change if cur["higher_is_better"] else change
+        if worse > threshold_pct:
+            regressions.append({"name": name, "baseline": base["value"], "current": cur["value"],
+                                "unit": cur["unit"], "worse_pct": worse})
+    return regressions
+
+
+def _parse_sizes(text: str) -> List[int]:
+    return [int(float(s)) for s in text.split(",") if s.strip()]
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=_parse_sizes, default=[10_000], help="Row counts for run(), e.g. 1e4,1e6,1e7")
+    ap.add_argument("--ops", type=int, default=20_000, help="Transactions per per-call benchmark")
+    ap.add_argument("--http-requests", type=int, default=2_000)
+    ap.add_argument("--repeat", type=int, default=3, help="Best-of repetitions")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--only", default=None, help="Comma-separated benchmark names: " + ",".join(BENCHMARKS))
+    ap.add_argument("--output", default=None, help="Write results JSON here")
+    ap.add_argument("--baseline", default=None, help="Compare against this results JSON")
+    ap.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = ap.parse_args(argv)
+
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    results: Dict[str, Result] = {}
+    for name in selected:
+        results.update(BENCHMARKS[name](args))
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    for name, r in results.items():
+        print(f"{name:<28}{r['value']:>14,.2f} {r['unit']}")
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['name']}: {r['baseline']:,.2f} -> {r['current']:,.2f} {r['unit']} "
+                  f"({r['worse_pct']:.1f}% worse)", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
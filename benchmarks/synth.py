@@ -0,0 +1,91 @@
+"""
+Seeded synthetic card-not-present transactions matching app.Transaction.
+
+Distributions are loosely modelled on production traffic: mostly low-risk daytime
+purchases from MX cards, with a long tail of large amounts, night traffic,
+cross-border IPs, slow sessions and repeat chargebacks.
+
+    python benchmarks/synth.py --rows 1000000 --output transactions.csv
+"""
+import argparse
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+PRODUCT_TYPES = (["digital", "physical", "subscription"], [0.5, 0.35, 0.15])
+REPUTATIONS = (["trusted", "recurrent", "new", "high_risk"], [0.25, 0.35, 0.33, 0.07])
+IP_RISK = (["low", "medium", "high"], [0.8, 0.15, 0.05])
+DEVICE_RISK = (["low", "medium", "high"], [0.85, 0.11, 0.04])
+EMAIL_RISK = (["low", "medium", "high", "new_domain"], [0.75, 0.12, 0.05, 0.08])
+COUNTRIES = (["MX", "US", "CO", "BR", "ES"], [0.9, 0.05, 0.02, 0.02, 0.01])
+STATES = ["CDMX", "Jalisco", "Nuevo León", "Puebla", "Yucatán", "Querétaro"]
+DEVICES = (["mobile", "desktop", "tablet"], [0.65, 0.3, 0.05])
+# Share of traffic per hour of day, peaking in the afternoon
+HOUR_WEIGHTS = np.array([2, 1, 1, 1, 1, 1, 2, 3, 4, 5, 6, 6, 7, 7, 7, 6, 6, 6, 6, 6, 5, 4, 3, 2], dtype=float)
+
+# Median amount (MXN) per product type
+MEDIAN_AMOUNT = {"digital": 450.0, "physical": 1800.0, "subscription": 250.0}
+
+
+def _choice(rng: np.random.Generator, spec, n: int) -> np.ndarray:
+    values, probs = spec
+    return rng.choice(np.array(values, dtype=object), size=n, p=probs)
+
+
+def generate_frame(n: int, seed: int = 0, start_id: int = 0) -> pd.DataFrame:
+    """n transactions as a DataFrame; the same (n, seed, start_id) always gives the same rows."""
+    rng = np.random.default_rng(seed)
+    product = _choice(rng, PRODUCT_TYPES, n)
+    median = pd.Series(product).map(MEDIAN_AMOUNT).to_numpy(dtype=float)
+    amount = np.round(median * rng.lognormal(0.0, 0.9, n), 2)
+    bin_country = _choice(rng, COUNTRIES, n)
+    cross_border = rng.random(n) < 0.06
+    ip_country = np.where(cross_border, _choice(rng, COUNTRIES, n), bin_country)
+    return pd.DataFrame({
+        "transaction_id": np.arange(start_id, start_id + n, dtype=np.int64),
+        "amount_mxn": amount,
+        "customer_txn_30d": rng.poisson(2.0, n),
+        "geo_state": rng.choice(np.array(STATES, dtype=object), size=n),
+        "device_type": _choice(rng, DEVICES, n),
+        "chargeback_count": rng.choice([0, 1, 2, 3], size=n, p=[0.93, 0.05, 0.015, 0.005]),
+        "hour": rng.choice(24, size=n, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum()),
+        "product_type": product,
+        "latency_ms": np.minimum(rng.lognormal(5.3, 0.7, n), 15000).astype(np.int64),
+        "user_reputation": _choice(rng, REPUTATIONS, n),
+        "device_fingerprint_risk": _choice(rng, DEVICE_RISK, n),
+        "ip_risk": _choice(rng, IP_RISK, n),
+        "email_risk": _choice(rng, EMAIL_RISK, n),
+        "bin_country": bin_country,
+        "ip_country": ip_country,
+    })
+
+
+def generate_transactions(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """n transactions as plain dicts with Python scalars (request bodies)."""
+    return generate_frame(n, seed).to_dict(orient="records")
+
+
+def iter_frames(n: int, seed: int = 0, chunk_rows: int = 1_000_000) -> Iterator[pd.DataFrame]:
+    # Chunk i is seeded with (seed, i) so large files never sit in memory at once
+    for i, start in enumerate(range(0, n, chunk_rows)):
+        yield generate_frame(min(chunk_rows, n - start), seed=seed * 1_000_003 + i, start_id=start)
+
+
+def write_csv(path: str, n: int, seed: int = 0, chunk_rows: int = 1_000_000) -> None:
+    with open(path, "w", newline="") as fh:
+        for i, frame in enumerate(iter_frames(n, seed, chunk_rows)):
+            frame.to_csv(fh, header=(i == 0), index=False)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=10_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--output", default="transactions_synthetic.csv")
+    args = ap.parse_args()
+    write_csv(args.output, args.rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
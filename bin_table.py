@@ -0,0 +1,194 @@
+"""
+Memory-mapped BIN range table: card_bin -> issuing country.
+
+The table is built offline from a CSV of BIN ranges:
+
+    bin_start,bin_end,country
+    4,,US            # a bare prefix covers every BIN starting with it
+    451234,451299,MX
+    45123456,,BR
+
+    python bin_table.py build --csv bins.csv --output bins.idx
+    python bin_table.py lookup --table bins.idx 45123456 4111
+
+BINs are normalized to 8 digits: a range start is padded with zeros and its end
+with nines. Overlapping ranges are flattened at build time, and the narrowest
+range wins, so 45123456 above resolves to BR, 45129900 to MX and 45130000 to
+US. The file holds three sorted columns: range starts and ends (uint32) and
+countries (2 bytes). Lookups are a binary search over the starts. The file is memory-mapped
+read-only, so every worker process shares one copy in the page cache.
+"""
+import argparse
+import bisect
+import csv
+import heapq
+import mmap
+import struct
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MAGIC = b"BINTBL01"
+HEADER = struct.Struct("<8sII")  # magic, ranges, digits
+DIGITS = 8
+
+
+def bin_key(card_bin: Any) -> Optional[int]:
+    """First 8 digits of a card number or BIN as an int (shorter BINs padded with zeros)."""
+    text = str(card_bin).strip()
+    if not text.isdigit():
+        text = "".join(ch for ch in text if ch.isdigit())
+        if not text:
+            return None
+    return int(text[:DIGITS].ljust(DIGITS, "0"))
+
+
+def flatten_ranges(ranges: List[Tuple[int, int, bytes]]) -> List[Tuple[int, int, bytes]]:
+    """Sorted, disjoint (start, end, value) ranges where the narrowest input range wins."""
+    # Sweep over range boundaries keeping the narrowest active range on a heap;
+    # later CSV rows win ties. Adjacent segments with the same country are merged.
+    order = sorted(range(len(ranges)), key=lambda i: ranges[i][0])
+    bounds = sorted({r[0] for r in ranges} | {r[1] + 1 for r in ranges})
+    active: List[Tuple[int, int, int, bytes]] = []
+    out: List[Tuple[int, int, bytes]] = []
+    pos = 0
+    for lo, next_lo in zip(bounds, bounds[1:]):
+        while pos < len(order) and ranges[order[pos]][0] <= lo:
+            start, end, country = ranges[order[pos]]
+            heapq.heappush(active, (end - start, -order[pos], end, country))
+            pos += 1
+        while active and active[0][2] < lo:
+            heapq.heappop(active)
+        if not active:
+            continue
+        country = active[0][3]
+        if out and out[-1][1] == lo - 1 and out[-1][2] == country:
+            out[-1] = (out[-1][0], next_lo - 1, country)
+        else:
+            out.append((lo, next_lo - 1, country))
+    return out
+
+
+def read_ranges(path: str) -> List[Tuple[int, int, bytes]]:
+    """(start, end, country) per CSV row, with BINs normalized to 8 digits."""
+    ranges = []
+    with open(path, newline="") as fh:
+        for line, row in enumerate(csv.DictReader(fh), start=2):
+            start = (row.get("bin_start") or "").strip()
+            end = (row.get("bin_end") or "").strip() or start
+            country = (row.get("country") or "").strip().upper()
+            if not (start.isdigit() and end.isdigit()) or len(start) > DIGITS or len(end) > DIGITS:
+                raise ValueError(f"{path}:{line}: BINs must be 1 to {DIGITS} digits")
+            if len(country) != 2 or not country.isascii():
+                raise ValueError(f"{path}:{line}: country must be a 2-letter code")
+            lo, hi = int(start.ljust(DIGITS, "0")), int(end.ljust(DIGITS, "9"))
+            if hi < lo:
+                raise ValueError(f"{path}:{line}: bin_end is before bin_start")
+            ranges.append((lo, hi, country.encode()))
+    return ranges
+
+
+def build(csv_path: str, output: str) -> int:
+    """Compile csv_path into the binary table at output; returns the number of ranges written."""
+    flat = flatten_ranges(read_ranges(csv_path))
+    with open(output, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, len(flat), DIGITS))
+        fh.write(struct.pack(f"<{len(flat)}I", *(r[0] for r in flat)))
+        fh.write(struct.pack(f"<{len(flat)}I", *(r[1] for r in flat)))
+        fh.write(b"".join(r[2] for r in flat))
+    return len(flat)
+
+
+class BinTable:
+    columns = ("card_bin",)  # input columns enrich_frame() reads
+
+    def __init__(self, path: str):
+        if sys.byteorder != "little":
+            raise RuntimeError("BIN tables are little-endian and need a little-endian host")
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size, digits = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or digits != DIGITS:
+            raise ValueError(f"{path} is not a BIN table")
+        view = memoryview(self._mm)
+        self._starts_at = HEADER.size
+        self._ends_at = self._starts_at + 4 * self.size
+        self._countries_at = self._ends_at + 4 * self.size
+        self.starts = view[self._starts_at:self._ends_at].cast("I")
+        self.ends = view[self._ends_at:self._countries_at].cast("I")
+
+    def lookup(self, card_bin: Any) -> Optional[str]:
+        key = bin_key(card_bin) if card_bin is not None else None
+        if key is None:
+            return None
+        i = bisect.bisect_right(self.starts, key) - 1
+        if i < 0 or key > self.ends[i]:
+            return None
+        at = self._countries_at + 2 * i
+        return self._mm[at:at + 2].decode()
+
+    def lookup_many(self, card_bins: Iterable[Any]):
+        """Vectorized lookup: object array with a country or None per input."""
+        import numpy as np
+        import pandas as pd
+        values = pd.Series(card_bins)
+        out = np.full(len(values), None, dtype=object)
+        if not self.size:
+            return out
+        if pd.api.types.is_numeric_dtype(values):
+            values = values.astype("Int64")  # 451234.0 -> 451234 when NaN forced a float column
+        digits = values.astype("string").str.replace(r"\D", "", regex=True).str[:DIGITS].fillna("")
+        valid = (digits != "").to_numpy()
+        keys = digits.str.ljust(DIGITS, "0").where(valid, "0").astype(np.int64).to_numpy()
+        starts = np.frombuffer(self._mm, dtype="<u4", count=self.size, offset=self._starts_at)
+        ends = np.frombuffer(self._mm, dtype="<u4", count=self.size, offset=self._ends_at)
+        countries = np.frombuffer(self._mm, dtype="S2", count=self.size, offset=self._countries_at)
+        idx = np.searchsorted(starts, keys, side="right") - 1
+        safe = idx.clip(0)
+        hit = valid & (idx >= 0) & (keys <= ends[safe])
+        if hit.any():
+            out[hit] = countries[safe[hit]].astype("U2").astype(object)
+        return out
+
+    def enrich(self, txn: Dict[str, Any]) -> Dict[str, Any]:
+        # bin_country from the card BIN; the caller's value is kept for unknown BINs
+        country = self.lookup(txn.get("card_bin"))
+        if country is not None:
+            txn["bin_country"] = country
+        return txn
+
+    def enrich_frame(self, df):
+        if "card_bin" not in df.columns:
+            return df
+        import numpy as np
+        import pandas as pd
+        found = self.lookup_many(df["card_bin"].to_numpy())
+        # Without a bin_country column, unknown BINs get assess_row's default ("")
+        current = df["bin_country"].astype(object).to_numpy() if "bin_country" in df.columns else ""
+        df["bin_country"] = pd.Categorical(np.where(pd.notna(found), found, current))
+        return df
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Build or query a memory-mapped BIN range table")
+    sub = ap.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="Compile a CSV of bin_start,bin_end,country into a table")
+    b.add_argument("--csv", required=True)
+    b.add_argument("--output", required=True)
+    q = sub.add_parser("lookup", help="Print the country of each BIN")
+    q.add_argument("--table", required=True)
+    q.add_argument("bins", nargs="+")
+    args = ap.parse_args(argv)
+    if args.command == "build":
+        try:
+            n = build(args.csv, args.output)
+        except (OSError, ValueError) as e:
+            ap.error(str(e))
+        print(f"Wrote {n} ranges to {args.output}", file=sys.stderr)
+    else:
+        table = BinTable(args.table)
+        for card_bin in args.bins:
+            print(card_bin, table.lookup(card_bin) or "-")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Versioned, hot-swappable scoring config for the API.
+
+A new config is validated and compiled into a RulePlan before it is published by
+replacing a single reference, so readers never see a half-built config. Request
+handlers read `store.active` once and score against that snapshot, which lets
+in-flight requests finish on the version they started with.
+"""
+import copy
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+import decision_engine as de
+
+
+@dataclass(frozen=True)
+class ActiveConfig:
+    version: int
+    config: Dict[str, Any]  # private deep copy: treat as read-only
+    plan: de.RulePlan
+    loaded_at: float
+    source: str
+
+    def describe(self) -> Dict[str, Any]:
+        loaded = datetime.fromtimestamp(self.loaded_at, tz=timezone.utc).isoformat()
+        return {**self.config, "version": self.version, "loaded_at": loaded, "source": self.source}
+
+
+class ConfigStore:
+    def __init__(self, config: Dict[str, Any], source: str = "default"):
+        self._lock = threading.Lock()  # serializes writers only; readers never take it
+        self._active = self._build(config, 1, source)
+
+    @property
+    def active(self) -> ActiveConfig:
+        return self._active
+
+    @staticmethod
+    def _build(config: Dict[str, Any], version: int, source: str) -> ActiveConfig:
+        de.validate_config(config)
+        config = copy.deepcopy(config)
+        return ActiveConfig(version=version, config=config, plan=de.compile_config(config),
+                            loaded_at=time.time(), source=source)
+
+    def load(self, config: Dict[str, Any], source: str = "api") -> ActiveConfig:
+        """Validate, compile and atomically publish config as the next version.
+
+        Raises ValueError and keeps the current version if config is invalid.
+        """
+        with self._lock:
+            self._active = self._build(config, self._active.version + 1, source)
+            return self._active
+
+    def load_file(self, path: str) -> ActiveConfig:
+        return self.load(_read_json(path), source=path)
+
+    @classmethod
+    def from_file(cls, path: str) -> "ConfigStore":
+        return cls(_read_json(path), source=path)
+
+
+def _read_json(path: str) -> Dict[str, Any]:
+    with open(path) as fh:
+        try:
+            return json.load(fh)
+        except ValueError as e:
+            raise ValueError(f"{path} is not valid JSON: {e}") from e
@@ -0,0 +1,223 @@
+"""
+Config-defined custom rules.
+
+A config may list extra rules under "custom_rules". Each one adds `weight` to the
+risk score when its `when` expression holds:
+
+    "custom_rules": [
+        {"name": "desktop_night_big", "weight": 3,
+         "when": "amount_mxn >= 5000 and device_type == 'desktop' and hour in night"}
+    ]
+
+`when` is a small expression language. Transaction fields can be compared with
+numbers, strings, lists or other fields (==, !=, <, <=, >, >=, in, not in), and
+combined with and, or, not and parentheses. `night` stands for the night hours
+(22 to 5). Text comparisons ignore case. Missing fields take the same defaults
+as the built-in rules.
+
+Each expression is parsed once, checked against this grammar, and compiled into
+two functions: `test(get)` for a single transaction and `vector(columns)` for
+numpy columns. Nothing is interpreted per transaction.
+"""
+import ast
+import copy
+import operator
+from dataclasses import dataclass
+from functools import lru_cache, reduce
+from typing import Any, Callable, Dict, Tuple
+
+# field -> (kind, default when missing); the defaults match the built-in rules
+FIELDS: Dict[str, Tuple[str, Any]] = {
+    "amount_mxn": ("float", 0.0),
+    "customer_txn_30d": ("int", 0),
+    "chargeback_count": ("int", 0),
+    "hour": ("int", 12),
+    "latency_ms": ("int", 0),
+    "velocity_1h": ("int", 0),
+    "geo_state": ("text", ""),
+    "device_type": ("text", ""),
+    "product_type": ("text", "_default"),
+    "user_reputation": ("text", "new"),
+    "device_fingerprint_risk": ("text", "low"),
+    "ip_risk": ("text", "low"),
+    "email_risk": ("text", "low"),
+    "bin_country": ("text", ""),
+    "ip_country": ("text", ""),
+}
+NIGHT_HOURS = (22, 23, 0, 1, 2, 3, 4, 5)
+
+_OPERATORS = {ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le,
+              ast.Gt: operator.gt, ast.GtE: operator.ge}
+_NORMALIZE = {"int": int, "float": float, "text": lambda v: str(v).lower()}
+
+
+@dataclass(frozen=True)
+class CustomRule:
+    name: str
+    when: str
+    weight: Any
+    reason: str                                  # reasons entry, e.g. "custom:desktop_night_big(+3)"
+    fields: Tuple[str, ...]                      # fields the expression reads
+    test: Callable[[Callable[[str, Any], Any]], bool]  # test(get) for one transaction
+    vector: Callable[[Dict[str, Any]], Any]      # vector({field: array}) -> bool array
+
+
+def _kind(field: str) -> str:
+    return "text" if FIELDS[field][0] == "text" else "number"
+
+
+class _Checker:
+    # Validates the parsed expression and rewrites it for compilation: text
+    # constants are lowered and `night` becomes a tuple of hours
+    def __init__(self):
+        self.fields: Dict[str, None] = {}
+
+    def condition(self, node: ast.expr) -> ast.expr:
+        if isinstance(node, ast.BoolOp):
+            return ast.BoolOp(node.op, [self.condition(v) for v in node.values])
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ast.UnaryOp(node.op, self.condition(node.operand))
+        if isinstance(node, ast.Compare):
+            operands = [self.operand(n) for n in (node.left, *node.comparators)]
+            for (left, lkind), op, (right, rkind) in zip(operands, node.ops, operands[1:]):
+                self.comparison(left, lkind, op, right, rkind)
+            return ast.Compare(operands[0][0], node.ops, [o for o, _ in operands[1:]])
+        raise ValueError(f"expected a comparison, got {ast.unparse(node)!r}")
+
+    def operand(self, node: ast.expr) -> Tuple[ast.expr, str]:
+        if isinstance(node, ast.Name):
+            if node.id == "night":
+                return ast.Tuple([ast.Constant(h) for h in NIGHT_HOURS], ast.Load()), "list:number"
+            if node.id not in FIELDS:
+                raise ValueError(f"unknown field {node.id!r}")
+            self.fields[node.id] = None
+            return ast.Name(node.id, ast.Load()), "field:" + _kind(node.id)
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            if not node.elts:
+                raise ValueError("empty list")
+            items = [self.constant(e) for e in node.elts]
+            kinds = {k for _, k in items}
+            if len(kinds) != 1:
+                raise ValueError(f"lists must hold values of one type: {ast.unparse(node)!r}")
+            return ast.Tuple([c for c, _ in items], ast.Load()), "list:" + kinds.pop()
+        return self.constant(node)
+
+    def constant(self, node: ast.expr) -> Tuple[ast.Constant, str]:
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            value, kind = self.constant(node.operand)
+            if kind == "number":
+                return ast.Constant(-value.value), kind
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, str):
+                return ast.Constant(node.value.lower()), "text"
+            if isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+                return ast.Constant(node.value), "number"
+        raise ValueError(f"unsupported value {ast.unparse(node)!r}")
+
+    @staticmethod
+    def comparison(left: ast.expr, lkind: str, op: ast.cmpop, right: ast.expr, rkind: str) -> None:
+        text = ast.unparse(ast.Compare(left, [op], [right]))
+        lbase, rbase = lkind.rpartition(":")[2], rkind.rpartition(":")[2]
+        if isinstance(op, (ast.In, ast.NotIn)):
+            if lkind.startswith("list:") or not rkind.startswith("list:"):
+                raise ValueError(f"'in' needs a value on the left and a list on the right: {text!r}")
+        elif lkind.startswith("list:") or rkind.startswith("list:"):
+            raise ValueError(f"lists can only follow 'in': {text!r}")
+        elif not (lkind.startswith("field:") or rkind.startswith("field:")):
+            raise ValueError(f"comparison without a field: {text!r}")
+        elif type(op) not in _OPERATORS:
+            raise ValueError(f"unsupported operator in {text!r}")
+        elif lbase == "text" and type(op) not in (ast.Eq, ast.NotEq):
+            raise ValueError(f"text can only be compared with ==, != or in: {text!r}")
+        if lbase != rbase:
+            raise ValueError(f"cannot compare {lbase} with {rbase}: {text!r}")
+
+
+class _ReadFields(ast.NodeTransformer):
+    # field -> _text(get("field", default)) for the single-transaction function
+    def visit_Name(self, node: ast.Name) -> ast.expr:
+        kind, default = FIELDS[node.id]
+        read = ast.Call(ast.Name("get", ast.Load()), [ast.Constant(node.id), ast.Constant(default)], [])
+        return ast.Call(ast.Name("_" + kind, ast.Load()), [read], [])
+
+
+def _scalar_function(tree: ast.expr, name: str) -> Callable:
+    body = _ReadFields().visit(copy.deepcopy(tree))
+    args = ast.arguments(posonlyargs=[], args=[ast.arg("get")], kwonlyargs=[], kw_defaults=[], defaults=[])
+    code = compile(ast.fix_missing_locations(ast.Expression(ast.Lambda(args, body))), f"<custom rule {name}>", "eval")
+    return eval(code, {"__builtins__": {}, **{"_" + k: f for k, f in _NORMALIZE.items()}})
+
+
+def _vector_function(node: ast.expr) -> Callable[[Dict[str, Any]], Any]:
+    # Closures over numpy columns: & / | / ~ instead of and / or / not
+    if isinstance(node, ast.BoolOp):
+        parts = [_vector_function(v) for v in node.values]
+        combine = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+        return lambda cols: reduce(combine, (p(cols) for p in parts))
+    if isinstance(node, ast.UnaryOp):
+        inner = _vector_function(node.operand)
+        return lambda cols: ~inner(cols)
+    if isinstance(node, ast.Name):
+        field = node.id
+        return lambda cols: cols[field]
+    if isinstance(node, ast.Tuple):
+        values = tuple(e.value for e in node.elts)
+        return lambda cols: values
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda cols: value
+    operands = [_vector_function(n) for n in (node.left, *node.comparators)]
+    tests = [_vector_compare(left, op, right) for left, op, right in zip(operands, node.ops, operands[1:])]
+    if len(tests) == 1:
+        return tests[0]
+    return lambda cols: reduce(operator.and_, (t(cols) for t in tests))
+
+
+def _vector_compare(left: Callable, op: ast.cmpop, right: Callable) -> Callable[[Dict[str, Any]], Any]:
+    if isinstance(op, (ast.In, ast.NotIn)):
+        def member(cols):
+            values, column = right(cols), left(cols)
+            hit = reduce(operator.or_, (column == v for v in values))
+            return ~hit if isinstance(op, ast.NotIn) else hit
+        return member
+    compare = _OPERATORS[type(op)]
+    return lambda cols: compare(left(cols), right(cols))
+
+
+@lru_cache(maxsize=256, typed=True)
+def compile_rule(name: str, when: str, weight: Any) -> CustomRule:
+    """Parse and compile one rule; ValueError explains what is wrong with `when`."""
+    try:
+        tree = ast.parse(when, mode="eval").body
+    except SyntaxError as e:
+        raise ValueError(f"invalid expression: {e.msg}")
+    checker = _Checker()
+    tree = checker.condition(tree)
+    sign = "+" if weight >= 0 else ""
+    return CustomRule(name, when, weight, f"custom:{name}({sign}{weight})", tuple(checker.fields),
+                      _scalar_function(tree, name), _vector_function(tree))
+
+
+def compile_rules(specs: Any) -> Tuple[CustomRule, ...]:
+    """Compile a config's "custom_rules" list, in order."""
+    if not isinstance(specs, (list, tuple)):
+        raise ValueError("custom_rules must be a list")
+    rules = []
+    for i, spec in enumerate(specs):
+        where = f"custom_rules[{i}]"
+        if not isinstance(spec, dict):
+            raise ValueError(f"{where} must be an object")
+        name, when, weight = spec.get("name"), spec.get("when"), spec.get("weight")
+        if not isinstance(name, str) or not name.isidentifier():
+            raise ValueError(f"{where}.name must be an identifier")
+        if any(r.name == name for r in rules):
+            raise ValueError(f"{where}.name {name!r} is used twice")
+        if not isinstance(when, str):
+            raise ValueError(f"{where}.when must be a string")
+        if not isinstance(weight, (int, float)) or isinstance(weight, bool):
+            raise ValueError(f"{where}.weight must be a number")
+        try:
+            rules.append(compile_rule(name, when, weight))
+        except ValueError as e:
+            raise ValueError(f"{where}.when: {e}")
+    return tuple(rules)
@@ -0,0 +1,67 @@
+"""
+Bounded in-process LRU cache in front of decision_engine.assess_txn.
+
+Entries are keyed on decision_engine.feature_key, i.e. only the normalized inputs
+the rules read, and are dropped automatically when a different RulePlan is used.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import decision_engine as de
+
+
+class DecisionCache:
+    def __init__(self, maxsize: int):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._plan: Optional[de.RulePlan] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def score(self, txn: Any, plan: de.RulePlan) -> Dict[str, Any]:
+        """Same result as de.assess_txn(txn, plan). The returned dict is shared: don't mutate it."""
+        key = de.feature_key(txn, plan)
+        with self._lock:
+            if plan is not self._plan:
+                # Active config changed: every cached decision is stale
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._plan = plan
+            res = self._entries.get(key)
+            if res is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return res
+            self.misses += 1
+        res = de.assess_txn(txn, plan)
+        with self._lock:
+            if plan is self._plan:
+                self._entries[key] = res
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return res
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -1,6 +1,41 @@
+from __future__ import annotations
+
 import argparse
-import pandas as pd
-from typing import Dict, Any, List
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, Any, List, Mapping, Optional, Tuple
+
+import custom_rules
+import metrics
+
+class _LazyModule:
+    # Imports the real module on first attribute access and then replaces itself
+    # in this module's globals, so the single-transaction API path (assess_txn)
+    # never pays for numpy/pandas. Only the frame and file paths load them.
+    def __init__(self, name: str, alias: str):
+        self._name = name
+        self._alias = alias
+
+    def __getattr__(self, attr: str):
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+else:
+    np = _LazyModule("numpy", "np")
+    pd = _LazyModule("pandas", "pd")
 
 DECISION_ACCEPTED = "ACCEPTED"
 DECISION_IN_REVIEW = "IN_REVIEW"
@@ -15,6 +50,8 @@ DEFAULT_CONFIG = {
     },
     "latency_ms_extreme": 2500,
     "chargeback_hard_block": 2,
+    # Transactions in the last hour from the same card BIN, IP or device (velocity_1h)
+    "velocity_burst_1h": 10,
     "score_weights": {
         "ip_risk": {"low": 0, "medium": 2, "high": 4},
         "email_risk": {"low": 0, "medium": 1, "high": 3, "new_domain": 2},
@@ -25,6 +62,7 @@ DEFAULT_CONFIG = {
         "high_amount": 2,
         "latency_extreme": 2,
         "new_user_high_amount": 2,
+        "velocity_burst": 2,
     },
     "score_to_decision": {
         "reject_at": 10,
@@ -44,6 +82,92 @@ try:
 except Exception:
     pass
 
+# Field defaults of a /transaction request. app.Transaction declares its fields with
+# these, and the socket front end fills missing fields from them, so both score alike.
+TRANSACTION_DEFAULTS: Dict[str, Any] = {
+    "transaction_id": None, "amount_mxn": 0.0, "customer_txn_30d": 0, "geo_state": None, "device_type": None,
+    "chargeback_count": 0, "hour": 12, "product_type": "digital", "latency_ms": 0, "user_reputation": "new",
+    "device_fingerprint_risk": "low", "ip_risk": "low", "email_risk": "low", "bin_country": "MX", "ip_country": "MX",
+    "customer_id": None, "card_bin": None, "ip_address": None, "device_id": None,
+}
+
+_WEIGHT_TABLES = ("ip_risk", "email_risk", "device_fingerprint_risk", "user_reputation")
+_WEIGHT_SCALARS = ("night_hour", "geo_mismatch", "high_amount", "latency_extreme", "new_user_high_amount")
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def validate_config(cfg: Any) -> None:
+    """Raise ValueError listing every problem that would break scoring with cfg."""
+    errors: List[str] = []
+
+    def number_table(path: str, table: Any) -> None:
+        if not isinstance(table, dict) or not table:
+            errors.append(f"{path} must be a non-empty object")
+            return
+        for key, value in table.items():
+            if not _is_number(value):
+                errors.append(f"{path}.{key} must be a number")
+
+    if not isinstance(cfg, dict):
+        raise ValueError("config must be an object")
+    number_table("amount_thresholds", cfg.get("amount_thresholds"))
+    if isinstance(cfg.get("amount_thresholds"), dict) and "_default" not in cfg["amount_thresholds"]:
+        errors.append("amount_thresholds._default is required")
+    for key in ("latency_ms_extreme", "chargeback_hard_block"):
+        if not _is_number(cfg.get(key)):
+            errors.append(f"{key} must be a number")
+    if "velocity_burst_1h" in cfg and not _is_number(cfg["velocity_burst_1h"]):
+        errors.append("velocity_burst_1h must be a number")
+    weights = cfg.get("score_weights")
+    if not isinstance(weights, dict):
+        errors.append("score_weights must be an object")
+    else:
+        for key in _WEIGHT_TABLES:
+            number_table(f"score_weights.{key}", weights.get(key))
+        for key in _WEIGHT_SCALARS:
+            if not _is_number(weights.get(key)):
+                errors.append(f"score_weights.{key} must be a number")
+        if "velocity_burst" in weights and not _is_number(weights["velocity_burst"]):
+            errors.append("score_weights.velocity_burst must be a number")
+    mapping = cfg.get("score_to_decision")
+    if not isinstance(mapping, dict) or not all(_is_number(mapping.get(k)) for k in ("reject_at", "review_at")):
+        errors.append("score_to_decision.reject_at and review_at must be numbers")
+    elif mapping["review_at"] > mapping["reject_at"]:
+        errors.append("score_to_decision.review_at must not exceed reject_at")
+    if "custom_rules" in cfg:
+        try:
+            custom_rules.compile_rules(cfg["custom_rules"])
+        except ValueError as e:
+            errors.append(str(e))
+    if errors:
+        raise ValueError("; ".join(errors))
+
+# Rule names as they appear at the start of each entry in "reasons"; "custom"
+# stands for every rule in the config's custom_rules
+RULE_NAMES = ("hard_block", "ip_risk", "email_risk", "device_fingerprint_risk", "user_reputation", "night_hour",
+              "geo_mismatch", "high_amount", "new_user_high_amount", "latency_extreme", "velocity_burst", "custom",
+              "frequency_buffer")
+
+# Bit of each rule in a reason_mask. "custom" was added last and takes the next
+# free bit, so masks written before it keep their meaning.
+RULE_BITS = {name: 1 << i for i, name in enumerate(n for n in RULE_NAMES if n != "custom")}
+RULE_BITS["custom"] = 1 << len(RULE_BITS)
+
+def _custom_rules(cfg: Dict[str, Any]) -> Tuple[custom_rules.CustomRule, ...]:
+    # Compiled once per distinct rule (lru_cache in custom_rules), so this is cheap per call
+    specs = cfg.get("custom_rules")
+    return custom_rules.compile_rules(specs) if specs else ()
+
+def rules_from_mask(mask: int) -> List[str]:
+    return [name for name in RULE_NAMES if mask & RULE_BITS[name]]
+
+def fired_rules(reasons: str) -> List[str]:
+    # "night_hour:23(+1);frequency_buffer(-1)" -> ["night_hour", "frequency_buffer"]
+    if not reasons:
+        return []
+    return [r.split(":", 1)[0].split("(", 1)[0] for r in reasons.split(";")]
+
 def is_night(hour: int) -> bool:
     return hour >= 22 or hour <= 5
 
@@ -111,6 +235,20 @@ def assess_row(row: pd.Series, cfg: Dict[str, Any]) -> Dict[str, Any]:
         score += add
         reasons.append(f"latency_extreme:{lat}ms(+{add})")
 
+    # Velocity burst (optional in older configs)
+    vel = int(row.get("velocity_1h", 0))
+    burst_at = cfg.get("velocity_burst_1h")
+    if burst_at is not None and vel >= burst_at:
+        add = cfg["score_weights"].get("velocity_burst", 0)
+        score += add
+        reasons.append(f"velocity_burst:{vel}/1h(+{add})")
+
+    # Custom rules from the config
+    for rule in _custom_rules(cfg):
+        if rule.test(row.get):
+            score += rule.weight
+            reasons.append(rule.reason)
+
     # Frequency buffer for trusted/recurrent
     freq = int(row.get("customer_txn_30d", 0))
     if rep in ("recurrent", "trusted") and freq >= 3 and score > 0:
@@ -127,27 +265,1065 @@ def assess_row(row: pd.Series, cfg: Dict[str, Any]) -> Dict[str, Any]:
 
     return {"decision": decision, "risk_score": int(score), "reasons": ";".join(reasons)}
 
-def run(input_csv: str, output_csv: str, config: Dict[str, Any] = None) -> pd.DataFrame:
+# --- Precompiled rule plan (single-transaction fast path, no pandas) ---
+
+@dataclass(frozen=True)
+class RulePlan:
+    """Flat, immutable view of a config with the reason strings precomputed.
+
+    Build it once with compile_config() and reuse it for every assess_txn() call.
+    """
+    chargeback_hard_block: Any
+    # (field, default, {value: (add, reason)}) for ip/email/device risk
+    categorical: Tuple[Tuple[str, str, Mapping[str, Tuple[Any, str]]], ...]
+    user_reputation: Mapping[str, Tuple[Any, str]]
+    night_hour: Any
+    geo_mismatch: Any
+    amount_thresholds: Mapping[str, Any]
+    default_amount_threshold: Any
+    high_amount: Any
+    new_user_high_amount: Any
+    new_user_high_amount_reason: str
+    latency_ms_extreme: Any
+    latency_extreme: Any
+    velocity_burst_1h: Any  # None disables the rule
+    velocity_burst: Any
+    reject_at: Any
+    review_at: Any
+    custom_rules: Tuple[custom_rules.CustomRule, ...] = ()
+
+def _weight_table(field: str, mapping: Dict[str, Any]) -> Mapping[str, Tuple[Any, str]]:
+    # Only lowercase keys can ever match, since assess_row lowers the value first
+    table = {}
+    for val, add in mapping.items():
+        if val != val.lower():
+            continue
+        # assess_row writes "+" before any weight, except for user_reputation's negative ones
+        sign = "" if field == "user_reputation" and add < 0 else "+"
+        table[val] = (add, f"{field}:{val}({sign}{add})" if add else "")
+    return MappingProxyType(table)
+
+def compile_config(cfg: Dict[str, Any]) -> RulePlan:
+    weights = cfg["score_weights"]
+    thresholds = cfg["amount_thresholds"]
+    return RulePlan(
+        chargeback_hard_block=cfg["chargeback_hard_block"],
+        categorical=tuple((field, "low", _weight_table(field, weights[field]))
+                          for field in ("ip_risk", "email_risk", "device_fingerprint_risk")),
+        user_reputation=_weight_table("user_reputation", weights["user_reputation"]),
+        night_hour=weights["night_hour"],
+        geo_mismatch=weights["geo_mismatch"],
+        amount_thresholds=MappingProxyType(dict(thresholds)),
+        default_amount_threshold=thresholds.get("_default"),
+        high_amount=weights["high_amount"],
+        new_user_high_amount=weights["new_user_high_amount"],
+        new_user_high_amount_reason=f"new_user_high_amount(+{weights['new_user_high_amount']})",
+        latency_ms_extreme=cfg["latency_ms_extreme"],
+        latency_extreme=weights["latency_extreme"],
+        velocity_burst_1h=cfg.get("velocity_burst_1h"),
+        velocity_burst=weights.get("velocity_burst", 0),
+        reject_at=cfg["score_to_decision"]["reject_at"],
+        review_at=cfg["score_to_decision"]["review_at"],
+        custom_rules=_custom_rules(cfg),
+    )
+
+def _lookup(table: Mapping[str, Tuple[Any, str]], raw: Any) -> Tuple[str, Optional[Tuple[Any, str]]]:
+    val = raw if raw.__class__ is str and raw in table else str(raw).lower()
+    return val, table.get(val)
+
+def assess_txn(txn: Any, plan: RulePlan) -> Dict[str, Any]:
+    """Score one transaction given as a dict, a pandas Series or a Pydantic model.
+
+    Same rules and output as assess_row, without pandas or config traversal.
+    """
+    get = getattr(txn, "get", None)
+    if get is None:
+        get = lambda name, default: getattr(txn, name, default)  # noqa: E731
+
+    # Hard block: repeated chargebacks + high IP risk
+    ip, _ = _lookup(plan.categorical[0][2], get("ip_risk", "low"))
+    if int(get("chargeback_count", 0)) >= plan.chargeback_hard_block and ip == "high":
+        return {"decision": DECISION_REJECTED, "risk_score": 100, "reasons": "hard_block:chargebacks>=2+ip_high"}
+
+    score = 0
+    reasons: List[str] = []
+
+    # Categorical risks
+    for field, default, table in plan.categorical:
+        _, hit = _lookup(table, get(field, default))
+        if hit is not None and hit[0]:
+            score += hit[0]
+            reasons.append(hit[1])
+
+    # Reputation
+    rep, hit = _lookup(plan.user_reputation, get("user_reputation", "new"))
+    if hit is not None and hit[0]:
+        score += hit[0]
+        reasons.append(hit[1])
+
+    # Night hour
+    hr = int(get("hour", 12))
+    if hr >= 22 or hr <= 5:
+        score += plan.night_hour
+        reasons.append(f"night_hour:{hr}(+{plan.night_hour})")
+
+    # Geo mismatch
+    bin_c = str(get("bin_country", "")).upper()
+    ip_c = str(get("ip_country", "")).upper()
+    if bin_c and ip_c and bin_c != ip_c:
+        score += plan.geo_mismatch
+        reasons.append(f"geo_mismatch:{bin_c}!={ip_c}(+{plan.geo_mismatch})")
+
+    # High amount for product type
+    amount = float(get("amount_mxn", 0.0))
+    ptype = str(get("product_type", "_default")).lower()
+    if amount >= plan.amount_thresholds.get(ptype, plan.default_amount_threshold):
+        score += plan.high_amount
+        reasons.append(f"high_amount:{ptype}:{amount}(+{plan.high_amount})")
+        if rep == "new":
+            score += plan.new_user_high_amount
+            reasons.append(plan.new_user_high_amount_reason)
+
+    # Extreme latency
+    lat = int(get("latency_ms", 0))
+    if lat >= plan.latency_ms_extreme:
+        score += plan.latency_extreme
+        reasons.append(f"latency_extreme:{lat}ms(+{plan.latency_extreme})")
+
+    # Velocity burst
+    vel = int(get("velocity_1h", 0))
+    if plan.velocity_burst_1h is not None and vel >= plan.velocity_burst_1h:
+        score += plan.velocity_burst
+        reasons.append(f"velocity_burst:{vel}/1h(+{plan.velocity_burst})")
+
+    # Custom rules from the config
+    for rule in plan.custom_rules:
+        if rule.test(get):
+            score += rule.weight
+            reasons.append(rule.reason)
+
+    # Frequency buffer for trusted/recurrent
+    freq = int(get("customer_txn_30d", 0))
+    if (rep == "recurrent" or rep == "trusted") and freq >= 3 and score > 0:
+        score -= 1
+        reasons.append("frequency_buffer(-1)")
+
+    # Decision mapping
+    if score >= plan.reject_at:
+        decision = DECISION_REJECTED
+    elif score >= plan.review_at:
+        decision = DECISION_IN_REVIEW
+    else:
+        decision = DECISION_ACCEPTED
+
+    return {"decision": decision, "risk_score": int(score), "reasons": ";".join(reasons)}
+
+
+def feature_key(txn: Any, plan: RulePlan) -> Tuple[Any, ...]:
+    """Normalized tuple of everything assess_txn's output depends on under `plan`.
+
+    Two transactions with the same key get identical results, so it can be used
+    to memoize scoring. Inputs that cannot change the result collapse to None.
+    """
+    get = getattr(txn, "get", None)
+    if get is None:
+        get = lambda name, default: getattr(txn, name, default)  # noqa: E731
+
+    ip, _ = _lookup(plan.categorical[0][2], get("ip_risk", "low"))
+    if int(get("chargeback_count", 0)) >= plan.chargeback_hard_block and ip == "high":
+        return ("hard_block",)
+    email, _ = _lookup(plan.categorical[1][2], get("email_risk", "low"))
+    device, _ = _lookup(plan.categorical[2][2], get("device_fingerprint_risk", "low"))
+    rep, _ = _lookup(plan.user_reputation, get("user_reputation", "new"))
+    hr = int(get("hour", 12))
+    bin_c = str(get("bin_country", "")).upper()
+    ip_c = str(get("ip_country", "")).upper()
+    amount = float(get("amount_mxn", 0.0))
+    ptype = str(get("product_type", "_default")).lower()
+    lat = int(get("latency_ms", 0))
+    vel = int(get("velocity_1h", 0))
+    freq = int(get("customer_txn_30d", 0))
+    return (
+        ip if ip in plan.categorical[0][2] else None,
+        email if email in plan.categorical[1][2] else None,
+        device if device in plan.categorical[2][2] else None,
+        rep,
+        hr if (hr >= 22 or hr <= 5) else None,
+        (bin_c, ip_c) if (bin_c and ip_c and bin_c != ip_c) else None,
+        (ptype, amount) if amount >= plan.amount_thresholds.get(ptype, plan.default_amount_threshold) else None,
+        lat if lat >= plan.latency_ms_extreme else None,
+        vel if plan.velocity_burst_1h is not None and vel >= plan.velocity_burst_1h else None,
+        freq >= 3,
+        tuple(rule.test(get) for rule in plan.custom_rules),
+    )
+
+def _text_column(df: pd.DataFrame, name: str, default: str, case: Optional[str] = None) -> pd.Series:
+    # Mirrors str(row.get(name, default)), then .lower()/.upper(), for a whole column
+    if name not in df.columns:
+        return pd.Series(getattr(default, case)() if case else default, index=df.index, dtype=object)
+    col = df[name]
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        # Convert the few categories instead of every row; code -1 (missing) picks "nan"
+        cats = [*col.cat.categories.astype(str), "nan"]
+        if case:
+            cats = [getattr(c, case)() for c in cats]
+        return pd.Series(np.array(cats, dtype=object)[col.cat.codes.to_numpy()], index=df.index, dtype=object)
+    col = col.astype(str)
+    return getattr(col.str, case)() if case else col
+
+def _int_column(df: pd.DataFrame, name: str, default: int) -> np.ndarray:
+    # Mirrors int(row.get(name, default)) for a whole column
+    if name not in df.columns:
+        return np.full(len(df), default, dtype=np.int64)
+    return df[name].to_numpy().astype(np.int64)
+
+def _float_column(df: pd.DataFrame, name: str, default: float) -> pd.Series:
+    if name not in df.columns:
+        return pd.Series(default, index=df.index, dtype=np.float64)
+    return df[name].astype(np.float64)
+
+def _reason_piece(mask: np.ndarray, text) -> np.ndarray:
+    # One ";"-terminated reason per fired row, "" elsewhere
+    return np.where(mask, np.asarray(text, dtype=object) + ";", "")
+
+def _mapped_piece(vals: pd.Series, texts: Dict[str, str]) -> np.ndarray:
+    return (vals.map(texts) + ";").fillna("").to_numpy(dtype=object)
+
+def _frame_features(df: pd.DataFrame) -> Dict[str, Any]:
+    # Config-independent input columns and flags, parsed once and shared by every config
+    hr = _int_column(df, "hour", 12)
+    bin_c = _text_column(df, "bin_country", "", "upper")
+    ip_c = _text_column(df, "ip_country", "", "upper")
+    lat = _int_column(df, "latency_ms", 0)
+    vel = _int_column(df, "velocity_1h", 0)
+    rep = _text_column(df, "user_reputation", "new", "lower")
+    return {
+        "index": df.index,
+        "frame": df,  # custom rules read their own columns from it, see _custom_hits
+        "ip_risk": _text_column(df, "ip_risk", "low", "lower"),
+        "email_risk": _text_column(df, "email_risk", "low", "lower"),
+        "device_fingerprint_risk": _text_column(df, "device_fingerprint_risk", "low", "lower"),
+        "chargeback_count": _int_column(df, "chargeback_count", 0),
+        "user_reputation": rep,
+        "new_user": (rep == "new").to_numpy(),
+        "buffer_eligible": rep.isin(["recurrent", "trusted"]).to_numpy() & (_int_column(df, "customer_txn_30d", 0) >= 3),
+        "night": (hr >= 22) | (hr <= 5),
+        "night_text": "night_hour:" + hr.astype(str).astype(object),
+        "geo": ((bin_c != "") & (ip_c != "") & (bin_c != ip_c)).to_numpy(),
+        "geo_text": "geo_mismatch:" + bin_c + "!=" + ip_c,
+        "amount": _float_column(df, "amount_mxn", 0.0),
+        "product_type": _text_column(df, "product_type", "_default", "lower"),
+        "latency_ms": lat,
+        "latency_text": "latency_extreme:" + lat.astype(str).astype(object),
+        "velocity_1h": vel,
+        "velocity_text": "velocity_burst:" + vel.astype(str).astype(object),
+    }
+
+_CATEGORICAL_FIELDS = ("ip_risk", "email_risk", "device_fingerprint_risk")
+DECISION_CATEGORIES = (DECISION_ACCEPTED, DECISION_IN_REVIEW, DECISION_REJECTED)
+HARD_BLOCK_REASON = "hard_block:chargebacks>=2+ip_high"
+REASON_FORMATS = ("text", "mask", "both")
+
+def _decision_dtype() -> pd.CategoricalDtype:
+    return pd.CategoricalDtype(list(DECISION_CATEGORIES))
+
+def _custom_column(df: pd.DataFrame, field: str) -> np.ndarray:
+    kind, default = custom_rules.FIELDS[field]
+    if kind == "text":
+        return _text_column(df, field, default, "lower").to_numpy(dtype=object)
+    if kind == "int":
+        return _int_column(df, field, default)
+    return _float_column(df, field, default).to_numpy()
+
+def _custom_hits(f: Dict[str, Any], cfg: Dict[str, Any]) -> List[Tuple[custom_rules.CustomRule, np.ndarray]]:
+    # Rows matching each custom rule of cfg; columns and results are kept in f, so
+    # other configs and the reason text reuse them
+    columns = f.setdefault("custom_columns", {})
+    hits = f.setdefault("custom_hits", {})
+    out = []
+    for rule in _custom_rules(cfg):
+        if rule.when not in hits:
+            for field in rule.fields:
+                if field not in columns:
+                    columns[field] = _custom_column(f["frame"], field)
+            hits[rule.when] = np.asarray(rule.vector(columns), dtype=bool)
+        out.append((rule, hits[rule.when]))
+    return out
+
+def _hard_block_rows(f: Dict[str, Any], cfg: Dict[str, Any]) -> np.ndarray:
+    return (f["chargeback_count"] >= cfg["chargeback_hard_block"]) & (f["ip_risk"] == "high").to_numpy()
+
+def _high_amount_rows(f: Dict[str, Any], cfg: Dict[str, Any]) -> np.ndarray:
+    # High amount for product type
+    thresholds = cfg["amount_thresholds"]
+    limit = f["product_type"].map(thresholds).astype(np.float64).fillna(np.float64(thresholds.get("_default", np.nan)))
+    return (f["amount"] >= limit).to_numpy()
+
+def _burst_rows(f: Dict[str, Any], cfg: Dict[str, Any]) -> np.ndarray:
+    burst_at = cfg.get("velocity_burst_1h")
+    if burst_at is None:
+        return np.zeros(len(f["index"]), dtype=bool)
+    return f["velocity_1h"] >= burst_at
+
+def _score_features(f: Dict[str, Any], cfg: Dict[str, Any], reasons: str = "text") -> pd.DataFrame:
+    # Scores and records fired rules as a RULE_BITS mask; the reason text is only
+    # built from the mask when reasons is "text" or "both"
+    if reasons not in REASON_FORMATS:
+        raise ValueError(f"reasons must be one of {REASON_FORMATS}, got {reasons!r}")
+    weights = cfg["score_weights"]
+    n = len(f["index"])
+    score = np.zeros(n, dtype=np.int64)
+    mask = np.zeros(n, dtype=np.int32)
+
+    def fire(rule: str, fired: np.ndarray, add) -> None:
+        nonlocal score, mask
+        score = score + np.where(fired, add, 0)
+        mask = mask | np.where(fired, RULE_BITS[rule], 0).astype(np.int32)
+
+    hard_block = _hard_block_rows(f, cfg)
+
+    # Categorical risks and reputation
+    for field in (*_CATEGORICAL_FIELDS, "user_reputation"):
+        add = f[field].map(weights[field]).fillna(0).to_numpy()
+        fire(field, add != 0, add)
+
+    fire("night_hour", f["night"], weights["night_hour"])
+    fire("geo_mismatch", f["geo"], weights["geo_mismatch"])
+
+    high = _high_amount_rows(f, cfg)
+    fire("high_amount", high, weights["high_amount"])
+    fire("new_user_high_amount", high & f["new_user"], weights["new_user_high_amount"])
+
+    fire("latency_extreme", f["latency_ms"] >= cfg["latency_ms_extreme"], weights["latency_extreme"])
+    fire("velocity_burst", _burst_rows(f, cfg), weights.get("velocity_burst", 0))
+    for rule, hit in _custom_hits(f, cfg):
+        fire("custom", hit, rule.weight)
+
+    # Frequency buffer for trusted/recurrent
+    fire("frequency_buffer", f["buffer_eligible"] & (score > 0), -1)
+
+    # Decision mapping, as codes into DECISION_CATEGORIES
+    codes = np.select([score >= cfg["score_to_decision"]["reject_at"],
+                       score >= cfg["score_to_decision"]["review_at"]], [2, 1], default=0).astype(np.int8)
+
+    # Hard block overrides everything else
+    codes[hard_block] = 2
+    score = np.where(hard_block, 100, score).astype(np.int16)
+    mask = np.where(hard_block, RULE_BITS["hard_block"], mask).astype(np.int32)
+
+    out = {"decision": pd.Categorical.from_codes(codes, dtype=_decision_dtype()), "risk_score": score}
+    if reasons in ("text", "both"):
+        out["reasons"] = _reason_text(f, cfg, mask)
+    if reasons in ("mask", "both"):
+        out["reason_mask"] = mask
+    return pd.DataFrame(out, index=f["index"])
+
+def _reason_text(f: Dict[str, Any], cfg: Dict[str, Any], mask: np.ndarray) -> np.ndarray:
+    # The assess_row reasons string for each row, rebuilt from its fired-rule bits
+    weights = cfg["score_weights"]
+    bit = lambda rule: (mask & RULE_BITS[rule]) != 0  # noqa: E731
+    pieces: List[np.ndarray] = []
+    for field in _CATEGORICAL_FIELDS:
+        pieces.append(_mapped_piece(f[field].where(bit(field)),
+                                    {val: f"{field}:{val}(+{add})" for val, add in weights[field].items() if add}))
+    pieces.append(_mapped_piece(f["user_reputation"].where(bit("user_reputation")),
+                                {val: f"user_reputation:{val}({('+' if add>=0 else '')}{add})"
+                                 for val, add in weights["user_reputation"].items() if add}))
+    pieces.append(_reason_piece(bit("night_hour"), f["night_text"] + f"(+{weights['night_hour']})"))
+    pieces.append(_reason_piece(bit("geo_mismatch"), f["geo_text"] + f"(+{weights['geo_mismatch']})"))
+    pieces.append(_reason_piece(bit("high_amount"), "high_amount:" + f["product_type"] + ":"
+                                + f["amount"].astype(str) + f"(+{weights['high_amount']})"))
+    pieces.append(_reason_piece(bit("new_user_high_amount"), f"new_user_high_amount(+{weights['new_user_high_amount']})"))
+    pieces.append(_reason_piece(bit("latency_extreme"), f["latency_text"] + f"ms(+{weights['latency_extreme']})"))
+    pieces.append(_reason_piece(bit("velocity_burst"), f["velocity_text"] + f"/1h(+{weights.get('velocity_burst', 0)})"))
+    for rule, hit in _custom_hits(f, cfg):
+        pieces.append(_reason_piece(bit("custom") & hit, rule.reason))
+    pieces.append(_reason_piece(bit("frequency_buffer"), "frequency_buffer(-1)"))
+
+    joined = np.full(len(mask), "", dtype=object)
+    for piece in pieces:
+        joined = joined + piece
+    text = pd.Series(joined, dtype=object).str[:-1].to_numpy(dtype=object)
+    text[bit("hard_block")] = HARD_BLOCK_REASON
+    return text
+
+def assess_frame(df: pd.DataFrame, cfg: Dict[str, Any], reasons: str = "text") -> pd.DataFrame:
+    """Column-wise equivalent of applying assess_row to every row of df.
+
+    Returns a frame aligned with df.index holding decision (categorical),
+    risk_score (int16) and reasons.
+    With reasons="mask" the reasons column is replaced by reason_mask, an int32
+    bitmask of the fired rules (see RULE_BITS); "both" returns the two.
+    """
+    return _score_features(_frame_features(df), cfg, reasons)
+
+def decode_reasons(df: pd.DataFrame, cfg: Dict[str, Any] = None, mask: Optional[np.ndarray] = None) -> pd.Series:
+    """Full reasons text for rows scored with reasons="mask".
+
+    df needs the input columns; the mask is taken from df["reason_mask"] unless given.
+    cfg must be the config the rows were scored with.
+    """
+    mask = np.asarray(df["reason_mask"] if mask is None else mask, dtype=np.int32)
+    return pd.Series(_reason_text(_frame_features(df), cfg or DEFAULT_CONFIG, mask), index=df.index, dtype=object)
+
+def reason_names(mask) -> pd.Series:
+    """"ip_risk;night_hour"-style rule names for each mask, without needing the inputs."""
+    mask = pd.Series(mask)
+    names = {m: ";".join(rules_from_mask(int(m))) for m in mask.unique()}
+    return mask.map(names).astype(object)
+
+# --- Rule activation matrix (re-scoring under new weights) ---
+
+# Rules whose contribution is a single scalar weight; the weight-table rules get
+# one column per level ("ip_risk:high") and custom rules one per rule ("custom:name")
+_ACTIVATION_SCALARS = ("night_hour", "geo_mismatch", "high_amount", "new_user_high_amount",
+                       "latency_extreme", "velocity_burst")
+# Config entries that only change weights or the decision mapping, not which rules fire
+_REWEIGHT_KEYS = ("score_weights", "score_to_decision", "custom_rules")
+
+@dataclass(frozen=True)
+class Activations:
+    columns: Tuple[str, ...]
+    matrix: np.ndarray               # bool, one row per transaction, one column per weight
+    hard_block: np.ndarray           # bool per row
+    buffer_eligible: np.ndarray      # bool per row, frequency buffer applies if the score is > 0
+    config: Dict[str, Any]           # config the activations were computed with
+    transaction_id: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.hard_block)
+
+def _activation_columns(cfg: Dict[str, Any]) -> Tuple[str, ...]:
+    weights = cfg["score_weights"]
+    tables = [f"{field}:{level}" for field in _WEIGHT_TABLES for level in weights[field]]
+    return (*tables, *_ACTIVATION_SCALARS, *(f"custom:{rule.name}" for rule in _custom_rules(cfg)))
+
+def activation_matrix(df: pd.DataFrame, cfg: Dict[str, Any] = None) -> Activations:
+    """Which weight each row of df picks up under cfg, for rescore() with other weights."""
+    cfg = cfg or DEFAULT_CONFIG
+    f = _frame_features(df)
+    high = _high_amount_rows(f, cfg)
+    scalars = {
+        "night_hour": f["night"],
+        "geo_mismatch": f["geo"],
+        "high_amount": high,
+        "new_user_high_amount": high & f["new_user"],
+        "latency_extreme": f["latency_ms"] >= cfg["latency_ms_extreme"],
+        "velocity_burst": _burst_rows(f, cfg),
+    }
+    columns = _activation_columns(cfg)
+    matrix = np.empty((len(df), len(columns)), dtype=bool)
+    codes = {field: pd.Categorical(f[field], categories=list(cfg["score_weights"][field])).codes
+             for field in _WEIGHT_TABLES}
+    custom = {rule.name: hit for rule, hit in _custom_hits(f, cfg)}
+    for i, column in enumerate(columns):
+        field, _, level = column.partition(":")
+        if field == "custom":
+            matrix[:, i] = custom[level]
+        elif level:
+            matrix[:, i] = codes[field] == list(cfg["score_weights"][field]).index(level)
+        else:
+            matrix[:, i] = scalars[field]
+    tid = df["transaction_id"].to_numpy() if "transaction_id" in df.columns else None
+    return Activations(columns, matrix, _hard_block_rows(f, cfg), f["buffer_eligible"], cfg, tid)
+
+def _activation_weights(acts: Activations, cfg: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    # Weight vector aligned with acts.columns, and which columns set their rule's
+    # reason bit when active; refuses configs whose rules fire differently
+    changed = sorted(k for k in set(cfg) | set(acts.config) if k not in _REWEIGHT_KEYS
+                     and cfg.get(k) != acts.config.get(k))
+    recorded = {rule.name: rule.when for rule in _custom_rules(acts.config)}
+    rules = {rule.name: rule for rule in _custom_rules(cfg)}
+    changed += [f"custom_rules.{name}" for name, rule in rules.items()
+                if name in recorded and recorded[name] != rule.when]
+    if changed:
+        raise ValueError(f"Activations cannot be re-scored across changes to {', '.join(changed)}")
+    weights = cfg["score_weights"]
+    missing = [f"{field}:{level}" for field in _WEIGHT_TABLES for level, add in weights[field].items()
+               if add and f"{field}:{level}" not in acts.columns]
+    missing += [f"custom:{name}" for name in rules if name not in recorded]
+    if missing:
+        raise ValueError(f"Activations have no column for {', '.join(missing)}")
+    # float64 like assess_frame's running score, so fractional weights add up before
+    # risk_score is truncated
+    out = np.zeros(len(acts.columns), dtype=np.float64)
+    live = np.zeros(len(acts.columns), dtype=bool)
+    for i, column in enumerate(acts.columns):
+        field, _, level = column.partition(":")
+        if field == "custom":
+            # Rules dropped from cfg no longer count
+            out[i] = rules[level].weight if level in rules else 0
+            live[i] = level in rules
+        elif level:
+            # Table rules only fire when the row's level has a non-zero weight
+            out[i] = weights[field].get(level, 0)
+            live[i] = out[i] != 0
+        else:
+            out[i] = weights.get(field, 0)
+            live[i] = True
+    return out, live
+
+def rescore(acts: Activations, cfg: Dict[str, Any]) -> pd.DataFrame:
+    """assess_frame(df, cfg, reasons="mask") for the rows behind acts, without df.
+
+    cfg may change score_weights, score_to_decision and custom rule weights (or drop
+    custom rules); anything else must match the config the activations were
+    computed with.
+    """
+    w, live = _activation_weights(acts, cfg)
+    score = acts.matrix @ w
+    mask = np.zeros(len(acts), dtype=np.int32)
+    for rule in RULE_NAMES:
+        cols = [i for i, c in enumerate(acts.columns) if c.partition(":")[0] == rule]
+        if cols:
+            fired = (acts.matrix[:, cols] @ live[cols]) > 0
+            mask |= np.where(fired, RULE_BITS[rule], 0).astype(np.int32)
+    buffer = acts.buffer_eligible & (score > 0)
+    score = score - buffer
+    mask |= np.where(buffer, RULE_BITS["frequency_buffer"], 0).astype(np.int32)
+    codes = np.select([score >= cfg["score_to_decision"]["reject_at"],
+                       score >= cfg["score_to_decision"]["review_at"]], [2, 1], default=0).astype(np.int8)
+    codes[acts.hard_block] = 2
+    return pd.DataFrame({
+        "decision": pd.Categorical.from_codes(codes, dtype=_decision_dtype()),
+        "risk_score": np.where(acts.hard_block, 100, score).astype(np.int16),
+        "reason_mask": np.where(acts.hard_block, RULE_BITS["hard_block"], mask).astype(np.int32),
+    })
+
+def _write_activations(path: str, columns: Tuple[str, ...], rows: int, packed_matrix: np.ndarray,
+                       hard_block: np.ndarray, buffer_eligible: np.ndarray, config: Dict[str, Any],
+                       transaction_id: Optional[np.ndarray]) -> None:
+    arrays = {
+        "columns": np.array(columns),
+        "rows": np.array(rows),
+        "matrix": packed_matrix,
+        "hard_block": np.packbits(hard_block),
+        "buffer_eligible": np.packbits(buffer_eligible),
+        "config": np.array(json.dumps(config)),
+    }
+    if transaction_id is not None:
+        arrays["transaction_id"] = transaction_id
+    with open(path, "wb") as fh:
+        np.savez(fh, **arrays)
+
+def save_activations(acts: Activations, path: str) -> None:
+    """Write acts to an .npz file, one bit per activation."""
+    _write_activations(path, acts.columns, len(acts), np.packbits(acts.matrix, axis=1), acts.hard_block,
+                       acts.buffer_eligible, acts.config, acts.transaction_id)
+
+class _ActivationSpool:
+    # Saves activations chunk by chunk: each chunk is bit-packed and appended to
+    # temporary files next to path, which are memory-mapped into the .npz at the
+    # end, so run_chunked's memory stays bounded by the chunk size
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self.columns: Optional[Tuple[str, ...]] = None
+        self.config: Optional[Dict[str, Any]] = None
+        self.has_ids = True
+        self._dir = tempfile.TemporaryDirectory(prefix=".activations-", dir=os.path.dirname(path) or ".")
+        self._files = {name: open(os.path.join(self._dir.name, name), "wb")
+                       for name in ("matrix", "hard_block", "buffer_eligible", "transaction_id")}
+
+    def add(self, acts: Activations) -> None:
+        if self.columns is None:
+            self.columns, self.config = acts.columns, acts.config
+        self._files["matrix"].write(np.packbits(acts.matrix, axis=1).tobytes())
+        self._files["hard_block"].write(acts.hard_block.astype(bool).tobytes())
+        self._files["buffer_eligible"].write(acts.buffer_eligible.astype(bool).tobytes())
+        self.has_ids = self.has_ids and acts.transaction_id is not None
+        if self.has_ids:
+            self._files["transaction_id"].write(np.asarray(acts.transaction_id, dtype=np.int64).tobytes())
+        self.rows += len(acts)
+
+    def _mapped(self, name: str, dtype, shape) -> np.ndarray:
+        if not self.rows:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(self._dir.name, name), dtype=dtype, mode="r", shape=shape)
+
+    def close(self) -> None:
+        try:
+            for fh in self._files.values():
+                fh.close()
+            if self.columns is not None:
+                width = (len(self.columns) + 7) // 8
+                _write_activations(self.path, self.columns, self.rows,
+                                   self._mapped("matrix", np.uint8, (self.rows, width)),
+                                   self._mapped("hard_block", bool, (self.rows,)),
+                                   self._mapped("buffer_eligible", bool, (self.rows,)), self.config,
+                                   self._mapped("transaction_id", np.int64, (self.rows,)) if self.has_ids else None)
+        finally:
+            self._dir.cleanup()
+
+def load_activations(path: str) -> Activations:
+    with np.load(path, allow_pickle=False) as npz:
+        columns = tuple(str(c) for c in npz["columns"])
+        rows = int(npz["rows"])
+        return Activations(
+            columns,
+            np.unpackbits(npz["matrix"], axis=1, count=len(columns)).astype(bool),
+            np.unpackbits(npz["hard_block"], count=rows).astype(bool),
+            np.unpackbits(npz["buffer_eligible"], count=rows).astype(bool),
+            json.loads(str(npz["config"])),
+            npz["transaction_id"] if "transaction_id" in npz.files else None,
+        )
+
+# --- Champion/challenger ---
+
+CHAMPION = "champion"
+SHADOW_PREFIX = "decision__"
+
+def assess_frame_multi(df: pd.DataFrame, configs: Dict[str, Dict[str, Any]],
+                       reasons: str = "text") -> Dict[str, pd.DataFrame]:
+    """Score df under several configs in one pass; the input columns are parsed only once.
+
+    Returns {name: assess_frame(df, cfg, reasons)} in the order of configs.
+    """
+    features = _frame_features(df)
+    return {name: _score_features(features, cfg, reasons) for name, cfg in configs.items()}
+
+def assess_with_challengers(df: pd.DataFrame, cfg: Dict[str, Any],
+                            challengers: Dict[str, Dict[str, Any]], reasons: str = "text") -> pd.DataFrame:
+    # Champion result columns plus one decision__<name> column per challenger.
+    # Challengers only contribute a decision, so their reasons are never rendered.
+    features = _frame_features(df)
+    scored = _score_features(features, cfg, reasons)
+    for name, challenger in challengers.items():
+        scored[SHADOW_PREFIX + name] = _score_features(features, challenger, "mask")["decision"].array
+    return scored
+
+def _decision_columns(scored: pd.DataFrame) -> Dict[str, np.ndarray]:
+    cols = {CHAMPION: scored["decision"].to_numpy()}
+    cols.update((c[len(SHADOW_PREFIX):], scored[c].to_numpy()) for c in scored.columns if c.startswith(SHADOW_PREFIX))
+    return cols
+
+def disagreement_counts(scored: pd.DataFrame) -> pd.DataFrame:
+    """Rows on which each pair of configs (champion and decision__* columns) decide differently."""
+    cols = _decision_columns(scored)
+    names = list(cols)
+    counts = np.array([[int((cols[a] != cols[b]).sum()) for b in names] for a in names], dtype=np.int64)
+    return pd.DataFrame(counts.reshape(len(names), len(names)), index=names, columns=names)
+
+def disagreement_matrix(scored: pd.DataFrame) -> pd.DataFrame:
+    # Same as disagreement_counts, as a fraction of the rows scored
+    return disagreement_counts(scored) / max(len(scored), 1)
+
+def load_challenger(spec: str) -> Tuple[str, Dict[str, Any]]:
+    """Parse a NAME=path.json challenger spec into (name, validated config)."""
+    name, sep, path = spec.partition("=")
+    name = name.strip()
+    if not sep or not name or not path:
+        raise ValueError(f"challenger must look like NAME=path.json, got {spec!r}")
+    if name == CHAMPION:
+        raise ValueError(f"{CHAMPION!r} is reserved for the active config")
+    with open(path) as fh:
+        try:
+            cfg = json.load(fh)
+        except ValueError as e:
+            raise ValueError(f"{path} is not valid JSON: {e}") from e
+    validate_config(cfg)
+    return name, cfg
+
+def assess_records(records: List[Dict[str, Any]], cfg: Dict[str, Any], reasons: str = "text") -> pd.DataFrame:
+    # Vectorized scoring for a batch of already-parsed transactions
+    return assess_frame(pd.DataFrame.from_records(records), cfg, reasons)
+
+# --- Batch file formats ---
+
+# Input columns read by the rules; everything else is passed through untouched
+RULE_COLUMNS = ("amount_mxn", "customer_txn_30d", "chargeback_count", "hour", "product_type", "latency_ms",
+                "user_reputation", "device_fingerprint_risk", "ip_risk", "email_risk", "bin_country", "ip_country",
+                "velocity_1h")
+ID_COLUMN = "transaction_id"
+# Explicit CSV dtypes for the rule columns: enumerations load as categoricals,
+# which write back the same text, instead of object strings
+CSV_DTYPES = {
+    "ip_risk": "category", "email_risk": "category", "device_fingerprint_risk": "category",
+    "user_reputation": "category", "product_type": "category", "bin_country": "category", "ip_country": "category",
+    "card_bin": "str",  # an identifier: keep leading zeros
+}
+# Counters are downcast after reading, and only int64 columns whose values all fit,
+# so passthrough output keeps its text (23.0 stays 23.0, 2500 stays 2500). Chunked
+# reads skip this: the dtype would depend on each chunk's values, and Parquet/Arrow
+# writers fix their schema from the first chunk.
+COUNTER_DTYPES = {"hour": "int8", "chargeback_count": "int16", "customer_txn_30d": "int32",
+                  "latency_ms": "int32", "velocity_1h": "int32"}
+DECISION_COLUMNS = ("decision", "risk_score", "reasons", "reason_mask")
+
+FORMAT_EXTENSIONS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet",
+                     ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    if fmt:
+        return fmt
+    return FORMAT_EXTENSIONS.get(os.path.splitext(path)[1].lower(), "csv")
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:  # pragma: no cover - depends on the environment
+        raise ImportError("Parquet/Arrow files need pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+def _projection(decisions_only: bool, cfg: Dict[str, Any], enrichers: Optional[List[Any]] = None) -> Optional[List[str]]:
+    # Custom rules and enrichers may read columns beyond RULE_COLUMNS
+    if not decisions_only:
+        return None
+    extra = [field for rule in _custom_rules(cfg) for field in rule.fields]
+    extra += [column for enricher in enrichers or () for column in enricher.columns]
+    return list(dict.fromkeys([ID_COLUMN, *RULE_COLUMNS, *extra]))
+
+def _enrich(df: pd.DataFrame, enrichers: Optional[List[Any]]) -> pd.DataFrame:
+    for enricher in enrichers or ():
+        df = enricher.enrich_frame(df)
+    return df
+
+def _arrow_batches(path: str, fmt: str, columns: Optional[List[str]], batch_size: Optional[int]):
+    # Yields pyarrow Tables; files are memory-mapped and only projected columns are decoded
+    pa = _pyarrow()
+    if fmt == "parquet":
+        pf = pa.parquet.ParquetFile(path, memory_map=True)
+        names = [c for c in columns if c in pf.schema_arrow.names] if columns else None
+        if batch_size is None or pf.metadata.num_rows == 0:
+            yield pf.read(columns=names)
+            return
+        for batch in pf.iter_batches(batch_size=batch_size, columns=names):
+            yield pa.Table.from_batches([batch])
+        return
+    # read_all() on a memory-mapped IPC file is zero-copy, so slicing it keeps memory bounded
+    reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+    names = [c for c in columns if c in reader.schema.names] if columns else reader.schema.names
+    table = reader.read_all().select(names)
+    if batch_size is None:
+        yield table
+        return
+    for offset in range(0, max(table.num_rows, 1), batch_size):
+        yield table.slice(offset, batch_size)
+
+def _compact_counters(df: pd.DataFrame) -> pd.DataFrame:
+    for name, dtype in COUNTER_DTYPES.items():
+        if name in df.columns and df[name].dtype == np.int64 and len(df):
+            info = np.iinfo(dtype)
+            if info.min <= df[name].min() and df[name].max() <= info.max:
+                df[name] = df[name].astype(dtype)
+    return df
+
+def read_transactions(path: str, fmt: Optional[str] = None, columns: Optional[List[str]] = None,
+                      chunksize: Optional[int] = None):
+    """Read a CSV, Parquet or Arrow IPC file, optionally projected to `columns`.
+
+    Returns a DataFrame, or an iterator of DataFrames when chunksize is given.
+    """
+    fmt = detect_format(path, fmt)
+    if fmt == "csv":
+        usecols = (lambda c: c in columns) if columns else None
+        frames = pd.read_csv(path, usecols=usecols, chunksize=chunksize, dtype=CSV_DTYPES)
+        return frames if chunksize else _compact_counters(frames)
+    tables = (t.to_pandas() for t in _arrow_batches(path, fmt, columns, chunksize))
+    return tables if chunksize else next(tables)
+
+class _DecisionWriter:
+    # Appends scored frames to a CSV, Parquet or Arrow IPC file
+    def __init__(self, path: str, fmt: str):
+        self.path, self.fmt = path, fmt
+        self._fh = None
+        self._writer = None
+        self._schema = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.fmt == "csv":
+            first = self._fh is None
+            if first:
+                self._fh = open(self.path, "w", newline="")
+            df.to_csv(self._fh, header=first, index=False)
+            return
+        pa = _pyarrow()
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            # The schema is fixed by the first chunk, but each chunk's categoricals carry
+            # their own dictionary (and index width), so they are stored as plain values.
+            # Parquet dictionary-encodes them again on disk.
+            table = table.cast(pa.schema([f.with_type(f.type.value_type) if pa.types.is_dictionary(f.type) else f
+                                          for f in table.schema]))
+            self._schema = table.schema
+            if self.fmt == "parquet":
+                self._writer = pa.parquet.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, self._schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_decisions(df: pd.DataFrame, path: str, fmt: Optional[str] = None) -> None:
+    with _DecisionWriter(path, detect_format(path, fmt)) as writer:
+        writer.write(df)
+
+def _output_frame(df: pd.DataFrame, decisions_only: bool) -> pd.DataFrame:
+    if not decisions_only:
+        return df
+    shadow = [c for c in df.columns if c.startswith(SHADOW_PREFIX)]
+    return df[[c for c in (ID_COLUMN, *DECISION_COLUMNS) if c in df.columns] + shadow]
+
+def _add_decisions(df: pd.DataFrame, scored: pd.DataFrame) -> pd.DataFrame:
+    # Append the result columns in place; df is always a frame we read ourselves
+    for c in scored.columns:
+        if c in DECISION_COLUMNS or c.startswith(SHADOW_PREFIX):
+            df[c] = scored[c].array
+    return df
+
+def _score(df: pd.DataFrame, cfg: Dict[str, Any], challengers: Optional[Dict[str, Dict[str, Any]]],
+           reasons: str = "text") -> pd.DataFrame:
+    if challengers:
+        return assess_with_challengers(df, cfg, challengers, reasons)
+    return assess_frame(df, cfg, reasons)
+
+def _score_part(part: pd.DataFrame, cfg: Dict[str, Any], challengers: Optional[Dict[str, Dict[str, Any]]] = None,
+                reasons: str = "text") -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    # Process-pool task: only the result columns travel back to the parent
+    start = time.perf_counter()
+    scored = _score(part, cfg, challengers, reasons)
+    return scored, {"pid": os.getpid(), "rows": len(part), "seconds": time.perf_counter() - start}
+
+def _worker_stats(tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    per_pid: Dict[int, Dict[str, Any]] = {}
+    for t in tasks:
+        agg = per_pid.setdefault(t["pid"], {"pid": t["pid"], "tasks": 0, "rows": 0, "seconds": 0.0})
+        agg["tasks"] += 1
+        agg["rows"] += t["rows"]
+        agg["seconds"] += t["seconds"]
+    return [dict(agg, rows_per_sec=_throughput(agg["rows"], agg["seconds"])["rows_per_sec"])
+            for agg in per_pid.values()]
+
+def assess_frame_parallel(df: pd.DataFrame, cfg: Dict[str, Any], workers: int,
+                          challengers: Optional[Dict[str, Dict[str, Any]]] = None,
+                          reasons: str = "text") -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """assess_frame split into `workers` contiguous row ranges scored in a process pool.
+
+    Results are reassembled in the original row order. Also returns per-worker throughput.
+    """
+    bounds = np.linspace(0, len(df), workers + 1).astype(int)
+    parts = [df.iloc[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_score_part, parts, [cfg] * len(parts), [challengers] * len(parts),
+                                [reasons] * len(parts)))
+    scored = pd.concat([r[0] for r in results]) if results else _score(df, cfg, challengers, reasons)
+    return scored, _worker_stats([r[1] for r in results])
+
+def run(input_csv: str, output_csv: str, config: Dict[str, Any] = None, workers: int = 1,
+        input_format: Optional[str] = None, output_format: Optional[str] = None,
+        decisions_only: bool = False, challengers: Optional[Dict[str, Dict[str, Any]]] = None,
+        reasons: str = "text", activations: Optional[str] = None,
+        enrichers: Optional[List[Any]] = None) -> pd.DataFrame:
+    """Score a whole file and write the results.
+
+    Formats are detected from the extension (.csv, .parquet, .arrow/.feather) unless given.
+    decisions_only loads just the rule columns and writes transaction_id plus the results.
+    challengers ({name: config}) are scored in the same pass and add a decision__<name>
+    column each; the disagreement matrix goes in out.attrs["disagreement"].
+    reasons="mask" writes an integer reason_mask column instead of the reasons text
+    (decode it with decode_reasons or reason_names).
+    activations saves the rule activation matrix to that .npz path (see rescore).
+    enrichers (bin_table.BinTable, ip_index.IpIndex) fill in input columns before scoring.
+    """
     cfg = config or DEFAULT_CONFIG
-    df = pd.read_csv(input_csv)
-    results = []
-    for _, row in df.iterrows():
-        res = assess_row(row, cfg)
-        results.append(res)
-    out = df.copy()
-    out["decision"] = [r["decision"] for r in results]
-    out["risk_score"] = [r["risk_score"] for r in results]
-    out["reasons"] = [r["reasons"] for r in results]
-    out.to_csv(output_csv, index=False)
+    df = _enrich(read_transactions(input_csv, input_format, columns=_projection(decisions_only, cfg, enrichers)),
+                 enrichers)
+    if activations:
+        save_activations(activation_matrix(df, cfg), activations)
+    if workers > 1:
+        scored, stats = assess_frame_parallel(df, cfg, workers, challengers, reasons)
+        df.attrs["worker_stats"] = stats
+    else:
+        scored = _score(df, cfg, challengers, reasons)
+    if challengers:
+        df.attrs["disagreement"] = disagreement_matrix(scored)
+    out = _output_frame(_add_decisions(df, scored), decisions_only)
+    write_decisions(out, output_csv, output_format)
     return out
 
+def run_chunked(input_csv: str, output_csv: str, config: Dict[str, Any] = None,
+                chunksize: int = 100_000, workers: int = 1, input_format: Optional[str] = None,
+                output_format: Optional[str] = None, decisions_only: bool = False,
+                challengers: Optional[Dict[str, Dict[str, Any]]] = None, reasons: str = "text",
+                activations: Optional[str] = None, enrichers: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """Score input_csv chunksize rows at a time, appending each chunk to output_csv.
+
+    Peak memory is bounded by the chunk size rather than the file size. Output matches
+    run() as long as pandas infers the same dtype for a column in every chunk. With
+    workers > 1 chunks are scored in a process pool, at most 2 * workers in flight.
+    With challengers the disagreement matrix over all chunks is in stats["disagreement"].
+    """
+    cfg = config or DEFAULT_CONFIG
+    tasks: List[Dict[str, Any]] = []
+    spool = _ActivationSpool(activations) if activations else None
+
+    def scored_chunks():
+        chunks = (_enrich(chunk, enrichers) for chunk in
+                  read_transactions(input_csv, input_format, columns=_projection(decisions_only, cfg, enrichers),
+                                    chunksize=chunksize))
+        if workers <= 1:
+            for chunk in chunks:
+                yield chunk, _score(chunk, cfg, challengers, reasons)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending: deque = deque()
+            for chunk in chunks:
+                pending.append((chunk, pool.submit(_score_part, chunk, cfg, challengers, reasons)))
+                if len(pending) >= 2 * workers:
+                    yield _collect(pending.popleft(), tasks)
+            while pending:
+                yield _collect(pending.popleft(), tasks)
+
+    rows = 0
+    disagreements = None
+    start = time.perf_counter()
+    with _DecisionWriter(output_csv, detect_format(output_csv, output_format)) as writer:
+        for chunk, scored in scored_chunks():
+            if challengers:
+                counts = disagreement_counts(scored)
+                disagreements = counts if disagreements is None else disagreements + counts
+            writer.write(_output_frame(_add_decisions(chunk, scored), decisions_only))
+            if activations:
+                spool.add(activation_matrix(chunk, cfg))
+            rows += len(chunk)
+    if spool is not None:
+        spool.close()
+    stats = _throughput(rows, time.perf_counter() - start)
+    if disagreements is not None:
+        stats["disagreement"] = disagreements / max(rows, 1)
+    if tasks:
+        stats["worker_stats"] = _worker_stats(tasks)
+    return stats
+
+def _collect(entry, tasks: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    chunk, future = entry
+    scored, task = future.result()
+    tasks.append(task)
+    return chunk, scored
+
+def _throughput(rows: int, seconds: float) -> Dict[str, Any]:
+    return {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds > 0 else 0.0}
+
+def write_batch_metrics(path: str, stats: Dict[str, Any]) -> None:
+    # Prometheus textfile-collector snapshot of a CLI run's throughput
+    registry = metrics.Registry()
+    registry.gauge("decision_batch_cli_rows", "Rows scored by the last batch CLI run").set(stats["rows"])
+    registry.gauge("decision_batch_cli_seconds", "Wall time of the last batch CLI run").set(stats["seconds"])
+    registry.gauge("decision_batch_cli_rows_per_second", "Throughput of the last batch CLI run").set(stats["rows_per_sec"])
+    per_worker = registry.gauge("decision_batch_cli_worker_rows_per_second",
+                                "Per-process scoring throughput of the last batch CLI run", ["pid"])
+    for w in stats.get("worker_stats", []):
+        per_worker.labels(pid=w["pid"]).set(w["rows_per_sec"])
+    registry.write_textfile(path)
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--input", required=False, default="transactions_examples.csv", help="Path to input CSV")
-    ap.add_argument("--output", required=False, default="decisions.csv", help="Path to output CSV")
+    ap.add_argument("--input", required=False, default="transactions_examples.csv",
+                    help="Path to input CSV, Parquet or Arrow file")
+    ap.add_argument("--output", required=False, default="decisions.csv",
+                    help="Path to output CSV, Parquet or Arrow file")
+    ap.add_argument("--chunksize", type=int, default=None,
+                    help="Stream the input in chunks of this many rows (bounded memory)")
+    ap.add_argument("--workers", type=int, default=1, help="Score in a pool of this many processes")
+    ap.add_argument("--input-format", choices=["csv", "parquet", "arrow"], default=None,
+                    help="Input format (default: from the file extension)")
+    ap.add_argument("--output-format", choices=["csv", "parquet", "arrow"], default=None,
+                    help="Output format (default: from the file extension)")
+    ap.add_argument("--decisions-only", action="store_true",
+                    help="Load only the rule columns and write transaction_id plus the decision columns")
+    ap.add_argument("--metrics-file", default=None,
+                    help="Write throughput gauges here in Prometheus textfile format")
+    ap.add_argument("--challenger", action="append", default=[], metavar="NAME=CONFIG.json",
+                    help="Also score under this config and add a decision__NAME column (repeatable)")
+    ap.add_argument("--reasons", choices=["text", "mask"], default="text",
+                    help="Write reasons as text or as an integer reason_mask column (smaller, faster)")
+    ap.add_argument("--config", default=None, help="JSON scoring config (default: built-in rules)")
+    ap.add_argument("--activations", default=None, metavar="PATH.npz",
+                    help="Also save the rule activation matrix, for --rescore under new weights")
+    ap.add_argument("--rescore", default=None, metavar="PATH.npz",
+                    help="Re-score a saved activation matrix under --config instead of reading --input")
+    ap.add_argument("--bin-table", default=None, help="Resolve bin_country from card_bin with this BIN table")
+    ap.add_argument("--ip-index", default=None, help="Resolve ip_country and ip_risk from ip_address with this IP index")
     args = ap.parse_args()
-    out = run(args.input, args.output)
-    print(out.head().to_string(index=False))
+    try:
+        challengers = dict(load_challenger(spec) for spec in args.challenger)
+    except (OSError, ValueError) as e:
+        ap.error(f"--challenger: {e}")
+    config = None
+    if args.config:
+        try:
+            with open(args.config) as fh:
+                config = json.load(fh)
+            validate_config(config)
+        except (OSError, ValueError) as e:
+            ap.error(f"--config: {e}")
+    if args.rescore:
+        try:
+            acts = load_activations(args.rescore)
+            out = rescore(acts, config or DEFAULT_CONFIG)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            ap.error(f"--rescore: {e}")
+        if acts.transaction_id is not None:
+            out.insert(0, "transaction_id", acts.transaction_id)
+        write_decisions(out, args.output, args.output_format)
+        print(out["decision"].value_counts().to_string(), file=sys.stderr)
+        return
+    # Only pass the options that were set, so the default call stays run(input, output)
+    opts: Dict[str, Any] = {}
+    if config:
+        opts["config"] = config
+    if args.activations:
+        opts["activations"] = args.activations
+    enrichers = []
+    if args.bin_table:
+        from bin_table import BinTable
+        enrichers.append(BinTable(args.bin_table))
+    if args.ip_index:
+        from ip_index import IpIndex
+        enrichers.append(IpIndex(args.ip_index))
+    if enrichers:
+        opts["enrichers"] = enrichers
+    if args.workers > 1:
+        opts["workers"] = args.workers
+    if args.input_format:
+        opts["input_format"] = args.input_format
+    if args.output_format:
+        opts["output_format"] = args.output_format
+    if args.decisions_only:
+        opts["decisions_only"] = True
+    if challengers:
+        opts["challengers"] = challengers
+    if args.reasons != "text":
+        opts["reasons"] = args.reasons
+    start = time.perf_counter()
+    if args.chunksize:
+        stats = run_chunked(args.input, args.output, chunksize=args.chunksize, **opts)
+    else:
+        out = run(args.input, args.output, **opts)
+        print(out.head().to_string(index=False))
+        stats = _throughput(len(out), time.perf_counter() - start)
+        for key in ("worker_stats", "disagreement"):
+            if key in getattr(out, "attrs", {}):
+                stats[key] = out.attrs[key]
+    print(f"Scored {stats['rows']} rows in {stats['seconds']:.2f}s ({stats['rows_per_sec']:,.0f} rows/s)", file=sys.stderr)
+    if args.metrics_file:
+        write_batch_metrics(args.metrics_file, stats)
+    for w in stats.get("worker_stats", []):
+        print(f"  worker {w['pid']}: {w['rows']} rows in {w['tasks']} tasks, {w['rows_per_sec']:,.0f} rows/s", file=sys.stderr)
+    if "disagreement" in stats:
+        print("Decision disagreement rate:", stats["disagreement"].round(4).to_string(), sep="\n", file=sys.stderr)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,235 @@
+"""
+Append-only decision log with a background, batched writer.
+
+The request path only puts a tuple on a bounded in-memory queue. A daemon thread
+drains it in batches, encodes them as length-prefixed binary records and appends
+them to size-rotated files (oldest files beyond `max_files` are deleted). When the
+queue is full a record is dropped ("drop" policy) or the caller waits up to
+`block_timeout` seconds first ("block" policy). Coroutines call log_async(),
+which waits with asyncio.sleep so the event loop keeps serving other requests.
+
+File layout: the 4-byte magic b"DLG1", then records of
+    <u32 length> <f64 ts> <i64 transaction_id> <u32 config_version> <u8 decision> <i16 risk_score> <utf-8 reasons>
+where transaction_id -1 means "not given" (or outside the int64 range). Use read_decision_log() to load files
+back into a DataFrame.
+"""
+import asyncio
+import glob
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple, Union
+
+import metrics
+
+MAGIC = b"DLG1"
+_HEAD = struct.Struct("<dqIBh")
+_LEN = struct.Struct("<I")
+DECISIONS = ("ACCEPTED", "IN_REVIEW", "REJECTED")
+_DECISION_CODES = {d: i for i, d in enumerate(DECISIONS)}
+NO_ID = -1
+_ID_MIN, _ID_MAX = -2 ** 63, 2 ** 63 - 1
+
+LOG_RECORDS = metrics.REGISTRY.counter("decision_log_records_total", "Decision log records written to disk")
+LOG_DROPPED = metrics.REGISTRY.counter("decision_log_dropped_total", "Decision log records dropped because the queue was full")
+LOG_QUEUE = metrics.REGISTRY.gauge("decision_log_queue_depth", "Decision log records waiting to be written")
+LOG_FLUSH_SECONDS = metrics.REGISTRY.histogram("decision_log_flush_seconds", "Time to encode and write one batch of records")
+LOG_ERRORS = metrics.REGISTRY.counter("decision_log_errors_total", "Decision log records that could not be encoded or written")
+
+Record = Tuple[float, Optional[int], int, str, int, str]
+
+
+def encode(records: Iterable[Record]) -> bytes:
+    out = bytearray()
+    for ts, txn_id, version, decision, score, reasons in records:
+        body = _HEAD.pack(ts, NO_ID if txn_id is None else txn_id, version, _DECISION_CODES[decision], score) + reasons.encode()
+        out += _LEN.pack(len(body))
+        out += body
+    return bytes(out)
+
+
+class DecisionLogWriter:
+    def __init__(self, directory: str, max_queue: int = 100_000, batch_size: int = 2_000,
+                 flush_interval: float = 0.25, max_file_bytes: int = 64 * 1024 * 1024,
+                 max_files: int = 100, policy: str = "drop", block_timeout: float = 0.005):
+        if policy not in ("drop", "block"):
+            raise ValueError("policy must be 'drop' or 'block'")
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self.written = 0
+        self.errors = 0
+        self._queue: "queue.Queue[Record]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._fh = None
+        self._seq = 0
+        os.makedirs(directory, exist_ok=True)
+
+    # --- request path ---
+
+    def log(self, transaction_id: Optional[int], decision: str, risk_score: int, reasons: str,
+            config_version: int = 0, ts: Optional[float] = None) -> bool:
+        """Queue one decision; returns False if it was dropped. Blocks with the "block" policy."""
+        record = self._record(transaction_id, decision, risk_score, reasons, config_version, ts)
+        return self._put(record, self.block_timeout if self.policy == "block" else None)
+
+    async def log_async(self, transaction_id: Optional[int], decision: str, risk_score: int, reasons: str,
+                        config_version: int = 0, ts: Optional[float] = None) -> bool:
+        """log() for the event loop: the "block" policy waits without blocking other requests."""
+        record = self._record(transaction_id, decision, risk_score, reasons, config_version, ts)
+        if self.policy == "block" and self._queue.full():
+            deadline = time.monotonic() + self.block_timeout
+            while self._queue.full() and time.monotonic() < deadline:
+                await asyncio.sleep(min(0.001, self.block_timeout))
+        return self._put(record, None)
+
+    @staticmethod
+    def _record(transaction_id: Optional[int], decision: str, risk_score: int, reasons: str,
+                config_version: int, ts: Optional[float]) -> Record:
+        if transaction_id is not None and not _ID_MIN <= transaction_id <= _ID_MAX:
+            transaction_id = None  # does not fit the record's int64
+        return (time.time() if ts is None else ts, transaction_id, config_version, decision, risk_score, reasons)
+
+    def _put(self, record: Record, timeout: Optional[float]) -> bool:
+        try:
+            if timeout is None:
+                self._queue.put_nowait(record)
+            else:
+                self._queue.put(record, timeout=timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            LOG_DROPPED.inc()
+            return False
+
+    # --- background writer ---
+
+    def start(self) -> "DecisionLogWriter":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="decision-log-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush everything still queued and close the current file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._drain_all()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._next_batch(self.flush_interval)
+            if batch:
+                self._flush(batch)
+
+    def _next_batch(self, wait: float) -> List[Record]:
+        try:
+            batch = [self._queue.get(timeout=wait)] if wait else [self._queue.get_nowait()]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain_all(self) -> None:
+        while True:
+            batch = self._next_batch(0)
+            if not batch:
+                return
+            self._flush(batch)
+
+    def _flush(self, batch: List[Record]) -> None:
+        # If a batch fails, its records are retried one by one and the ones that
+        # still fail are counted and skipped; the writer thread keeps going
+        try:
+            self._write(batch)
+            return
+        except Exception:
+            pass
+        for record in batch:
+            try:
+                self._write([record])
+            except Exception:
+                self.errors += 1
+                LOG_ERRORS.inc()
+
+    def _write(self, batch: List[Record]) -> None:
+        start = time.perf_counter()
+        fh = self._file()
+        fh.write(encode(batch))
+        fh.flush()
+        self.written += len(batch)
+        LOG_RECORDS.inc(len(batch))
+        LOG_QUEUE.set(self._queue.qsize())
+        LOG_FLUSH_SECONDS.observe(time.perf_counter() - start)
+
+    def _file(self):
+        if self._fh is not None and self._fh.tell() >= self.max_file_bytes:
+            self._fh.close()
+            self._fh = None
+        if self._fh is None:
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+            self._seq += 1
+            path = os.path.join(self.directory, f"decisions-{stamp}-{os.getpid()}-{self._seq:06d}.dlog")
+            self._fh = open(path, "ab")
+            self._fh.write(MAGIC)
+            self._prune()
+        return self._fh
+
+    def _prune(self) -> None:
+        files = log_files(self.directory)
+        for path in files[:max(0, len(files) - self.max_files)]:
+            os.unlink(path)
+
+
+def log_files(directory: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, "decisions-*.dlog")), key=lambda p: (os.path.getmtime(p), p))
+
+
+def iter_records(path: str):
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path} is not a decision log")
+    pos = 4
+    while pos + _LEN.size <= len(data):
+        (length,) = _LEN.unpack_from(data, pos)
+        pos += _LEN.size
+        if pos + length > len(data):
+            break  # torn write at the end of a file that was still open
+        ts, txn_id, version, code, score = _HEAD.unpack_from(data, pos)
+        reasons = data[pos + _HEAD.size:pos + length].decode()
+        pos += length
+        yield ts, None if txn_id == NO_ID else txn_id, version, DECISIONS[code], score, reasons
+
+
+def read_decision_log(source: Union[str, List[str]]):
+    """Load one file, a list of files or a whole log directory into a DataFrame."""
+    import pandas as pd
+    paths = log_files(source) if isinstance(source, str) and os.path.isdir(source) else \
+        ([source] if isinstance(source, str) else list(source))
+    rows = [r for path in paths for r in iter_records(path)]
+    df = pd.DataFrame(rows, columns=["ts", "transaction_id", "config_version", "decision", "risk_score", "reasons"])
+    df["ts"] = pd.to_datetime(df["ts"], unit="s", utc=True)
+    df["transaction_id"] = df["transaction_id"].astype("Int64")
+    df["decision"] = pd.Categorical(df["decision"], categories=list(DECISIONS))
+    df["risk_score"] = df["risk_score"].astype("int16")
+    return df
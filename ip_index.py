@@ -0,0 +1,262 @@
+"""
+Memory-mapped IP range index: ip_address -> ip_country and ip_risk.
+
+The index is built offline from a CSV with one network or range per row:
+
+    network,ip_end,country,risk
+    203.0.113.0/24,,MX,low
+    203.0.113.128/25,,US,high
+    198.51.100.10,198.51.100.20,,medium   # a start-end range; blank fields are not set
+    2001:db8::/32,,CA,
+
+    python ip_index.py build --csv ranges.csv --output ranges.idx
+    python ip_index.py lookup --index ranges.idx 203.0.113.200 2001:db8::1
+
+As in bin_table, overlapping ranges are flattened at build time and the
+narrowest one wins, separately for country and risk: a risky /28 inside a
+country's /16 keeps that country. IPv4 and IPv6 ranges go into separate
+sorted sections: IPv4 keys are uint32 and IPv6 keys 16 big-endian bytes, so
+both sort as numbers. IPv4-mapped IPv6 addresses (::ffff:a.b.c.d) are looked
+up as IPv4. The file is memory-mapped read-only, so every worker process
+shares one copy.
+"""
+import argparse
+import bisect
+import csv
+import ipaddress
+import mmap
+import socket
+import struct
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bin_table import flatten_ranges
+
+MAGIC = b"IPIDX001"
+HEADER = struct.Struct("<8sII")  # magic, IPv4 ranges, IPv6 ranges
+RISKS = ("", "low", "medium", "high")  # stored as the index; "" = not set
+_MAPPED = bytes(10) + b"\xff\xff"
+
+
+def parse_ip(ip: Any) -> Optional[Tuple[int, bytes]]:
+    """(4, 4 bytes) or (6, 16 bytes) in network order, or None if ip is not an address."""
+    text = str(ip).strip()
+    try:
+        return 4, socket.inet_pton(socket.AF_INET, text)
+    except OSError:
+        pass
+    try:
+        packed = socket.inet_pton(socket.AF_INET6, text.split("%", 1)[0])
+    except OSError:
+        return None
+    if packed[:12] == _MAPPED:
+        return 4, packed[12:]
+    return 6, packed
+
+
+Ranges = List[Tuple[int, int, str, str]]
+
+
+def read_ranges(path: str) -> Tuple[Ranges, Ranges]:
+    """IPv4 and IPv6 (start, end, country, risk) ranges from the CSV at path."""
+    ranges: Dict[int, Ranges] = {4: [], 6: []}
+    with open(path, newline="") as fh:
+        for line, row in enumerate(csv.DictReader(fh), start=2):
+            network = (row.get("network") or "").strip()
+            end = (row.get("ip_end") or "").strip()
+            country = (row.get("country") or "").strip().upper()
+            risk = (row.get("risk") or "").strip().lower()
+            try:
+                if end:
+                    lo, hi = ipaddress.ip_address(network), ipaddress.ip_address(end)
+                else:
+                    net = ipaddress.ip_network(network, strict=False)
+                    lo, hi = net.network_address, net.broadcast_address
+            except ValueError as e:
+                raise ValueError(f"{path}:{line}: {e}")
+            if lo.version != hi.version or hi < lo:
+                raise ValueError(f"{path}:{line}: ip_end must be an address of the same family after the start")
+            if country and (len(country) != 2 or not country.isascii()):
+                raise ValueError(f"{path}:{line}: country must be a 2-letter code")
+            if risk not in RISKS:
+                raise ValueError(f"{path}:{line}: risk must be one of low, medium, high")
+            if not (country or risk):
+                raise ValueError(f"{path}:{line}: needs a country or a risk")
+            ranges[lo.version].append((int(lo), int(hi), country, risk))
+    return ranges[4], ranges[6]
+
+
+def _flatten(ranges: Ranges) -> List[Tuple[int, int, bytes]]:
+    # Countries and risks are flattened on their own, then overlaid into
+    # segments holding both (2-byte country, 1-byte risk code)
+    countries = flatten_ranges([(lo, hi, c.encode()) for lo, hi, c, _ in ranges if c])
+    risks = flatten_ranges([(lo, hi, bytes([RISKS.index(r)])) for lo, hi, _, r in ranges if r])
+    bounds = sorted({r[0] for r in countries + risks} | {r[1] + 1 for r in countries + risks})
+    out: List[Tuple[int, int, bytes]] = []
+    for lo, next_lo in zip(bounds, bounds[1:]):
+        value = b""
+        for segments, empty in ((countries, b"\0\0"), (risks, b"\0")):
+            i = bisect.bisect_right(segments, (lo, float("inf"))) - 1
+            value += segments[i][2] if i >= 0 and segments[i][1] >= lo else empty
+        if value == b"\0\0\0":
+            continue
+        if out and out[-1][1] == lo - 1 and out[-1][2] == value:
+            out[-1] = (out[-1][0], next_lo - 1, value)
+        else:
+            out.append((lo, next_lo - 1, value))
+    return out
+
+
+def build(csv_path: str, output: str) -> Tuple[int, int]:
+    """Compile csv_path into the index at output; returns the IPv4 and IPv6 range counts."""
+    v4, v6 = (_flatten(r) for r in read_ranges(csv_path))
+    with open(output, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, len(v4), len(v6)))
+        fh.write(struct.pack(f"<{len(v4)}I", *(r[0] for r in v4)))
+        fh.write(struct.pack(f"<{len(v4)}I", *(r[1] for r in v4)))
+        fh.write(b"".join(r[0].to_bytes(16, "big") for r in v6))
+        fh.write(b"".join(r[1].to_bytes(16, "big") for r in v6))
+        fh.write(b"".join(r[2] for r in v4 + v6))
+    return len(v4), len(v6)
+
+
+class _Keys6:
+    # The IPv6 starts or ends as a sequence of 16-byte keys, for bisect
+    def __init__(self, mm: mmap.mmap, offset: int, size: int):
+        self._mm, self._offset, self._size = mm, offset, size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, i: int) -> bytes:
+        at = self._offset + 16 * i
+        return self._mm[at:at + 16]
+
+
+class IpIndex:
+    columns = ("ip_address",)  # input columns enrich_frame() reads
+
+    def __init__(self, path: str):
+        if sys.byteorder != "little":
+            raise RuntimeError("IP indexes are little-endian and need a little-endian host")
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size4, self.size6 = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an IP index")
+        view = memoryview(self._mm)
+        at = HEADER.size
+        self.starts4 = view[at:at + 4 * self.size4].cast("I")
+        self.ends4 = view[at + 4 * self.size4:at + 8 * self.size4].cast("I")
+        self._starts6_at = at + 8 * self.size4
+        self._ends6_at = self._starts6_at + 16 * self.size6
+        self._values_at = self._ends6_at + 16 * self.size6
+        self.starts6 = _Keys6(self._mm, self._starts6_at, self.size6)
+        self.ends6 = _Keys6(self._mm, self._ends6_at, self.size6)
+
+    def _value(self, i: int) -> Tuple[Optional[str], Optional[str]]:
+        at = self._values_at + 3 * i
+        country, risk = self._mm[at:at + 2], self._mm[at + 2]
+        return (country.decode() if country != b"\0\0" else None), (RISKS[risk] or None)
+
+    def lookup(self, ip: Any) -> Tuple[Optional[str], Optional[str]]:
+        """(country, risk) for ip; either is None when the index does not know it."""
+        parsed = parse_ip(ip) if ip is not None else None
+        if parsed is None:
+            return None, None
+        version, packed = parsed
+        if version == 4:
+            key = int.from_bytes(packed, "big")
+            i = bisect.bisect_right(self.starts4, key) - 1
+            if i < 0 or key > self.ends4[i]:
+                return None, None
+            return self._value(i)
+        i = bisect.bisect_right(self.starts6, packed) - 1
+        if i < 0 or packed > self.ends6[i]:
+            return None, None
+        return self._value(self.size4 + i)
+
+    def lookup_many(self, ips: Iterable[Any]):
+        """Vectorized lookup: (countries, risks) object arrays with None where unknown."""
+        import numpy as np
+        import pandas as pd
+        codes, uniques = pd.factorize(pd.Series(ips, dtype=object))
+        # Each distinct address is parsed once, then every section is one searchsorted
+        parsed = [parse_ip(ip) for ip in uniques]
+        index = np.full(len(uniques), -1, dtype=np.int64)
+        for version in (4, 6):
+            where = np.array([i for i, p in enumerate(parsed) if p is not None and p[0] == version], dtype=np.int64)
+            size = self.size4 if version == 4 else self.size6
+            if not len(where) or not size:
+                continue
+            packed = b"".join(parsed[i][1] for i in where)
+            if version == 4:
+                keys = np.frombuffer(packed, dtype=">u4").astype("<u4")
+                starts = np.frombuffer(self._mm, dtype="<u4", count=size, offset=HEADER.size)
+                ends = np.frombuffer(self._mm, dtype="<u4", count=size, offset=HEADER.size + 4 * size)
+            else:
+                keys = np.frombuffer(packed, dtype="S16")
+                starts = np.frombuffer(self._mm, dtype="S16", count=size, offset=self._starts6_at)
+                ends = np.frombuffer(self._mm, dtype="S16", count=size, offset=self._ends6_at)
+            idx = np.searchsorted(starts, keys, side="right") - 1
+            safe = idx.clip(0)
+            hit = (idx >= 0) & (keys <= ends[safe])
+            index[where[hit]] = idx[hit] + (0 if version == 4 else self.size4)
+        values = np.frombuffer(self._mm, dtype=[("country", "S2"), ("risk", "u1")],
+                               count=self.size4 + self.size6, offset=self._values_at)
+        countries = np.full(len(uniques) + 1, None, dtype=object)  # last slot: missing input (code -1)
+        risks = np.full(len(uniques) + 1, None, dtype=object)
+        hit = index >= 0
+        if hit.any():
+            found = values[index[hit]]
+            countries[:-1][hit] = [c.decode() or None for c in found["country"].tolist()]
+            risks[:-1][hit] = [RISKS[r] or None for r in found["risk"].tolist()]
+        return countries[codes], risks[codes]
+
+    def enrich(self, txn: Dict[str, Any]) -> Dict[str, Any]:
+        # ip_country / ip_risk from ip_address; the caller's values are kept where the index has none
+        country, risk = self.lookup(txn.get("ip_address"))
+        if country is not None:
+            txn["ip_country"] = country
+        if risk is not None:
+            txn["ip_risk"] = risk
+        return txn
+
+    def enrich_frame(self, df):
+        if "ip_address" not in df.columns:
+            return df
+        import numpy as np
+        import pandas as pd
+        found = self.lookup_many(df["ip_address"].to_numpy())
+        # Without an existing column, addresses the index does not know get assess_row's defaults
+        for column, values, default in zip(("ip_country", "ip_risk"), found, ("", "low")):
+            current = df[column].astype(object).to_numpy() if column in df.columns else default
+            df[column] = pd.Categorical(np.where(pd.notna(values), values, current))
+        return df
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Build or query a memory-mapped IP range index")
+    sub = ap.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="Compile a CSV of network,ip_end,country,risk into an index")
+    b.add_argument("--csv", required=True)
+    b.add_argument("--output", required=True)
+    q = sub.add_parser("lookup", help="Print the country and risk of each address")
+    q.add_argument("--index", required=True)
+    q.add_argument("ips", nargs="+")
+    args = ap.parse_args(argv)
+    if args.command == "build":
+        try:
+            n4, n6 = build(args.csv, args.output)
+        except (OSError, ValueError) as e:
+            ap.error(str(e))
+        print(f"Wrote {n4} IPv4 and {n6} IPv6 ranges to {args.output}", file=sys.stderr)
+    else:
+        index = IpIndex(args.index)
+        for ip in args.ips:
+            country, risk = index.lookup(ip)
+            print(ip, country or "-", risk or "-")
+
+
+if __name__ == "__main__":
+    main()
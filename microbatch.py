@@ -0,0 +1,92 @@
+"""
+Adaptive micro-batching for the single-transaction endpoint.
+
+Concurrent callers `await batcher.submit(item)`. Their items are scored together
+by one `score_batch(items) -> results` call, and each caller gets its own result
+back. Batches of at least `offload_min` items are scored in a worker thread so the
+event loop keeps accepting requests; smaller ones are cheap enough to score inline.
+
+The window adapts to load. After an idle period the first item is flushed at once,
+so there is no added delay. While a batch is being scored, new arrivals queue up
+and form the next batch. If the previous batch had more than one item, the batcher
+also waits up to `max_wait` seconds, or until `max_batch` items are queued, before
+flushing.
+"""
+import asyncio
+from time import perf_counter
+from typing import Any, Callable, List, Optional, Tuple
+
+import metrics
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+BATCH_SIZE = metrics.REGISTRY.histogram("decision_microbatch_size", "Requests scored per micro-batch",
+                                        buckets=BATCH_SIZE_BUCKETS)
+QUEUE_SECONDS = metrics.REGISTRY.histogram("decision_microbatch_queue_seconds",
+                                           "Delay between a request being queued and its batch starting to score")
+
+
+class MicroBatcher:
+    def __init__(self, score_batch: Callable[[List[Any]], List[Any]], max_batch: int = 256,
+                 max_wait: float = 0.002, offload_min: int = 1):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.score_batch = score_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.offload_min = offload_min
+        self._pending: List[Tuple[Any, asyncio.Future, float]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_size = 0
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, perf_counter()))
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._drain())
+        elif len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        return await future
+
+    async def _drain(self) -> None:
+        # Runs while there is work queued, then exits; the next submit restarts it
+        while self._pending:
+            if self._last_size > 1 and self.max_wait > 0 and len(self._pending) < self.max_batch:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            start = perf_counter()
+            for _, _, queued in batch:
+                QUEUE_SECONDS.observe(start - queued)
+            BATCH_SIZE.observe(len(batch))
+            self._last_size = len(batch)
+            self.batches += 1
+            self.items += len(batch)
+            items = [item for item, _, _ in batch]
+            try:
+                if len(items) >= self.offload_min:
+                    results = await asyncio.get_running_loop().run_in_executor(None, self.score_batch, items)
+                else:
+                    results = self.score_batch(items)
+                    await asyncio.sleep(0)  # let queued callers run before the next batch
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        self._last_size = 0
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "items": self.items, "queued": len(self._pending),
+                "mean_batch": self.items / self.batches if self.batches else 0.0}
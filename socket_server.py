@@ -0,0 +1,219 @@
+"""
+Raw socket front end for colocated gateways.
+
+Serves the same decision engine as POST /transaction over a Unix domain socket or
+TCP. It skips HTTP parsing, routing and Pydantic validation. Every message is a
+frame: a 4-byte big-endian length, then a JSON (orjson) or msgpack payload. A
+request payload is one transaction object. The response is the same object that
+/transaction returns, or {"transaction_id": ..., "error": "..."} when the
+transaction cannot be scored.
+
+Clients may pipeline: send many frames without waiting. Each connection gets its
+responses in request order. Every complete frame already in the read buffer is
+scored, and their responses go out in one write.
+
+    python socket_server.py --unix /run/decision.sock --codec msgpack
+
+This front end only scores. Velocity counters, the decision log, shadow configs,
+admission control and /metrics stay with the HTTP service. SIGHUP re-reads
+--config.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import struct
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+import decision_engine as de
+from config_store import ConfigStore
+from decision_cache import DecisionCache
+
+HEADER = struct.Struct(">I")
+MAX_FRAME = 1 << 20
+READ_SIZE = 1 << 16
+
+
+class FrameError(ValueError):
+    pass
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:  # optional dependency
+        raise RuntimeError("The msgpack codec needs the msgpack package (pip install msgpack)")
+    return msgpack
+
+
+def get_codec(name: str) -> Tuple[Callable[[bytes], Any], Callable[[Any], bytes]]:
+    """(loads, dumps) for "json" or "msgpack"."""
+    if name == "json":
+        return orjson.loads, lambda obj: orjson.dumps(obj, default=str)
+    if name == "msgpack":
+        msgpack = _msgpack()
+        return (lambda data: msgpack.unpackb(data, raw=False)), (lambda obj: msgpack.packb(obj, default=str))
+    raise ValueError(f"Unknown codec {name!r} (expected json or msgpack)")
+
+
+def encode_frame(payload: bytes) -> bytes:
+    return HEADER.pack(len(payload)) + payload
+
+
+class FrameDecoder:
+    """Splits a byte stream into frame payloads; feed() returns the frames completed so far."""
+
+    def __init__(self, max_frame: int = MAX_FRAME):
+        self.max_frame = max_frame
+        self._buf = bytearray()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        self._buf += data
+        frames = []
+        pos = 0
+        while len(self._buf) - pos >= HEADER.size:
+            (size,) = HEADER.unpack_from(self._buf, pos)
+            if size > self.max_frame:
+                raise FrameError(f"Frame of {size} bytes exceeds the {self.max_frame} byte limit")
+            end = pos + HEADER.size + size
+            if end > len(self._buf):
+                break
+            frames.append(bytes(self._buf[pos + HEADER.size:end]))
+            pos = end
+        del self._buf[:pos]
+        return frames
+
+
+class DecisionServer:
+    def __init__(self, store: ConfigStore, cache: Optional[DecisionCache] = None, codec: str = "json",
+                 max_frame: int = MAX_FRAME):
+        self.store = store
+        self.cache = cache
+        self.codec = codec
+        self.loads, self.dumps = get_codec(codec)
+        self.max_frame = max_frame
+        self.connections = 0
+        self.requests = 0
+
+    def decide(self, payload: bytes) -> bytes:
+        txn: Any = None
+        try:
+            txn = self.loads(payload)
+            if not isinstance(txn, dict):
+                raise ValueError("expected a transaction object")
+            txn = {**de.TRANSACTION_DEFAULTS, **txn}  # missing fields as POST /transaction fills them
+            active = self.store.active
+            res = self.cache.score(txn, active.plan) if self.cache is not None else de.assess_txn(txn, active.plan)
+            out: Dict[str, Any] = {"transaction_id": txn.get("transaction_id"), "decision": res["decision"],
+                                   "risk_score": res["risk_score"], "reasons": res["reasons"]}
+        except Exception as e:  # one bad frame must not drop the other requests on the connection
+            tid = txn.get("transaction_id") if isinstance(txn, dict) else None
+            out = {"transaction_id": tid, "error": f"{type(e).__name__}: {e}"}
+        return encode_frame(self.dumps(out))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        decoder = FrameDecoder(self.max_frame)
+        self.connections += 1
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                frames = decoder.feed(data)
+                if frames:
+                    self.requests += len(frames)
+                    writer.write(b"".join(self.decide(f) for f in frames))
+                    await writer.drain()
+        except (FrameError, ConnectionError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def start(self, unix: Optional[str] = None, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+        if unix:
+            if os.path.exists(unix):
+                os.unlink(unix)
+            return await asyncio.start_unix_server(self.handle, path=unix)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+class DecisionClient:
+    """Pipelining client: score_many() keeps up to `window` requests in flight on one connection."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, codec: str = "json"):
+        self.reader, self.writer = reader, writer
+        self.loads, self.dumps = get_codec(codec)
+        self._decoder = FrameDecoder()
+        self._ready: List[bytes] = []
+
+    @classmethod
+    async def connect(cls, unix: Optional[str] = None, host: str = "127.0.0.1", port: int = 0,
+                      codec: str = "json") -> "DecisionClient":
+        if unix:
+            reader, writer = await asyncio.open_unix_connection(unix)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, codec)
+
+    async def _next(self) -> Any:
+        while not self._ready:
+            data = await self.reader.read(READ_SIZE)
+            if not data:
+                raise ConnectionError("Server closed the connection")
+            self._ready.extend(self._decoder.feed(data))
+        return self.loads(self._ready.pop(0))
+
+    async def score(self, txn: Dict[str, Any]) -> Dict[str, Any]:
+        return (await self.score_many([txn]))[0]
+
+    async def score_many(self, txns: List[Dict[str, Any]], window: int = 64) -> List[Dict[str, Any]]:
+        results = []
+        sent = 0
+        while len(results) < len(txns):
+            burst = txns[sent:sent + window - (sent - len(results))]
+            if burst:
+                self.writer.write(b"".join(encode_frame(self.dumps(t)) for t in burst))
+                sent += len(burst)
+            results.append(await self._next())
+        return results
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def serve(args) -> None:
+    store = ConfigStore.from_file(args.config) if args.config else ConfigStore(de.DEFAULT_CONFIG)
+    cache = DecisionCache(args.cache_size) if args.cache_size > 0 else None
+    server = DecisionServer(store, cache, codec=args.codec)
+    listener = await server.start(unix=args.unix, host=args.host, port=args.port)
+    if args.config and hasattr(signal, "SIGHUP"):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, store.load_file, args.config)
+    where = args.unix or f"{args.host}:{listener.sockets[0].getsockname()[1]}"
+    print(f"Scoring {args.codec} frames on {where}", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Length-prefixed socket front end for the decision engine")
+    ap.add_argument("--unix", default=None, help="Unix domain socket path (default: TCP)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8700)
+    ap.add_argument("--codec", choices=["json", "msgpack"], default="json")
+    ap.add_argument("--config", default=os.getenv("DECISION_CONFIG_FILE"), help="JSON scoring config")
+    ap.add_argument("--cache-size", type=int, default=int(os.getenv("DECISION_CACHE_SIZE", "0")))
+    args = ap.parse_args(argv)
+    try:
+        get_codec(args.codec)
+    except RuntimeError as e:
+        ap.error(str(e))
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Tests for admission control (admission.py) and its use by POST /transaction.
+"""
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionMiddleware, SHED_DEADLINE, SHED_OVERLOAD
+
+
+def test_check_reports_overload_and_deadline():
+    """Requests past the in-flight limit or the deadline are shed, others admitted."""
+    admission = AdmissionController(max_inflight=2, deadline=0.05)
+    admission.inflight = 2
+    assert admission.check(time.perf_counter()) is None
+    admission.inflight = 3
+    assert admission.check(time.perf_counter()) == SHED_OVERLOAD
+    admission.inflight = 1
+    assert admission.check(time.perf_counter() - 0.1) == SHED_DEADLINE
+    assert admission.remaining(time.perf_counter() - 0.1) == 0.0
+    assert AdmissionController().check(0.0) is None
+    with pytest.raises(ValueError):
+        AdmissionController(fallback="queue")
+
+
+def test_middleware_counts_only_guarded_paths():
+    """The in-flight count covers requests on the guarded paths until they finish."""
+    admission = AdmissionController(max_inflight=1)
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append((scope["path"], admission.inflight))
+        if scope["path"] == "/boom":
+            raise RuntimeError("boom")
+
+    middleware = AdmissionMiddleware(app, admission, paths={"/transaction", "/boom"})
+
+    async def main():
+        await middleware({"type": "http", "path": "/transaction"}, None, None)
+        await middleware({"type": "http", "path": "/health"}, None, None)
+        with pytest.raises(RuntimeError):
+            await middleware({"type": "http", "path": "/boom"}, None, None)
+
+    asyncio.run(main())
+    assert seen == [("/transaction", 1), ("/health", 0), ("/boom", 1)]
+    assert admission.inflight == 0
+
+
+def test_micro_batch_wait_is_bounded_by_deadline(monkeypatch):
+    """A request stuck behind a slow micro-batch gets the fallback when its budget runs out."""
+    from fastapi.testclient import TestClient
+    import app as app_module
+    from microbatch import MicroBatcher
+
+    def slow(rows):
+        time.sleep(0.2)
+        return app_module._score_micro_batch(rows)
+
+    monkeypatch.setattr(app_module, "MICROBATCH", MicroBatcher(slow, offload_min=1))
+    monkeypatch.setattr(app_module, "ADMISSION", AdmissionController(deadline=0.05))
+    r = TestClient(app_module.app).post("/transaction", json={"transaction_id": 3})
+    assert r.json()["reasons"] == "shed:deadline"
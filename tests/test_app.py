@@ -83,3 +83,269 @@ def test_transaction_hard_block_rejection():
     data = r.json()
     assert data["transaction_id"] == 99
     assert data["decision"] == "REJECTED"
+
+
+def _batch_bodies():
+    base = {
+        "amount_mxn": 5200.0, "customer_txn_30d": 1, "chargeback_count": 0, "hour": 23,
+        "product_type": "digital", "latency_ms": 180, "user_reputation": "new",
+        "device_fingerprint_risk": "low", "ip_risk": "medium", "email_risk": "new_domain",
+        "bin_country": "MX", "ip_country": "MX",
+    }
+    return [
+        dict(base, transaction_id=1),
+        dict(base, transaction_id=2, chargeback_count=3, ip_risk="high"),
+        dict(base, transaction_id=3, hour=12, amount_mxn=100.0, user_reputation="trusted", customer_txn_30d=5),
+        dict(base, transaction_id=4, bin_country="US", latency_ms=4000),
+    ]
+
+
+def _read_ndjson(r):
+    import json
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+def test_batch_json_array_matches_single_endpoint():
+    """Batch scoring must return the same decisions as POST /transaction, in order."""
+    bodies = _batch_bodies()
+    r = client.post("/transactions/batch", json=bodies)
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    expected = [client.post("/transaction", json=b).json() for b in bodies]
+    assert _read_ndjson(r) == expected
+
+
+def test_batch_ndjson_stream_spans_chunks(monkeypatch):
+    """NDJSON bodies are scored chunk by chunk and keep input order."""
+    import json
+    import app as app_module
+    monkeypatch.setattr(app_module, "BATCH_CHUNK_ROWS", 3)
+    bodies = _batch_bodies() * 3
+    payload = "\n".join(json.dumps(b) for b in bodies) + "\n"
+    r = client.post("/transactions/batch", content=payload, headers={"content-type": "application/x-ndjson"})
+    assert r.status_code == 200, r.text
+    lines = _read_ndjson(r)
+    assert [l["transaction_id"] for l in lines] == [b["transaction_id"] for b in bodies]
+    assert lines[1]["decision"] == "REJECTED"
+
+
+def test_batch_reports_invalid_rows_inline():
+    """Rows that fail validation produce an error line without aborting the batch."""
+    bodies = _batch_bodies()[:2]
+    payload = '{"transaction_id": 1, "ip_risk": "extreme"}\nnot json\n' + "\n".join(
+        __import__("json").dumps(b) for b in bodies)
+    r = client.post("/transactions/batch", content=payload, headers={"content-type": "application/x-ndjson"})
+    assert r.status_code == 200
+    lines = _read_ndjson(r)
+    assert lines[0]["index"] == 0 and lines[0]["errors"]
+    assert lines[1]["index"] == 1 and lines[1]["errors"]
+    assert [l["transaction_id"] for l in lines[2:]] == [1, 2]
+
+
+def test_batch_rejects_non_array_json():
+    """A JSON body that is not an array is rejected before streaming starts."""
+    assert client.post("/transactions/batch", json={"transaction_id": 1}).status_code == 422
+    assert client.post("/transactions/batch", content=b"[{", headers={"content-type": "application/json"}).status_code == 400
+
+
+def test_transaction_runs_on_event_loop():
+    """The single-transaction endpoint is async so it never queues on the threadpool."""
+    import inspect
+    import app as app_module
+    assert inspect.iscoroutinefunction(app_module.evaluate_transaction)
+    r = client.post("/transaction", json={"transaction_id": 7})
+    assert r.headers["content-type"] == "application/json"
+    assert r.json() == {"transaction_id": 7, "decision": "ACCEPTED", "risk_score": 0, "reasons": ""}
+
+
+def test_cache_endpoint_and_cached_scoring(monkeypatch):
+    """With the cache enabled, repeated transactions are served from it."""
+    import app as app_module
+    from decision_cache import DecisionCache
+    assert client.get("/cache").json() == {"enabled": False}
+    monkeypatch.setattr(app_module, "CACHE", DecisionCache(16))
+    body = _batch_bodies()[0]
+    first = client.post("/transaction", json=body).json()
+    second = client.post("/transaction", json=dict(body, transaction_id=77)).json()
+    assert second == dict(first, transaction_id=77)
+    stats = client.get("/cache").json()
+    assert stats["enabled"] and stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_admin_config_swap(monkeypatch):
+    """A local admin can publish a new config; /config and scoring follow the new version."""
+    import copy
+    import app as app_module
+    from config_store import ConfigStore
+    import decision_engine as de
+    cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+    cfg["score_to_decision"] = {"reject_at": 10, "review_at": 4}
+    monkeypatch.setattr(app_module, "STORE", ConfigStore(cfg))
+    body = {"transaction_id": 5, "ip_risk": "high", "hour": 23}
+
+    # TestClient connections come from "testclient", which is not allowed by default
+    assert client.put("/admin/config", json=cfg).status_code == 403
+    monkeypatch.setattr(app_module, "ADMIN_ALLOWED_HOSTS", {"testclient"})
+
+    assert client.post("/transaction", json=body).json()["decision"] == "IN_REVIEW"
+    cfg["score_to_decision"]["reject_at"] = 5
+    r = client.put("/admin/config", json=cfg)
+    assert r.status_code == 200, r.text
+    assert r.json()["version"] == 2
+    assert client.get("/config").json()["version"] == 2
+    assert client.post("/transaction", json=body).json()["decision"] == "REJECTED"
+
+    r = client.put("/admin/config", json={"score_weights": {}})
+    assert r.status_code == 422
+    assert client.get("/config").json()["version"] == 2
+    assert client.post("/admin/config/reload").status_code == 409
+
+
+def test_metrics_endpoint_reports_stages_decisions_and_rules():
+    """/metrics exposes stage latency, decision and per-rule counters in Prometheus format."""
+    client.post("/transaction", json=dict(_batch_bodies()[0], hour=23))
+    client.post("/transactions/batch", json=_batch_bodies())
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = r.text
+    for stage in ("validate", "score", "serialize"):
+        assert f'decision_request_stage_seconds_count{{stage="{stage}"}}' in text
+    assert 'decision_decisions_total{endpoint="transaction",decision="IN_REVIEW"}' in text
+    assert 'decision_decisions_total{endpoint="batch",decision="REJECTED"}' in text
+    assert 'decision_rule_fired_total{rule="night_hour"}' in text
+    assert 'decision_http_request_duration_seconds_count{path="/transaction"}' in text
+    assert "decision_batch_rows_total" in text
+    assert "decision_config_version" in text
+
+
+def test_velocity_store_feeds_scoring(monkeypatch):
+    """Server-side counters replace caller-supplied velocity and trigger velocity_burst."""
+    import app as app_module
+    from velocity_store import VelocityStore
+    assert client.post("/velocity/chargeback", json={"customer_id": "c9"}).status_code == 409
+    monkeypatch.setattr(app_module, "VELOCITY", VelocityStore())
+    body = {"customer_id": "c9", "ip_address": "198.51.100.7", "ip_risk": "high"}
+    for _ in range(10):
+        assert "velocity_burst" not in client.post("/transaction", json=body).json()["reasons"]
+    assert "velocity_burst:10/1h" in client.post("/transaction", json=body).json()["reasons"]
+
+    r = client.post("/velocity/chargeback", json={"customer_id": "c9"})
+    assert r.json() == {"customer_id": "c9", "chargeback_count": 1}
+    client.post("/velocity/chargeback", json={"customer_id": "c9"})
+    assert client.post("/transaction", json=body).json()["reasons"] == "hard_block:chargebacks>=2+ip_high"
+
+
+def test_bin_table_resolves_bin_country(monkeypatch, tmp_path):
+    """With a BIN table, bin_country comes from card_bin on the single and batch paths."""
+    import app as app_module
+    import bin_table
+    src = tmp_path / "bins.csv"
+    src.write_text("bin_start,bin_end,country\n451234,,US\n")
+    bin_table.build(str(src), str(tmp_path / "bins.idx"))
+    monkeypatch.setattr(app_module, "ENRICHERS", [bin_table.BinTable(str(tmp_path / "bins.idx"))])
+    body = {"card_bin": "45123488", "bin_country": "MX", "ip_country": "MX"}
+    assert client.post("/transaction", json=body).json()["reasons"] == "geo_mismatch:US!=MX(+2)"
+    assert client.post("/transaction", json=dict(body, card_bin="6011")).json()["reasons"] == ""
+    lines = _read_ndjson(client.post("/transactions/batch", json=[body, dict(body, card_bin="6011")]))
+    assert [line["reasons"] for line in lines] == ["geo_mismatch:US!=MX(+2)", ""]
+
+
+def test_ip_index_resolves_ip_fields(monkeypatch, tmp_path):
+    """With an IP index, ip_country and ip_risk come from ip_address."""
+    import app as app_module
+    import ip_index
+    src = tmp_path / "ranges.csv"
+    src.write_text("network,ip_end,country,risk\n203.0.113.0/24,,US,high\n")
+    ip_index.build(str(src), str(tmp_path / "ranges.idx"))
+    monkeypatch.setattr(app_module, "ENRICHERS", [ip_index.IpIndex(str(tmp_path / "ranges.idx"))])
+    body = {"ip_address": "203.0.113.7", "bin_country": "MX", "ip_country": "MX"}
+    assert client.post("/transaction", json=body).json()["reasons"] == "ip_risk:high(+4);geo_mismatch:MX!=US(+2)"
+    lines = _read_ndjson(client.post("/transactions/batch", json=[body, dict(body, ip_address="10.0.0.1")]))
+    assert [line["reasons"] for line in lines] == ["ip_risk:high(+4);geo_mismatch:MX!=US(+2)", ""]
+
+
+def test_decisions_are_logged(monkeypatch, tmp_path):
+    """Scored transactions are queued to the decision log with the config version."""
+    import app as app_module
+    import decision_log
+    writer = decision_log.DecisionLogWriter(str(tmp_path))
+    monkeypatch.setattr(app_module, "DECISION_LOG", writer)
+    client.post("/transaction", json={"transaction_id": 11, "hour": 23})
+    client.post("/transactions/batch", json=_batch_bodies()[:2])
+    writer.stop()
+    df = decision_log.read_decision_log(str(tmp_path))
+    assert df["transaction_id"].tolist() == [11, 1, 2]
+    assert df["reasons"].iloc[0] == "night_hour:23(+1)"
+    assert (df["config_version"] == app_module.STORE.active.version).all()
+
+
+def test_shadow_configs_score_in_background(monkeypatch):
+    """Shadow configs do not change the response and are counted per champion decision."""
+    import copy
+    import app as app_module
+    import decision_engine as de
+    strict = copy.deepcopy(de.DEFAULT_CONFIG)
+    strict["score_to_decision"] = {"review_at": 1, "reject_at": 1}
+    monkeypatch.setattr(app_module, "SHADOW_PLANS", {"strict": de.compile_config(strict)})
+    r = client.post("/transaction", json={"transaction_id": 5, "hour": 23})
+    assert r.json()["decision"] == "ACCEPTED"
+    text = client.get("/metrics").text
+    assert 'decision_shadow_decisions_total{config="strict",champion="ACCEPTED",decision="REJECTED"}' in text
+
+
+def test_batch_rule_counts_come_from_reason_masks():
+    """Batch scoring counts each fired rule once per row from the reason bitmask."""
+    import app as app_module
+    hard_block = app_module._RULE_COUNTERS["hard_block"]
+    night = app_module._RULE_COUNTERS["night_hour"]
+    before = hard_block.value, night.value
+    client.post("/transactions/batch", json=_batch_bodies())
+    # Row 2 is hard-blocked; rows 1 and 4 are at night (hour 23), row 3 is at noon
+    assert (hard_block.value - before[0], night.value - before[1]) == (1, 2)
+
+
+def test_service_starts_and_scores_without_heavy_imports():
+    """Importing the app and serving /transaction must not load pandas or numpy."""
+    import subprocess
+    import sys
+    code = (
+        "import sys\n"
+        "from fastapi.testclient import TestClient\n"
+        "import app\n"
+        "client = TestClient(app.app)\n"
+        "assert client.post('/transaction', json={'hour': 23}).json()['risk_score'] == 1\n"
+        "client.get('/metrics')\n"
+        "print(sorted(m for m in ('pandas', 'numpy') if m in sys.modules))\n"
+    )
+    root = __import__("os").path.dirname(__import__("os").path.dirname(__file__))
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_admission_sheds_to_review_when_overloaded(monkeypatch):
+    """Past the in-flight limit /transaction answers IN_REVIEW with a shed reason at once."""
+    import app as app_module
+    from admission import AdmissionController
+    admission = AdmissionController(max_inflight=2)
+    monkeypatch.setattr(app_module, "ADMISSION", admission)
+    assert client.post("/transaction", json={"hour": 23}).json()["decision"] == "ACCEPTED"
+    admission.inflight = 3
+    r = client.post("/transaction", json={"transaction_id": 8, "amount_mxn": 1.0})
+    assert r.json() == {"transaction_id": 8, "decision": "IN_REVIEW", "risk_score": 0, "reasons": "shed:overload"}
+    assert r.headers["x-decision-shed"] == "overload"
+    assert 'decision_shed_total{reason="overload",fallback="review"}' in client.get("/metrics").text
+
+
+def test_admission_rules_fallback_skips_velocity(monkeypatch):
+    """The rules fallback scores the raw transaction without touching the velocity store."""
+    import app as app_module
+    from admission import AdmissionController
+    from velocity_store import VelocityStore
+    velocity = VelocityStore()
+    monkeypatch.setattr(app_module, "VELOCITY", velocity)
+    monkeypatch.setattr(app_module, "ADMISSION", AdmissionController(deadline=1e-9, fallback="rules"))
+    r = client.post("/transaction", json={"customer_id": "c1", "hour": 23})
+    assert r.json()["reasons"] == "night_hour:23(+1)"
+    assert r.headers["x-decision-shed"] == "deadline"
+    assert velocity.count("customer", "c1") == 0
@@ -0,0 +1,50 @@
+"""
+Tests for the benchmark tooling: the synthetic generator and baseline comparison.
+"""
+import pandas as pd
+
+from app import Transaction
+from benchmarks import synth
+from benchmarks.run_benchmarks import compare, main
+
+
+def test_generator_is_seeded():
+    a = synth.generate_frame(500, seed=3)
+    assert a.equals(synth.generate_frame(500, seed=3))
+    assert not a.equals(synth.generate_frame(500, seed=4))
+
+
+def test_generated_rows_validate_against_api_schema():
+    for body in synth.generate_transactions(300, seed=1):
+        Transaction.model_validate(body)
+
+
+def test_write_csv_streams_chunks(tmp_path):
+    path = tmp_path / "synthetic.csv"
+    synth.write_csv(str(path), 2500, seed=2, chunk_rows=1000)
+    df = pd.read_csv(path)
+    assert len(df) == 2500
+    assert df["transaction_id"].tolist() == list(range(2500))
+
+
+def test_compare_flags_regressions_in_both_directions():
+    baseline = {
+        "latency": {"value": 10.0, "unit": "us/op", "higher_is_better": False},
+        "throughput": {"value": 1000.0, "unit": "rows/s", "higher_is_better": True},
+        "dropped": {"value": 1.0, "unit": "ms", "higher_is_better": False},
+    }
+    current = {
+        "latency": {"value": 12.0, "unit": "us/op", "higher_is_better": False},
+        "throughput": {"value": 950.0, "unit": "rows/s", "higher_is_better": True},
+        "new": {"value": 1.0, "unit": "ms", "higher_is_better": False},
+    }
+    regressions = compare(current, baseline, threshold_pct=10)
+    assert [r["name"] for r in regressions] == ["latency"]
+    assert [r["name"] for r in compare(current, baseline, threshold_pct=4)] == ["latency", "throughput"]
+
+
+def test_main_writes_results_and_checks_baseline(tmp_path):
+    out = tmp_path / "bench.json"
+    args = ["--only", "assess_txn", "--ops", "200", "--repeat", "1", "--output", str(out)]
+    assert main(args) == 0
+    assert main(args + ["--baseline", str(out), "--threshold", "1000"]) == 0
@@ -0,0 +1,83 @@
+"""
+Tests for the memory-mapped BIN range table (bin_table.py).
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import bin_table
+import decision_engine as de
+
+RANGES = """bin_start,bin_end,country
+4,,US
+451234,451299,MX
+45123456,,BR
+5,5,GB
+55,,FR
+"""
+
+
+@pytest.fixture
+def table(tmp_path):
+    src = tmp_path / "bins.csv"
+    src.write_text(RANGES)
+    bin_table.build(str(src), str(tmp_path / "bins.idx"))
+    return bin_table.BinTable(str(tmp_path / "bins.idx"))
+
+
+def test_narrowest_range_wins(table):
+    """Nested ranges are flattened so the most specific one answers."""
+    assert table.lookup("45123456") == "BR"
+    assert table.lookup("4512345699") == "BR"     # card numbers are cut to the BIN
+    assert table.lookup(45123457) == "MX"
+    assert table.lookup("451299") == "MX"
+    assert table.lookup("45130000") == "US"
+    assert table.lookup("4") == "US"
+    assert table.lookup("55001234") == "FR"
+    assert table.lookup("56000000") == "GB"
+    assert [table.lookup(b) for b in ("6011", "", None, "n/a")] == [None] * 4
+
+
+def test_lookup_many_matches_lookup(table):
+    """The vectorized lookup agrees with the scalar one, including missing values."""
+    bins = ["45123456", "451234", "4111 1111", "6011", None, "", "55", 45129900, np.nan]
+    assert table.lookup_many(bins).tolist() == [table.lookup(b) for b in bins]
+    assert table.lookup_many(pd.Series([451234.0, np.nan])).tolist() == ["MX", None]
+
+
+def test_enrich_keeps_the_callers_country_for_unknown_bins(table):
+    """Known BINs set bin_country; unknown or missing ones leave it untouched."""
+    assert table.enrich({"card_bin": "45123456", "bin_country": "MX"})["bin_country"] == "BR"
+    assert table.enrich({"card_bin": "6011", "bin_country": "MX"})["bin_country"] == "MX"
+    df = pd.DataFrame({"card_bin": ["45123456", "6011", None], "bin_country": ["MX", "MX", "CA"]})
+    assert table.enrich_frame(df)["bin_country"].tolist() == ["BR", "MX", "CA"]
+
+
+def test_unknown_bins_without_a_country_column_score_like_missing(table, tmp_path):
+    """With no bin_country column, BINs missing from the table do not trigger geo_mismatch."""
+    src = tmp_path / "txns.csv"
+    pd.DataFrame({"transaction_id": [1, 2], "card_bin": ["60110000", "45123456"],
+                  "ip_country": ["US", "US"]}).to_csv(src, index=False)
+    out = de.run(str(src), str(tmp_path / "out.csv"), enrichers=[table])
+    assert out["reasons"].tolist() == ["", "geo_mismatch:BR!=US(+2)"]
+    assert out["bin_country"].tolist() == ["", "BR"]
+    assert de.assess_row({"card_bin": "60110000", "ip_country": "US"}, de.DEFAULT_CONFIG)["reasons"] == ""
+
+
+def test_build_rejects_bad_rows(tmp_path):
+    src = tmp_path / "bins.csv"
+    src.write_text("bin_start,bin_end,country\n4599,4500,US\n")
+    with pytest.raises(ValueError, match="before bin_start"):
+        bin_table.build(str(src), str(tmp_path / "bins.idx"))
+
+
+def test_run_resolves_bin_country(table, tmp_path):
+    """run() fills bin_country before scoring, also when only the rule columns are loaded."""
+    src = tmp_path / "txns.csv"
+    pd.DataFrame({"transaction_id": [1, 2], "card_bin": ["045", "45123456"],
+                  "bin_country": ["MX", "MX"], "ip_country": ["MX", "MX"]}).to_csv(src, index=False)
+    out = de.run(str(src), str(tmp_path / "out.csv"), decisions_only=True, enrichers=[table])
+    assert out["reasons"].tolist()[0] == ""
+    assert out["reasons"].tolist()[1].startswith("geo_mismatch:BR!=MX")
+    full = de.run(str(src), str(tmp_path / "full.csv"), enrichers=[table])
+    assert full["card_bin"].tolist() == ["045", "45123456"]
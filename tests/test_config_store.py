@@ -0,0 +1,79 @@
+"""
+Tests for the versioned config store (config_store.py) and decision_engine.validate_config.
+"""
+import copy
+import json
+
+import pytest
+
+import decision_engine as de
+from config_store import ConfigStore
+
+
+def _cfg(**score_to_decision):
+    cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+    cfg["score_to_decision"] = {"reject_at": 10, "review_at": 4, **score_to_decision}
+    return cfg
+
+
+def test_validate_default_config():
+    de.validate_config(_cfg())
+
+
+@pytest.mark.parametrize("mutate, message", [
+    (lambda c: c.pop("score_weights"), "score_weights"),
+    (lambda c: c["score_weights"]["ip_risk"].update(high="4"), "score_weights.ip_risk.high"),
+    (lambda c: c["amount_thresholds"].pop("_default"), "_default"),
+    (lambda c: c.update(chargeback_hard_block=True), "chargeback_hard_block"),
+    (lambda c: c["score_to_decision"].update(review_at=11), "review_at must not exceed"),
+])
+def test_validate_rejects_broken_configs(mutate, message):
+    cfg = _cfg()
+    mutate(cfg)
+    with pytest.raises(ValueError, match=message):
+        de.validate_config(cfg)
+
+
+def test_load_bumps_version_and_swaps_plan():
+    store = ConfigStore(_cfg())
+    old = store.active
+    new = store.load(_cfg(reject_at=5), source="test")
+    assert store.active is new
+    assert (old.version, new.version) == (1, 2)
+    assert new.plan is not old.plan and new.plan.reject_at == 5
+    # A snapshot taken before the swap keeps scoring with the old version
+    assert de.assess_txn({"ip_risk": "high", "hour": 23}, old.plan)["decision"] == "IN_REVIEW"
+    assert de.assess_txn({"ip_risk": "high", "hour": 23}, new.plan)["decision"] == "REJECTED"
+
+
+def test_invalid_load_keeps_active_version():
+    store = ConfigStore(_cfg())
+    with pytest.raises(ValueError):
+        store.load({"score_weights": {}})
+    assert store.active.version == 1
+
+
+def test_store_copies_config():
+    cfg = _cfg()
+    store = ConfigStore(cfg)
+    cfg["score_to_decision"]["reject_at"] = 1
+    assert store.active.config["score_to_decision"]["reject_at"] == 10
+
+
+def test_from_file_and_reload(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(_cfg(reject_at=8)))
+    store = ConfigStore.from_file(str(path))
+    assert store.active.version == 1 and store.active.source == str(path)
+    path.write_text(json.dumps(_cfg(reject_at=9)))
+    assert store.load_file(str(path)).plan.reject_at == 9
+    path.write_text("{not json")
+    with pytest.raises(ValueError, match="not valid JSON"):
+        store.load_file(str(path))
+    assert store.active.version == 2
+
+
+def test_describe_reports_version():
+    described = ConfigStore(_cfg()).active.describe()
+    assert described["version"] == 1
+    assert "loaded_at" in described and "score_weights" in described
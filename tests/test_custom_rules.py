@@ -0,0 +1,74 @@
+"""
+Tests for the custom rule language (custom_rules.py).
+"""
+import numpy as np
+import pytest
+
+import custom_rules
+
+
+def test_scalar_and_vector_functions_agree():
+    """Both compiled forms give the same answer, ignoring case and using field defaults."""
+    rule = custom_rules.compile_rule(
+        "r", "(amount_mxn >= 5000 and device_type == 'Desktop') or not hour in night or ip_risk in ('HIGH',)", 2)
+    assert rule.fields == ("amount_mxn", "device_type", "hour", "ip_risk")
+    rows = [
+        {"amount_mxn": 6000, "device_type": "DESKTOP", "hour": 23},
+        {"amount_mxn": 6000, "device_type": "mobile", "hour": 23},
+        {"hour": 3, "ip_risk": "high"},
+        {"hour": 3},
+        {},
+    ]
+    expected = [rule.test(row.get) for row in rows]
+    assert expected == [True, False, True, False, True]
+    columns = {
+        "amount_mxn": np.array([float(r.get("amount_mxn", 0.0)) for r in rows]),
+        "device_type": np.array([str(r.get("device_type", "")).lower() for r in rows], dtype=object),
+        "hour": np.array([r.get("hour", 12) for r in rows]),
+        "ip_risk": np.array([str(r.get("ip_risk", "low")).lower() for r in rows], dtype=object),
+    }
+    assert rule.vector(columns).tolist() == expected
+
+
+def test_chained_and_negative_comparisons():
+    """a < b < c comparisons and negative numbers work like in Python."""
+    rule = custom_rules.compile_rule("r", "-1 < chargeback_count <= 2 and latency_ms not in [0, 1]", -3)
+    assert rule.reason == "custom:r(-3)"
+    assert rule.test({"chargeback_count": 2, "latency_ms": 5}.get)
+    assert not rule.test({"chargeback_count": 3, "latency_ms": 5}.get)
+    assert not rule.test({"chargeback_count": 0}.get)
+    hits = rule.vector({"chargeback_count": np.array([2, 3, 0]), "latency_ms": np.array([5, 5, 0])})
+    assert hits.tolist() == [True, False, False]
+
+
+@pytest.mark.parametrize("when", [
+    "amount_mxn",
+    "unknown_field == 1",
+    "ip_risk > 'medium'",
+    "hour == 'night'",
+    "1 == 1",
+    "hour in []",
+    "hour + 1 > 2",
+    "__import__('os').system('true')",
+    "device_type.lower() == 'x'",
+    "hour ==",
+])
+def test_rejects_expressions_outside_the_language(when):
+    """Anything but field comparisons joined by and/or/not is refused at compile time."""
+    with pytest.raises(ValueError):
+        custom_rules.compile_rule("r", when, 1)
+
+
+def test_compile_rules_checks_the_list():
+    """Names must be unique identifiers and weights numbers."""
+    ok = {"name": "a", "when": "hour > 1", "weight": 1}
+    assert [r.name for r in custom_rules.compile_rules([ok])] == ["a"]
+    for bad in ([dict(ok, name="a b")], [ok, ok], [dict(ok, weight="1")], [dict(ok, when=None)], ok):
+        with pytest.raises(ValueError):
+            custom_rules.compile_rules(bad)
+
+
+def test_int_and_float_weights_compile_separately():
+    """Equal weights of different types keep their own reason text in the compile cache."""
+    assert custom_rules.compile_rule("r", "hour > 1", 3).reason == "custom:r(+3)"
+    assert custom_rules.compile_rule("r", "hour > 1", 3.0).reason == "custom:r(+3.0)"
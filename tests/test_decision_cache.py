@@ -0,0 +1,85 @@
+"""
+Tests for the LRU decision cache (decision_cache.py) and decision_engine.feature_key.
+"""
+import copy
+
+import pandas as pd
+import pytest
+
+import decision_engine as de
+from decision_cache import DecisionCache
+
+
+def _plan(**overrides):
+    cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+    cfg["score_to_decision"] = {"reject_at": 10, "review_at": 4}
+    cfg.update(overrides)
+    return de.compile_config(cfg)
+
+
+def test_cached_results_match_assess_txn():
+    """Every cached answer must equal a fresh assess_txn call."""
+    from tests.test_decision_engine import _random_frame
+    plan = _plan()
+    cache = DecisionCache(64)
+    rows = [row.to_dict() for _, row in _random_frame(1500, seed=4).iterrows()]
+    for row in rows + rows:
+        assert cache.score(row, plan) == de.assess_txn(row, plan)
+    stats = cache.stats()
+    assert stats["hits"] > 0
+    assert stats["hits"] + stats["misses"] == 3000
+    assert stats["size"] <= 64
+
+
+def test_irrelevant_fields_share_an_entry():
+    """Inputs the rules ignore (or that don't fire a rule) must not split the key."""
+    plan = _plan()
+    cache = DecisionCache(8)
+    base = {"ip_risk": "medium", "hour": 12, "amount_mxn": 100.0, "latency_ms": 10}
+    cache.score(base, plan)
+    cache.score(dict(base, hour=14, amount_mxn=250.0, latency_ms=900, geo_state="NL"), plan)
+    assert cache.stats()["hits"] == 1
+    # A rule that fires on the value must split the key
+    cache.score(dict(base, hour=23), plan)
+    assert cache.stats()["misses"] == 2
+
+
+def test_lru_eviction_order():
+    """The least recently used entry is evicted first."""
+    plan = _plan()
+    cache = DecisionCache(2)
+    a, b, c = ({"hour": 22}, {"hour": 23}, {"hour": 0})
+    cache.score(a, plan)
+    cache.score(b, plan)
+    cache.score(a, plan)      # a becomes most recent
+    cache.score(c, plan)      # evicts b
+    assert cache.stats()["evictions"] == 1
+    cache.score(a, plan)
+    assert cache.stats()["hits"] == 2
+    cache.score(b, plan)
+    assert cache.stats()["misses"] == 4
+
+
+def test_config_change_invalidates():
+    """Switching to a new plan drops every cached decision."""
+    cache = DecisionCache(8)
+    txn = {"ip_risk": "high"}
+    assert cache.score(txn, _plan())["risk_score"] == 4
+    stricter = copy.deepcopy(de.DEFAULT_CONFIG)
+    stricter["score_weights"]["ip_risk"]["high"] = 7
+    assert cache.score(txn, de.compile_config(stricter))["risk_score"] == 7
+    stats = cache.stats()
+    assert stats["invalidations"] == 1
+    assert stats["size"] == 1
+
+
+def test_hard_block_key():
+    """All hard-blocked transactions collapse to one key."""
+    plan = _plan()
+    assert de.feature_key({"chargeback_count": 2, "ip_risk": "high"}, plan) == \
+        de.feature_key(pd.Series({"chargeback_count": 5, "ip_risk": "HIGH", "hour": 23}), plan)
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        DecisionCache(0)
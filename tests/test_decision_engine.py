@@ -514,4 +514,650 @@ class TestDecisionEngine:
             if os.path.exists(input_file):
                 os.unlink(input_file)
             if os.path.exists('test_output.csv'):
-                os.unlink('test_output.csv')
\ No newline at end of file
+                os.unlink('test_output.csv')
+
+def _random_frame(n=2000, seed=7):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'transaction_id': np.arange(n),
+        'amount_mxn': rng.choice([100, 1499.99, 1500, 2500, 3000.5, 6000, 12000], n),
+        'customer_txn_30d': rng.integers(0, 6, n),
+        'chargeback_count': rng.integers(0, 4, n),
+        'hour': rng.integers(0, 24, n),
+        'product_type': rng.choice(['digital', 'physical', 'subscription', 'gift_card', 'Physical'], n),
+        'latency_ms': rng.integers(0, 4000, n),
+        'user_reputation': rng.choice(['trusted', 'recurrent', 'new', 'high_risk', 'NEW'], n),
+        'device_fingerprint_risk': rng.choice(['low', 'medium', 'high'], n),
+        'ip_risk': rng.choice(['low', 'medium', 'high', 'HIGH'], n),
+        'email_risk': rng.choice(['low', 'medium', 'high', 'new_domain'], n),
+        'bin_country': rng.choice(['MX', 'US', 'mx', None], n),
+        'ip_country': rng.choice(['MX', 'US', 'BR', None], n),
+        'velocity_1h': rng.integers(0, 15, n),
+    })
+
+
+def _assess_rows(df, cfg):
+    return pd.DataFrame([de.assess_row(row, cfg) for _, row in df.iterrows()], index=df.index)
+
+
+class TestAssessFrameParity:
+
+    def _assert_parity(self, df, cfg):
+        expected = _assess_rows(df, cfg)
+        result = de.assess_frame(df, cfg)
+        assert list(result.columns) == ['decision', 'risk_score', 'reasons']
+        assert result.index.equals(df.index)
+        for col in ['decision', 'risk_score', 'reasons']:
+            assert result[col].tolist() == expected[col].tolist(), col
+
+    def test_parity_random_rows(self):
+        """Test que assess_frame coincide con assess_row fila por fila"""
+        self._assert_parity(_random_frame(), de.DEFAULT_CONFIG)
+
+    def test_parity_custom_config(self):
+        """Test paridad con pesos y umbrales distintos a los default"""
+        import copy
+        cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+        cfg['score_weights']['geo_mismatch'] = 3
+        cfg['score_weights']['night_hour'] = 0
+        cfg['amount_thresholds'].pop('subscription')
+        cfg['score_to_decision'] = {'reject_at': 7, 'review_at': 3}
+        self._assert_parity(_random_frame(seed=11), cfg)
+
+    def test_parity_missing_columns(self):
+        """Test paridad cuando faltan columnas (se usan los defaults de assess_row)"""
+        df = _random_frame(200)[['amount_mxn', 'ip_risk', 'hour']]
+        self._assert_parity(df, de.DEFAULT_CONFIG)
+        self._assert_parity(pd.DataFrame(index=range(3)), de.DEFAULT_CONFIG)
+
+    def test_parity_csv_round_trip(self):
+        """Test paridad sobre un CSV leído con pandas (NaN en columnas de texto)"""
+        df = _random_frame(300, seed=3)
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
+            df.to_csv(f.name, index=False)
+            path = f.name
+        try:
+            self._assert_parity(pd.read_csv(path), de.DEFAULT_CONFIG)
+        finally:
+            os.unlink(path)
+
+    def test_hard_block_overrides_score(self):
+        """Test que el bloqueo duro produce score 100 y una sola razón"""
+        df = pd.DataFrame({'chargeback_count': [2, 1], 'ip_risk': ['high', 'high'], 'hour': [23, 23]})
+        result = de.assess_frame(df, de.DEFAULT_CONFIG)
+        assert result['decision'].iloc[0] == de.DECISION_REJECTED
+        assert result['risk_score'].tolist() == [100, 5]
+        assert result['reasons'].iloc[0] == 'hard_block:chargebacks>=2+ip_high'
+
+    def test_empty_frame(self):
+        """Test assess_frame con un DataFrame vacío"""
+        result = de.assess_frame(_random_frame().iloc[:0], de.DEFAULT_CONFIG)
+        assert len(result) == 0
+        assert list(result.columns) == ['decision', 'risk_score', 'reasons']
+
+
+class TestRulePlan:
+
+    def test_compile_config_is_immutable(self):
+        """Test que el plan compilado no se puede modificar"""
+        import dataclasses
+        plan = de.compile_config(de.DEFAULT_CONFIG)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            plan.reject_at = 1
+        with pytest.raises(TypeError):
+            plan.user_reputation['new'] = (5, 'x')
+
+    def test_plan_does_not_track_config_mutation(self):
+        """Test que el plan es una copia: cambiar el dict no afecta al plan"""
+        import copy
+        cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+        plan = de.compile_config(cfg)
+        cfg['score_weights']['ip_risk']['high'] = 99
+        assert de.assess_txn({'ip_risk': 'high'}, plan)['risk_score'] == 4
+
+    def test_assess_txn_parity_with_assess_row(self):
+        """Test que assess_txn coincide con assess_row para dicts y Series"""
+        import copy
+        cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+        cfg['score_to_decision'] = {'reject_at': 8, 'review_at': 3}
+        plan = de.compile_config(cfg)
+        df = _random_frame(1000, seed=21)
+        for _, row in df.iterrows():
+            expected = de.assess_row(row, cfg)
+            assert de.assess_txn(row, plan) == expected
+            assert de.assess_txn(row.to_dict(), plan) == expected
+
+    def test_assess_txn_parity_with_negative_weights(self):
+        """Test paridad de las razones con pesos categóricos negativos (solo user_reputation omite el +)"""
+        import copy
+        cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+        cfg['score_weights']['ip_risk']['low'] = -1
+        cfg['score_weights']['email_risk']['medium'] = -2
+        plan = de.compile_config(cfg)
+        df = _random_frame(500, seed=29)
+        frame = de.assess_frame(df, cfg)
+        for i, (_, row) in enumerate(df.iterrows()):
+            expected = de.assess_row(row, cfg)
+            assert de.assess_txn(row, plan) == expected
+            assert frame['reasons'].iloc[i] == expected['reasons']
+        assert 'ip_risk:low(+-1)' in de.assess_txn({'ip_risk': 'low'}, plan)['reasons']
+
+    def test_assess_txn_missing_fields(self):
+        """Test assess_txn con un dict vacío usa los mismos defaults que assess_row"""
+        plan = de.compile_config(de.DEFAULT_CONFIG)
+        assert de.assess_txn({}, plan) == de.assess_row(pd.Series({}), de.DEFAULT_CONFIG)
+
+    def test_assess_txn_accepts_pydantic_model(self):
+        """Test assess_txn con el modelo Pydantic de la API"""
+        from app import Transaction
+        txn = Transaction(amount_mxn=3000, hour=23, ip_risk='medium', bin_country='US')
+        expected = de.assess_row(pd.Series(txn.model_dump()), de.DEFAULT_CONFIG)
+        assert de.assess_txn(txn, de.compile_config(de.DEFAULT_CONFIG)) == expected
+
+
+class TestRunChunked:
+
+    def _paths(self, df):
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
+            df.to_csv(f.name, index=False)
+            input_path = f.name
+        return input_path, input_path + '.single.csv', input_path + '.chunked.csv'
+
+    def test_chunked_output_is_byte_identical(self):
+        """Test que el modo por chunks escribe exactamente el mismo CSV que run()"""
+        input_path, single, chunked = self._paths(_random_frame(1000, seed=5))
+        try:
+            de.run(input_path, single)
+            stats = de.run_chunked(input_path, chunked, chunksize=128)
+            with open(single, 'rb') as a, open(chunked, 'rb') as b:
+                assert a.read() == b.read()
+            assert stats['rows'] == 1000
+            assert stats['rows_per_sec'] > 0
+        finally:
+            for p in (input_path, single, chunked):
+                if os.path.exists(p):
+                    os.unlink(p)
+
+    def test_chunked_header_only_input(self):
+        """Test que un CSV sin filas produce solo el encabezado, igual que run()"""
+        input_path, single, chunked = self._paths(_random_frame(1).iloc[:0])
+        try:
+            de.run(input_path, single)
+            assert de.run_chunked(input_path, chunked, chunksize=10)['rows'] == 0
+            with open(single, 'rb') as a, open(chunked, 'rb') as b:
+                assert a.read() == b.read()
+        finally:
+            for p in (input_path, single, chunked):
+                if os.path.exists(p):
+                    os.unlink(p)
+
+    @patch('sys.argv', ['decision_engine.py', '--input', 'in.csv', '--output', 'out.csv', '--chunksize', '50'])
+    @patch('decision_engine.run_chunked')
+    def test_main_chunksize_flag(self, mock_run_chunked, capsys):
+        """Test que --chunksize usa run_chunked y reporta filas/segundo"""
+        mock_run_chunked.return_value = {'rows': 10, 'seconds': 0.5, 'rows_per_sec': 20.0}
+        de.main()
+        mock_run_chunked.assert_called_once_with('in.csv', 'out.csv', chunksize=50)
+        assert '20 rows/s' in capsys.readouterr().err
+
+
+class TestParallelScoring:
+
+    def test_parallel_matches_serial(self):
+        """Test que el scoring en procesos respeta el orden y coincide con assess_frame"""
+        df = _random_frame(1001, seed=9)
+        scored, stats = de.assess_frame_parallel(df, de.DEFAULT_CONFIG, workers=3)
+        expected = de.assess_frame(df, de.DEFAULT_CONFIG)
+        assert scored.index.equals(df.index)
+        assert scored.equals(expected)
+        assert sum(w['rows'] for w in stats) == 1001
+        assert all(w['rows_per_sec'] >= 0 for w in stats)
+
+    def test_run_with_workers_writes_same_csv(self):
+        """Test que run(workers=N) y run_chunked(workers=N) escriben el mismo CSV que run()"""
+        df = _random_frame(600, seed=13)
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
+            df.to_csv(f.name, index=False)
+            input_path = f.name
+        outputs = [input_path + suffix for suffix in ('.serial.csv', '.pool.csv', '.chunked.csv')]
+        try:
+            de.run(input_path, outputs[0])
+            out = de.run(input_path, outputs[1], workers=2)
+            stats = de.run_chunked(input_path, outputs[2], chunksize=100, workers=2)
+            contents = []
+            for p in outputs:
+                with open(p, 'rb') as fh:
+                    contents.append(fh.read())
+            assert contents[0] == contents[1] == contents[2]
+            assert sum(w['rows'] for w in out.attrs['worker_stats']) == 600
+            assert sum(w['tasks'] for w in stats['worker_stats']) == 6
+        finally:
+            for p in [input_path] + outputs:
+                if os.path.exists(p):
+                    os.unlink(p)
+
+    @patch('sys.argv', ['decision_engine.py', '--input', 'in.csv', '--output', 'out.csv', '--workers', '4'])
+    @patch('decision_engine.run')
+    def test_main_workers_flag(self, mock_run, capsys):
+        """Test que --workers se pasa a run() y se reporta el throughput por worker"""
+        out = pd.DataFrame({'decision': ['ACCEPTED']})
+        out.attrs['worker_stats'] = [{'pid': 1, 'tasks': 1, 'rows': 1, 'seconds': 0.1, 'rows_per_sec': 10.0}]
+        mock_run.return_value = out
+        de.main()
+        mock_run.assert_called_once_with('in.csv', 'out.csv', workers=4)
+        assert 'worker 1: 1 rows in 1 tasks, 10 rows/s' in capsys.readouterr().err
+
+
+class TestFileFormats:
+
+    def setup_method(self):
+        pytest.importorskip('pyarrow')
+        self.tmp = tempfile.mkdtemp()
+        self.df = _random_frame(500, seed=17)
+        self.df['merchant_note'] = 'passthrough'
+
+    def teardown_method(self):
+        import shutil
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def test_detect_format(self):
+        """Test detección de formato por extensión o flag explícito"""
+        assert de.detect_format('a.csv') == 'csv'
+        assert de.detect_format('a.PARQUET') == 'parquet'
+        assert de.detect_format('a.feather') == 'arrow'
+        assert de.detect_format('a.txt') == 'csv'
+        assert de.detect_format('a.csv', 'arrow') == 'arrow'
+
+    @pytest.mark.parametrize('ext', ['.parquet', '.arrow'])
+    def test_round_trip_matches_csv_results(self, ext):
+        """Test que Parquet/Arrow producen las mismas decisiones que CSV"""
+        src = self._path('in' + ext)
+        de.write_decisions(self.df, src)
+        out = de.run(src, self._path('out' + ext))
+        expected = de.assess_frame(self.df, de.DEFAULT_CONFIG)
+        written = de.read_transactions(self._path('out' + ext))
+        for col in ['decision', 'risk_score', 'reasons']:
+            assert out[col].tolist() == expected[col].tolist()
+            assert written[col].tolist() == expected[col].tolist()
+        assert 'merchant_note' in written.columns
+
+    def test_decisions_only_projects_columns(self):
+        """Test que decisions_only lee solo las columnas de reglas y escribe id + decisión"""
+        src = self._path('in.parquet')
+        de.write_decisions(self.df, src)
+        out = de.run(src, self._path('out.csv'), decisions_only=True)
+        assert list(out.columns) == ['transaction_id', 'decision', 'risk_score', 'reasons']
+        written = pd.read_csv(self._path('out.csv'))
+        assert list(written.columns) == ['transaction_id', 'decision', 'risk_score', 'reasons']
+        assert written['reasons'].fillna('').tolist() == de.assess_frame(self.df, de.DEFAULT_CONFIG)['reasons'].tolist()
+
+    @pytest.mark.parametrize('ext', ['.csv', '.parquet', '.arrow'])
+    def test_chunked_matches_single_shot(self, ext):
+        """Test que el modo por chunks da el mismo resultado en todos los formatos"""
+        src = self._path('in' + ext)
+        de.write_decisions(self.df, src)
+        de.run(src, self._path('single' + ext), decisions_only=True)
+        stats = de.run_chunked(src, self._path('chunked' + ext), chunksize=64, decisions_only=True)
+        assert stats['rows'] == 500
+        single = de.read_transactions(self._path('single' + ext))
+        chunked = de.read_transactions(self._path('chunked' + ext))
+        assert single.equals(chunked)
+
+    @pytest.mark.parametrize('ext', ['.parquet', '.arrow'])
+    def test_chunked_csv_to_columnar_keeps_one_schema(self, ext):
+        """Test que un chunk posterior con más categorías o contadores más grandes no rompe el esquema"""
+        df = _random_frame(400, seed=71)
+        df.loc[200:, 'bin_country'] = [f'C{i}' for i in range(200)]
+        df.loc[399, 'chargeback_count'] = 40000
+        src = self._path('in.csv')
+        df.to_csv(src, index=False)
+        de.run_chunked(src, self._path('chunked' + ext), chunksize=200)
+        written = de.read_transactions(self._path('chunked' + ext))
+        assert len(written) == 400
+        assert written['bin_country'].iloc[399] == 'C199'
+        assert written['chargeback_count'].iloc[399] == 40000
+        assert written['decision'].tolist() == de.assess_frame(pd.read_csv(src), de.DEFAULT_CONFIG)['decision'].tolist()
+
+    @patch('sys.argv', ['decision_engine.py', '--input', 'in.pq', '--output', 'out.arrow',
+                        '--input-format', 'parquet', '--decisions-only'])
+    @patch('decision_engine.run')
+    def test_main_format_flags(self, mock_run):
+        """Test que los flags de formato se pasan a run()"""
+        mock_run.return_value = pd.DataFrame()
+        de.main()
+        mock_run.assert_called_once_with('in.pq', 'out.arrow', input_format='parquet', decisions_only=True)
+
+
+class TestBatchMetrics:
+
+    def test_fired_rules(self):
+        """Test extracción de nombres de reglas desde reasons"""
+        assert de.fired_rules('') == []
+        assert de.fired_rules('ip_risk:high(+4);night_hour:23(+1);frequency_buffer(-1)') == \
+            ['ip_risk', 'night_hour', 'frequency_buffer']
+        assert de.fired_rules('hard_block:chargebacks>=2+ip_high') == ['hard_block']
+
+    def test_write_batch_metrics(self, tmp_path):
+        """Test que el CLI escribe gauges de throughput en formato textfile"""
+        path = tmp_path / 'batch.prom'
+        de.write_batch_metrics(str(path), {'rows': 10, 'seconds': 2.0, 'rows_per_sec': 5.0,
+                                           'worker_stats': [{'pid': 42, 'rows_per_sec': 3.5}]})
+        text = path.read_text()
+        assert 'decision_batch_cli_rows 10' in text
+        assert 'decision_batch_cli_rows_per_second 5' in text
+        assert 'decision_batch_cli_worker_rows_per_second{pid="42"} 3.5' in text
+
+
+def _challenger_configs():
+    import copy
+    strict = copy.deepcopy(de.DEFAULT_CONFIG)
+    strict['score_to_decision'] = {'review_at': 2, 'reject_at': 5}
+    lenient = copy.deepcopy(de.DEFAULT_CONFIG)
+    lenient['score_weights']['night_hour'] = 0
+    lenient['score_to_decision'] = {'review_at': 6, 'reject_at': 10}
+    return {'strict': strict, 'lenient': lenient}
+
+
+class TestChampionChallenger:
+
+    def test_multi_matches_single_configs(self):
+        """Test que assess_frame_multi da lo mismo que assess_frame por config"""
+        df = _random_frame(1500, seed=21)
+        configs = {'champion': de.DEFAULT_CONFIG, **_challenger_configs()}
+        results = de.assess_frame_multi(df, configs)
+        assert list(results) == ['champion', 'strict', 'lenient']
+        for name, cfg in configs.items():
+            pd.testing.assert_frame_equal(results[name], de.assess_frame(df, cfg))
+
+    def test_disagreement_matrix(self):
+        """Test matriz de desacuerdo: simétrica, diagonal cero y coincide con un conteo directo"""
+        df = _random_frame(1000, seed=22)
+        scored = de.assess_with_challengers(df, de.DEFAULT_CONFIG, _challenger_configs())
+        assert list(scored.columns) == ['decision', 'risk_score', 'reasons', 'decision__strict', 'decision__lenient']
+        matrix = de.disagreement_matrix(scored)
+        assert list(matrix.index) == ['champion', 'strict', 'lenient']
+        assert (matrix.values == matrix.values.T).all()
+        assert (matrix.values.diagonal() == 0).all()
+        expected = (scored['decision'] != scored['decision__strict']).mean()
+        assert matrix.loc['champion', 'strict'] == pytest.approx(expected)
+        assert expected > 0
+
+    def test_run_and_chunked_with_challengers(self, tmp_path):
+        """Test que run y run_chunked escriben decision__<name> y la misma matriz"""
+        src = str(tmp_path / 'in.csv')
+        _random_frame(600, seed=23).to_csv(src, index=False)
+        out = de.run(src, str(tmp_path / 'out.csv'), decisions_only=True, challengers=_challenger_configs())
+        assert list(out.columns)[-2:] == ['decision__strict', 'decision__lenient']
+        stats = de.run_chunked(src, str(tmp_path / 'chunked.csv'), chunksize=128, decisions_only=True,
+                               challengers=_challenger_configs())
+        pd.testing.assert_frame_equal(stats['disagreement'], out.attrs['disagreement'])
+        assert pd.read_csv(str(tmp_path / 'chunked.csv')).equals(pd.read_csv(str(tmp_path / 'out.csv')))
+
+    def test_load_challenger(self, tmp_path):
+        """Test parseo de NAME=path.json y validación de la config"""
+        import json
+        path = tmp_path / 'strict.json'
+        path.write_text(json.dumps(_challenger_configs()['strict']))
+        name, cfg = de.load_challenger(f'strict={path}')
+        assert name == 'strict' and cfg['score_to_decision']['reject_at'] == 5
+        for bad in ['strict', f'champion={path}', '=x.json']:
+            with pytest.raises(ValueError):
+                de.load_challenger(bad)
+        path.write_text(json.dumps({'score_weights': {}}))
+        with pytest.raises(ValueError):
+            de.load_challenger(f'strict={path}')
+
+
+class TestReasonMask:
+
+    def test_mask_matches_reason_text(self):
+        """Test que reason_mask marca exactamente las reglas presentes en reasons"""
+        df = _random_frame(2000, seed=41)
+        both = de.assess_frame(df, de.DEFAULT_CONFIG, reasons='both')
+        text = de.assess_frame(df, de.DEFAULT_CONFIG)
+        pd.testing.assert_frame_equal(both[['decision', 'risk_score', 'reasons']], text)
+        assert both['reason_mask'].dtype == 'int32'
+        for reasons, mask in zip(both['reasons'], both['reason_mask']):
+            assert de.rules_from_mask(int(mask)) == de.fired_rules(reasons)
+        masked = de.assess_frame(df, de.DEFAULT_CONFIG, reasons='mask')
+        assert list(masked.columns) == ['decision', 'risk_score', 'reason_mask']
+        with pytest.raises(ValueError):
+            de.assess_frame(df, de.DEFAULT_CONFIG, reasons='json')
+
+    def test_decode_reasons(self):
+        """Test que decode_reasons reconstruye el texto y reason_names solo los nombres"""
+        df = _random_frame(1000, seed=42)
+        masked = de.assess_frame(df, de.DEFAULT_CONFIG, reasons='mask')
+        expected = de.assess_frame(df, de.DEFAULT_CONFIG)['reasons']
+        decoded = de.decode_reasons(df, de.DEFAULT_CONFIG, masked['reason_mask'])
+        assert decoded.tolist() == expected.tolist()
+        names = de.reason_names(masked['reason_mask'])
+        assert names.tolist() == [';'.join(de.fired_rules(r)) for r in expected]
+
+    def test_run_writes_mask_column(self, tmp_path):
+        """Test que run(reasons='mask') escribe reason_mask en lugar de reasons"""
+        src = str(tmp_path / 'in.csv')
+        _random_frame(300, seed=43).to_csv(src, index=False)
+        out = de.run(src, str(tmp_path / 'out.csv'), decisions_only=True, reasons='mask')
+        assert list(out.columns) == ['transaction_id', 'decision', 'risk_score', 'reason_mask']
+        written = pd.read_csv(str(tmp_path / 'out.csv'))
+        decoded = de.decode_reasons(_random_frame(300, seed=43), mask=written['reason_mask'])
+        assert decoded.tolist() == de.assess_frame(_random_frame(300, seed=43), de.DEFAULT_CONFIG)['reasons'].tolist()
+
+
+class TestTypedColumns:
+
+    def test_csv_rule_columns_are_typed(self, tmp_path):
+        """Test que read_transactions carga enumeraciones como category y contadores como enteros chicos"""
+        src = str(tmp_path / 'in.csv')
+        _random_frame(200, seed=51).to_csv(src, index=False)
+        df = de.read_transactions(src)
+        assert isinstance(df['ip_risk'].dtype, pd.CategoricalDtype)
+        assert isinstance(df['bin_country'].dtype, pd.CategoricalDtype)
+        assert df['hour'].dtype == 'int8'
+        assert df['amount_mxn'].dtype == 'float64'
+        out = de.run(src, str(tmp_path / 'out.csv'))
+        assert isinstance(out['decision'].dtype, pd.CategoricalDtype)
+        assert list(out['decision'].cat.categories) == ['ACCEPTED', 'IN_REVIEW', 'REJECTED']
+        assert out['risk_score'].dtype == 'int16'
+
+    def test_run_output_matches_untyped_read(self, tmp_path):
+        """Test que los tipos compactos no cambian el texto de las columnas que se reescriben"""
+        src = str(tmp_path / 'in.csv')
+        with open(src, 'w') as fh:
+            fh.write('transaction_id,amount_mxn,customer_txn_30d,chargeback_count,hour,product_type,latency_ms,'
+                     'user_reputation,ip_risk,bin_country,ip_country\n'
+                     '1,2500,3,0,23.0,digital,100.0,new,low,MX,MX\n'
+                     '2,15000,0,2,3.0,physical,2600.0,trusted,high,MX,US\n'
+                     '3,100,5,1,12.0,subscription,0.0,recurrent,medium,US,MX\n')
+        # The baseline run(): untyped read_csv, assess_row per row, to_csv
+        df = pd.read_csv(src)
+        results = [de.assess_row(row, de.DEFAULT_CONFIG) for _, row in df.iterrows()]
+        for col in ('decision', 'risk_score', 'reasons'):
+            df[col] = [r[col] for r in results]
+        df.to_csv(str(tmp_path / 'expected.csv'), index=False)
+        de.run(src, str(tmp_path / 'out.csv'))
+        de.run_chunked(src, str(tmp_path / 'chunked.csv'), chunksize=2)
+        expected = (tmp_path / 'expected.csv').read_text()
+        assert '1,2500,3,0,23.0,digital,100.0,' in expected
+        assert (tmp_path / 'out.csv').read_text() == expected
+        assert (tmp_path / 'chunked.csv').read_text() == expected
+
+    def test_categorical_input_matches_object_input(self):
+        """Test que columnas category (con NaN y mayúsculas) dan el mismo resultado que object"""
+        # Missing values as NaN, like read_csv produces (str(None) would be "None")
+        df = _random_frame(1000, seed=52).replace({None: float('nan')})
+        df.loc[::7, 'ip_risk'] = 'HIGH'
+        df.loc[::11, 'email_risk'] = float('nan')
+        typed = df.astype({c: 'category' for c in ['ip_risk', 'email_risk', 'user_reputation', 'product_type',
+                                                    'bin_country', 'ip_country']})
+        expected = de.assess_frame(df, de.DEFAULT_CONFIG)
+        pd.testing.assert_frame_equal(de.assess_frame(typed, de.DEFAULT_CONFIG), expected)
+        assert expected['decision'].tolist() == [de.assess_row(r, de.DEFAULT_CONFIG)['decision'] for _, r in df.iterrows()]
+
+
+def _reweighted_config():
+    import copy
+    cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+    cfg['score_weights']['geo_mismatch'] = 3
+    cfg['score_weights']['ip_risk']['low'] = 1
+    cfg['score_weights']['night_hour'] = 0
+    cfg['score_weights']['user_reputation']['trusted'] = -4
+    cfg['score_to_decision'] = {'review_at': 3, 'reject_at': 8}
+    return cfg
+
+
+class TestActivationMatrix:
+
+    def test_rescore_matches_assess_frame(self):
+        """Test que rescore con pesos nuevos da lo mismo que volver a puntuar las filas"""
+        df = _random_frame(3000, seed=61)
+        acts = de.activation_matrix(df, de.DEFAULT_CONFIG)
+        assert acts.matrix.shape == (3000, len(acts.columns))
+        for cfg in (de.DEFAULT_CONFIG, _reweighted_config()):
+            expected = de.assess_frame(df, cfg, reasons='mask').reset_index(drop=True)
+            pd.testing.assert_frame_equal(de.rescore(acts, cfg), expected)
+
+    @pytest.mark.parametrize('content', [None, b'not an npz', b'PK\x03\x04truncated'])
+    def test_main_rescore_reports_unreadable_files(self, tmp_path, capsys, content):
+        """Test que --rescore con un archivo faltante o corrupto sale con un error de uso"""
+        path = tmp_path / 'acts.npz'
+        if content is not None:
+            path.write_bytes(content)
+        with patch('sys.argv', ['decision_engine.py', '--rescore', str(path), '--output', str(tmp_path / 'out.csv')]):
+            with pytest.raises(SystemExit) as exc:
+                de.main()
+        assert exc.value.code == 2
+        assert '--rescore:' in capsys.readouterr().err
+
+    def test_rescore_with_fractional_weights(self):
+        """Test que pesos fraccionarios suman igual que en assess_row y se truncan al final"""
+        import copy
+        cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+        cfg['score_weights']['ip_risk']['medium'] = 1.5
+        cfg['score_weights']['geo_mismatch'] = 2.5
+        df = _random_frame(2000, seed=64)
+        row = {'amount_mxn': 100, 'customer_txn_30d': 0, 'chargeback_count': 0, 'hour': 12, 'latency_ms': 0,
+               'user_reputation': 'new', 'device_fingerprint_risk': 'low', 'ip_risk': 'medium', 'email_risk': 'low',
+               'bin_country': 'MX', 'ip_country': 'US', 'velocity_1h': 0}
+        df.loc[0, list(row)] = list(row.values())
+        assert de.assess_row(df.iloc[0], cfg)['risk_score'] == 4
+        acts = de.activation_matrix(df, de.DEFAULT_CONFIG)
+        expected = de.assess_frame(df, cfg, reasons='mask')
+        rescored = de.rescore(acts, cfg)
+        pd.testing.assert_frame_equal(rescored, expected)
+        assert (rescored['risk_score'].iloc[0], rescored['decision'].iloc[0]) == (4, 'IN_REVIEW')
+
+    def test_rescore_rejects_threshold_changes(self):
+        """Test que cambiar umbrales de reglas (no pesos) exige volver a puntuar"""
+        import copy
+        acts = de.activation_matrix(_random_frame(100, seed=62))
+        cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+        cfg['latency_ms_extreme'] = 1000
+        with pytest.raises(ValueError, match='latency_ms_extreme'):
+            de.rescore(acts, cfg)
+        cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+        cfg['score_weights']['ip_risk']['critical'] = 6
+        with pytest.raises(ValueError, match='ip_risk:critical'):
+            de.rescore(acts, cfg)
+
+    def test_run_saves_activations(self, tmp_path):
+        """Test que run y run_chunked guardan la misma matriz y se puede recargar"""
+        src = str(tmp_path / 'in.csv')
+        df = _random_frame(700, seed=63)
+        df.to_csv(src, index=False)
+        de.run(src, str(tmp_path / 'out.csv'), decisions_only=True, activations=str(tmp_path / 'acts.npz'))
+        de.run_chunked(src, str(tmp_path / 'chunked.csv'), chunksize=256, activations=str(tmp_path / 'chunked.npz'))
+        acts = de.load_activations(str(tmp_path / 'acts.npz'))
+        chunked = de.load_activations(str(tmp_path / 'chunked.npz'))
+        assert acts.columns == chunked.columns and (acts.matrix == chunked.matrix).all()
+        assert (acts.hard_block == chunked.hard_block).all() and (acts.buffer_eligible == chunked.buffer_eligible).all()
+        assert acts.transaction_id.tolist() == chunked.transaction_id.tolist() == list(range(700))
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['acts.npz', 'chunked.csv', 'chunked.npz', 'in.csv', 'out.csv']
+        cfg = _reweighted_config()
+        expected = de.assess_frame(de.read_transactions(src), cfg, reasons='mask')
+        pd.testing.assert_frame_equal(de.rescore(acts, cfg), expected)
+
+
+def _custom_config():
+    import copy
+    cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+    cfg['custom_rules'] = [
+        {'name': 'desktop_night_big', 'weight': 3,
+         'when': "amount_mxn >= 3000 and device_type == 'Desktop' and hour in night"},
+        {'name': 'foreign_card', 'weight': 2, 'when': "bin_country not in ['MX'] and bin_country != ip_country"},
+        {'name': 'loyal_low_latency', 'weight': -1, 'when': "customer_txn_30d >= 4 and 0 <= latency_ms < 500"},
+    ]
+    return cfg
+
+
+def _custom_frame(n, seed):
+    import numpy as np
+    df = _random_frame(n, seed)
+    df['device_type'] = np.random.default_rng(seed + 1000).choice(['desktop', 'DESKTOP', 'mobile', 'tablet'], n)
+    return df
+
+
+class TestCustomRules:
+
+    def test_scorers_agree(self):
+        """Test que assess_row, assess_txn y assess_frame aplican igual las reglas custom"""
+        cfg = _custom_config()
+        plan = de.compile_config(cfg)
+        df = _custom_frame(1500, seed=71)
+        expected = _assess_rows(df, cfg)
+        pd.testing.assert_frame_equal(de.assess_frame(df, cfg), expected, check_dtype=False,
+                                      check_categorical=False)
+        for (_, row), exp in zip(df.iterrows(), expected.to_dict('records')):
+            assert de.assess_txn(row.to_dict(), plan) == exp
+        reasons = ';'.join(expected['reasons'])
+        for name in ('desktop_night_big(+3)', 'foreign_card(+2)', 'loyal_low_latency(-1)'):
+            assert f'custom:{name}' in reasons
+
+    def test_custom_rules_before_frequency_buffer(self):
+        """Test que el bono de frecuencia se evalúa con el puntaje que incluye las reglas custom"""
+        cfg = _custom_config()
+        txn = {'user_reputation': 'trusted', 'customer_txn_30d': 3, 'bin_country': 'US', 'ip_country': 'MX'}
+        res = de.assess_txn(txn, de.compile_config(cfg))
+        assert res['reasons'] == ('user_reputation:trusted(-2);geo_mismatch:US!=MX(+2);'
+                                  'custom:foreign_card(+2);frequency_buffer(-1)')
+        assert res['risk_score'] == 1
+
+    def test_mask_decode_and_rescore(self):
+        """Test bit custom en reason_mask, decode_reasons y rescore con pesos custom nuevos"""
+        cfg = _custom_config()
+        df = _custom_frame(1000, seed=72)
+        both = de.assess_frame(df, cfg, reasons='both')
+        for reasons, mask in zip(both['reasons'], both['reason_mask']):
+            assert de.rules_from_mask(int(mask)) == list(dict.fromkeys(de.fired_rules(reasons)))
+        assert de.decode_reasons(df, cfg, both['reason_mask']).tolist() == both['reasons'].tolist()
+
+        acts = de.activation_matrix(df, cfg)
+        reweighted = _custom_config()
+        reweighted['custom_rules'][0]['weight'] = 6
+        del reweighted['custom_rules'][1]
+        expected = de.assess_frame(df, reweighted, reasons='mask').reset_index(drop=True)
+        pd.testing.assert_frame_equal(de.rescore(acts, reweighted), expected)
+        reweighted['custom_rules'][0]['when'] = 'hour in night'
+        with pytest.raises(ValueError, match='custom_rules.desktop_night_big'):
+            de.rescore(acts, reweighted)
+
+    def test_cache_key_covers_custom_rules(self):
+        """Test que feature_key distingue transacciones que solo difieren en campos de reglas custom"""
+        plan = de.compile_config(_custom_config())
+        base = {'amount_mxn': 3000, 'hour': 23}
+        assert de.feature_key(dict(base, device_type='desktop'), plan) != de.feature_key(dict(base, device_type='mobile'), plan)
+
+    def test_validate_config_reports_bad_rules(self):
+        """Test que validate_config rechaza reglas custom mal formadas"""
+        cfg = _custom_config()
+        cfg['custom_rules'].append({'name': 'bad', 'weight': 1, 'when': "__import__('os').system('x')"})
+        with pytest.raises(ValueError, match=r'custom_rules\[3\]\.when'):
+            de.validate_config(cfg)
+        cfg['custom_rules'][3] = {'name': 'foreign_card', 'weight': 1, 'when': 'hour > 1'}
+        with pytest.raises(ValueError, match='used twice'):
+            de.validate_config(cfg)
@@ -0,0 +1,108 @@
+"""
+Tests for the asynchronous decision log (decision_log.py).
+"""
+import asyncio
+import os
+import time
+
+import pytest
+
+import decision_log as dl
+
+
+def test_round_trip_through_background_writer(tmp_path):
+    writer = dl.DecisionLogWriter(str(tmp_path), batch_size=7, flush_interval=0.01).start()
+    for i in range(50):
+        assert writer.log(i if i % 10 else None, "IN_REVIEW" if i % 2 else "ACCEPTED", i % 12,
+                          f"night_hour:{i}(+1)" if i % 2 else "", config_version=3, ts=1_700_000_000 + i)
+    writer.stop()
+    df = dl.read_decision_log(str(tmp_path))
+    assert len(df) == 50
+    assert df["transaction_id"].isna().sum() == 5
+    assert df["transaction_id"].iloc[1] == 1
+    assert df["decision"].iloc[1] == "IN_REVIEW"
+    assert df["reasons"].iloc[1] == "night_hour:1(+1)"
+    assert set(df["config_version"]) == {3}
+    assert str(df["ts"].dtype).startswith("datetime64")
+    assert writer.written == 50
+
+
+def test_full_queue_drops_records(tmp_path):
+    writer = dl.DecisionLogWriter(str(tmp_path), max_queue=3)   # not started: nothing drains
+    results = [writer.log(i, "ACCEPTED", 0, "") for i in range(5)]
+    assert results == [True, True, True, False, False]
+    assert writer.dropped == 2
+    writer.stop()
+    assert len(dl.read_decision_log(str(tmp_path))) == 3
+
+
+def test_block_policy_waits_then_drops(tmp_path):
+    writer = dl.DecisionLogWriter(str(tmp_path), max_queue=1, policy="block", block_timeout=0.001)
+    assert writer.log(1, "ACCEPTED", 0, "")
+    assert not writer.log(2, "ACCEPTED", 0, "")
+    with pytest.raises(ValueError):
+        dl.DecisionLogWriter(str(tmp_path), policy="wait")
+
+
+def test_async_block_policy_yields_to_the_event_loop(tmp_path):
+    """log_async waits for room with asyncio.sleep, so other tasks keep running meanwhile."""
+    writer = dl.DecisionLogWriter(str(tmp_path), max_queue=1, policy="block", block_timeout=0.05)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        assert await writer.log_async(1, "ACCEPTED", 0, "")
+        assert not await writer.log_async(2, "ACCEPTED", 0, "")
+        writer._drain_all()
+        assert await writer.log_async(3, "ACCEPTED", 0, "")
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) > 1
+    assert writer.dropped == 1
+
+
+def test_writer_survives_records_it_cannot_encode(tmp_path):
+    """Ids outside int64 are logged without id; a record that fails to encode is counted and skipped."""
+    writer = dl.DecisionLogWriter(str(tmp_path), flush_interval=0.01).start()
+    assert writer.log(2 ** 63, "ACCEPTED", 0, "")
+    writer.log(1, "ACCEPTED", 10 ** 6, "")   # risk_score does not fit the record
+    writer.log(2, "REJECTED", 100, "")
+    deadline = time.monotonic() + 2
+    while writer.written + writer.errors < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer._thread.is_alive()
+    writer.stop()
+    assert writer.errors == 1
+    ids = dl.read_decision_log(str(tmp_path))["transaction_id"]
+    assert ids.isna().tolist() == [True, False] and ids.iloc[1] == 2
+
+
+def test_rotation_and_retention(tmp_path):
+    writer = dl.DecisionLogWriter(str(tmp_path), batch_size=10, max_file_bytes=200, max_files=3)
+    for i in range(100):
+        writer.log(i, "REJECTED", 100, "hard_block:chargebacks>=2+ip_high")
+        if i % 10 == 9:
+            writer._drain_all()
+    writer.stop()
+    files = dl.log_files(str(tmp_path))
+    assert len(files) == 3
+    df = dl.read_decision_log(files)
+    assert df["transaction_id"].tolist() == list(range(70, 100))
+
+
+def test_reader_ignores_torn_tail(tmp_path):
+    path = tmp_path / "decisions-x.dlog"
+    path.write_bytes(dl.MAGIC + dl.encode([(1.0, 5, 1, "ACCEPTED", 0, "")]) + b"\x20\x00")
+    assert dl.read_decision_log(str(path))["transaction_id"].tolist() == [5]
+    bad = tmp_path / "other.dlog"
+    bad.write_bytes(b"nope")
+    with pytest.raises(ValueError):
+        dl.read_decision_log(str(bad))
@@ -0,0 +1,82 @@
+"""
+Tests for the memory-mapped IP range index (ip_index.py).
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import decision_engine as de
+import ip_index
+
+RANGES = """network,ip_end,country,risk
+203.0.113.0/24,,MX,low
+203.0.113.128/25,,US,high
+198.51.100.10,198.51.100.20,,medium
+2001:db8::/32,,CA,
+2001:db8:1::/48,,,high
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    src = tmp_path / "ranges.csv"
+    src.write_text(RANGES)
+    assert ip_index.build(str(src), str(tmp_path / "ranges.idx")) == (3, 3)
+    return ip_index.IpIndex(str(tmp_path / "ranges.idx"))
+
+
+def test_lookup_ipv4_and_ipv6(index):
+    """The narrowest range wins, separately for the country and the risk."""
+    assert index.lookup("203.0.113.1") == ("MX", "low")
+    assert index.lookup("203.0.113.200") == ("US", "high")
+    assert index.lookup("::ffff:203.0.113.200") == ("US", "high")
+    assert index.lookup("198.51.100.20") == (None, "medium")
+    assert index.lookup("2001:db8::1") == ("CA", None)
+    assert index.lookup("2001:db8:1::5") == ("CA", "high")
+    for ip in ("198.51.100.21", "2001:db9::", "10.0.0.1", "not an ip", "", None):
+        assert index.lookup(ip) == (None, None)
+
+
+def test_lookup_many_matches_lookup(index):
+    """The vectorized lookup agrees with the scalar one, including missing values."""
+    ips = ["203.0.113.1", "2001:db8:1::5", "bogus", None, np.nan, "203.0.113.1", "198.51.100.15", "::1"]
+    countries, risks = index.lookup_many(ips)
+    assert list(zip(countries, risks)) == [index.lookup(ip) for ip in ips]
+
+
+def test_enrich_keeps_the_callers_values_where_the_index_has_none(index):
+    txn = index.enrich({"ip_address": "198.51.100.15", "ip_country": "MX", "ip_risk": "low"})
+    assert (txn["ip_country"], txn["ip_risk"]) == ("MX", "medium")
+    df = pd.DataFrame({"ip_address": ["203.0.113.200", "198.51.100.15", None],
+                       "ip_country": ["MX", "MX", "BR"], "ip_risk": ["low", "low", "high"]})
+    out = index.enrich_frame(df)
+    assert out["ip_country"].tolist() == ["US", "MX", "BR"]
+    assert out["ip_risk"].tolist() == ["high", "medium", "high"]
+
+
+def test_unknown_ips_without_ip_columns_score_like_missing(index, tmp_path):
+    """With no ip_country/ip_risk columns, addresses outside the index get the scorer's defaults."""
+    src = tmp_path / "txns.csv"
+    pd.DataFrame({"transaction_id": [1, 2], "ip_address": ["10.0.0.1", "203.0.113.200"],
+                  "bin_country": ["MX", "MX"]}).to_csv(src, index=False)
+    out = de.run(str(src), str(tmp_path / "out.csv"), enrichers=[index])
+    assert out["reasons"].tolist() == ["", "ip_risk:high(+4);geo_mismatch:MX!=US(+2)"]
+    assert out["ip_country"].tolist() == ["", "US"] and out["ip_risk"].tolist() == ["low", "high"]
+
+
+@pytest.mark.parametrize("row", ["10.0.0.0/8,,MEX,", "10.0.0.9,10.0.0.1,MX,", "10.0.0.0/8,,MX,extreme",
+                                 "10.0.0.0/8,,,", "10.0.0.1,::1,MX,"])
+def test_build_rejects_bad_rows(tmp_path, row):
+    src = tmp_path / "ranges.csv"
+    src.write_text("network,ip_end,country,risk\n" + row + "\n")
+    with pytest.raises(ValueError):
+        ip_index.build(str(src), str(tmp_path / "ranges.idx"))
+
+
+def test_run_resolves_ip_fields(index, tmp_path):
+    """run() scores with the indexed country and risk, also when only the rule columns are loaded."""
+    src = tmp_path / "txns.csv"
+    pd.DataFrame({"transaction_id": [1, 2], "ip_address": ["203.0.113.200", "10.0.0.1"],
+                  "bin_country": ["MX", "MX"], "ip_country": ["MX", "MX"]}).to_csv(src, index=False)
+    out = de.run(str(src), str(tmp_path / "out.csv"), decisions_only=True, enrichers=[index])
+    assert out["reasons"].tolist() == ["ip_risk:high(+4);geo_mismatch:MX!=US(+2)", ""]
@@ -0,0 +1,50 @@
+"""
+Tests for the Prometheus text-format metrics module (metrics.py).
+"""
+import metrics
+
+
+def test_counter_and_gauge_render():
+    reg = metrics.Registry()
+    c = reg.counter("jobs_total", "Jobs done", ["kind"])
+    c.labels(kind="a").inc()
+    c.labels(kind="a").inc(2)
+    c.labels(kind='we"ird').inc()
+    g = reg.gauge("temperature", "Current temperature")
+    g.set(21.5)
+    text = reg.render()
+    assert "# TYPE jobs_total counter" in text
+    assert 'jobs_total{kind="a"} 3' in text
+    assert 'jobs_total{kind="we\\"ird"} 1' in text
+    assert "# TYPE temperature gauge" in text
+    assert "temperature 21.5" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    reg = metrics.Registry()
+    h = reg.histogram("latency_seconds", "Latency", ["stage"], buckets=(0.1, 1.0))
+    child = h.labels(stage="score")
+    for v in (0.05, 0.1, 0.5, 2.0):
+        child.observe(v)
+    text = reg.render()
+    assert 'latency_seconds_bucket{stage="score",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{stage="score",le="1"} 3' in text
+    assert 'latency_seconds_bucket{stage="score",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{stage="score"} 4' in text
+    assert 'latency_seconds_sum{stage="score"} 2.65' in text
+
+
+def test_labels_children_are_reused():
+    reg = metrics.Registry()
+    c = reg.counter("x_total", "x", ["a"])
+    assert c.labels(a="1") is c.labels(a=1)
+
+
+def test_collectors_and_textfile(tmp_path):
+    reg = metrics.Registry()
+    reg.register_collector(lambda: [("queue_depth", "gauge", "Queued items", [({"q": "main"}, 7)])])
+    path = tmp_path / "out.prom"
+    reg.write_textfile(str(path))
+    text = path.read_text()
+    assert 'queue_depth{q="main"} 7' in text
+    assert list(tmp_path.iterdir()) == [path]
@@ -0,0 +1,68 @@
+"""
+Tests for adaptive micro-batching (microbatch.py) and its use by POST /transaction.
+"""
+import asyncio
+import time
+
+import pytest
+
+from microbatch import MicroBatcher
+
+
+def _double(items):
+    time.sleep(0.005)  # long enough for concurrent callers to queue up behind a batch
+    return [i * 2 for i in items]
+
+
+def test_concurrent_submits_are_batched_and_fanned_out():
+    """Every caller gets its own result, with far fewer scoring calls than callers."""
+    batcher = MicroBatcher(_double, max_batch=64, max_wait=0.002)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(200)))
+
+    assert asyncio.run(main()) == [i * 2 for i in range(200)]
+    assert batcher.stats()["items"] == 200
+    assert batcher.stats()["batches"] <= 200 // 64 + 2
+
+
+def test_idle_submit_is_flushed_without_waiting():
+    """A lone request after an idle period does not wait for the window."""
+    batcher = MicroBatcher(lambda items: items, max_batch=64, max_wait=1.0)
+
+    async def main():
+        start = time.perf_counter()
+        assert await batcher.submit("a") == "a"
+        assert await batcher.submit("b") == "b"
+        return time.perf_counter() - start
+
+    assert asyncio.run(main()) < 0.5
+    assert batcher.stats()["batches"] == 2
+
+
+def test_scoring_errors_reach_every_caller():
+    """An exception in score_batch is raised in each waiting caller."""
+    def fail(items):
+        raise RuntimeError("boom")
+    batcher = MicroBatcher(fail)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(main()))
+    with pytest.raises(ValueError):
+        MicroBatcher(fail, max_batch=0)
+
+
+def test_transaction_endpoint_with_microbatching(monkeypatch):
+    """Micro-batched responses match the direct path for both scoring strategies."""
+    from fastapi.testclient import TestClient
+    import app as app_module
+    from tests.test_app import _batch_bodies
+    client = TestClient(app_module.app)
+    expected = [client.post("/transaction", json=b).json() for b in _batch_bodies()]
+    for vector_min in (1, 1000):
+        monkeypatch.setattr(app_module, "MICROBATCH_VECTOR_MIN", vector_min)
+        monkeypatch.setattr(app_module, "MICROBATCH", MicroBatcher(app_module._score_micro_batch))
+        assert [client.post("/transaction", json=b).json() for b in _batch_bodies()] == expected
+    assert "decision_microbatch_size_bucket" in client.get("/metrics").text
@@ -0,0 +1,100 @@
+"""
+Tests for the length-prefixed socket front end (socket_server.py).
+"""
+import asyncio
+import json
+import os
+
+import pytest
+
+import decision_engine as de
+from config_store import ConfigStore
+from socket_server import DecisionClient, DecisionServer, FrameDecoder, FrameError, encode_frame
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "example_request.json")
+
+
+def _bodies(n):
+    with open(EXAMPLE) as fh:
+        base = json.load(fh)
+    return [dict(base, transaction_id=i, hour=i % 24, amount_mxn=float(500 + i * 397 % 9000)) for i in range(n)]
+
+
+def test_decoder_handles_split_and_coalesced_frames():
+    """Frames may arrive split across reads or several per read."""
+    stream = b"".join(encode_frame(p) for p in (b"a", b"", b"hello"))
+    decoder = FrameDecoder()
+    out = []
+    for i in range(len(stream)):
+        out += decoder.feed(stream[i:i + 1])
+    assert out == [b"a", b"", b"hello"]
+    assert FrameDecoder().feed(stream) == [b"a", b"", b"hello"]
+    with pytest.raises(FrameError):
+        FrameDecoder(max_frame=4).feed(encode_frame(b"hello"))
+
+
+@pytest.mark.parametrize("unix", [True, False])
+def test_pipelined_requests_match_assess_txn(tmp_path, unix):
+    """Pipelined responses come back in order and equal the engine's decisions."""
+    store = ConfigStore(de.DEFAULT_CONFIG)
+    bodies = _bodies(300)
+
+    async def main():
+        server = DecisionServer(store)
+        path = str(tmp_path / "decision.sock") if unix else None
+        listener = await server.start(unix=path)
+        port = None if unix else listener.sockets[0].getsockname()[1]
+        client = await DecisionClient.connect(unix=path, port=port)
+        try:
+            return await client.score_many(bodies, window=32)
+        finally:
+            await client.close()
+            listener.close()
+
+    results = asyncio.run(main())
+    plan = store.active.plan
+    assert results == [{"transaction_id": b["transaction_id"], **de.assess_txn(b, plan)} for b in bodies]
+
+
+def test_bad_frames_get_error_responses(tmp_path):
+    """Undecodable or invalid frames are answered in place without dropping the connection."""
+    server = DecisionServer(ConfigStore(de.DEFAULT_CONFIG))
+
+    async def main():
+        path = str(tmp_path / "decision.sock")
+        listener = await server.start(unix=path)
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(encode_frame(b"{nope") + encode_frame(b"[1, 2]")
+                     + encode_frame(b'{"transaction_id": 4, "hour": "late"}') + encode_frame(b'{"hour": 23}'))
+        client = DecisionClient(reader, writer)
+        out = [await client._next() for _ in range(4)]
+        await client.close()
+        listener.close()
+        return out
+
+    bad_json, not_object, bad_hour, ok = asyncio.run(main())
+    assert "error" in bad_json and "error" in not_object
+    assert bad_hour["transaction_id"] == 4 and bad_hour["error"].startswith("ValueError")
+    assert ok == {"transaction_id": None, "decision": "ACCEPTED", "risk_score": 1, "reasons": "night_hour:23(+1)"}
+
+
+def test_partial_payloads_score_like_http(tmp_path):
+    """Missing fields take the same defaults as POST /transaction."""
+    from fastapi.testclient import TestClient
+    from app import app as fastapi_app
+    bodies = [{"amount_mxn": 3000, "bin_country": "US"}, {"hour": 2, "user_reputation": "trusted"}, {}]
+    server = DecisionServer(ConfigStore(de.DEFAULT_CONFIG))
+
+    async def main():
+        path = str(tmp_path / "decision.sock")
+        listener = await server.start(unix=path)
+        client = await DecisionClient.connect(unix=path)
+        try:
+            return await client.score_many(bodies)
+        finally:
+            await client.close()
+            listener.close()
+
+    http = TestClient(fastapi_app)
+    assert asyncio.run(main()) == [http.post("/transaction", json=b).json() for b in bodies]
+    assert http.post("/transaction", json=bodies[0]).json()["decision"] == "IN_REVIEW"
@@ -0,0 +1,74 @@
+"""
+Tests for the threshold-sweep simulator (threshold_sweep.py).
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+import decision_engine as de
+import threshold_sweep as ts
+from tests.test_decision_engine import _random_frame
+
+
+def _rescored(df, review_at, reject_at):
+    cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+    cfg["score_to_decision"] = {"review_at": review_at, "reject_at": reject_at}
+    return de.assess_frame(df, cfg)["decision"].value_counts()
+
+
+def test_sweep_matches_full_rescoring():
+    """Every grid point matches re-running assess_frame with those thresholds."""
+    df = _random_frame(3000, seed=31)
+    result = ts.simulate(df, range(0, 9), range(2, 13))
+    assert len(result) == sum(1 for r in range(0, 9) for j in range(2, 13) if r <= j)
+    for review_at, reject_at in [(0, 2), (3, 6), (4, 9), (8, 12)]:
+        row = result[(result.review_at == review_at) & (result.reject_at == reject_at)].iloc[0]
+        counts = _rescored(df, review_at, reject_at)
+        assert row["accepted"] == counts.get("ACCEPTED", 0)
+        assert row["in_review"] == counts.get("IN_REVIEW", 0)
+        assert row["rejected"] == counts.get("REJECTED", 0)
+    assert np.allclose(result[["accepted_rate", "in_review_rate", "rejected_rate"]].sum(axis=1), 1.0)
+
+
+def test_hard_blocked_rows_always_rejected():
+    """Hard-blocked rows stay REJECTED even when reject_at is out of reach."""
+    df = pd.DataFrame({"chargeback_count": [3, 0], "ip_risk": ["high", "low"], "hour": [12, 12]})
+    result = ts.simulate(df, [50], [60])
+    assert result[["accepted", "in_review", "rejected"]].iloc[0].tolist() == [1, 0, 1]
+
+
+def test_fraud_hit_rates():
+    """With an is_fraud column each point reports fraud capture and reject precision."""
+    df = _random_frame(2000, seed=32)
+    scored = de.assess_frame(df, de.DEFAULT_CONFIG)
+    df["is_fraud"] = (scored["risk_score"] >= 6).astype(int).to_numpy()
+    row = ts.simulate(df, [3], [6]).iloc[0]
+    assert row["fraud_rejected_rate"] == 1.0
+    assert row["fraud_flagged_rate"] == 1.0
+    rejected = scored["decision"] == "REJECTED"
+    assert row["reject_precision"] == df.loc[rejected.to_numpy(), "is_fraud"].mean()
+    assert "fraud_rejected_rate" not in ts.simulate(df.drop(columns="is_fraud"), [3], [6]).columns
+
+
+def test_missing_labels_are_left_out():
+    """NaN labels are unknown: they count neither as fraud nor in the precision."""
+    scored = pd.DataFrame({"risk_score": [12, 12, 12, 2], "reasons": ["", "", "", ""]})
+    row = ts.sweep(ts.build_histogram(scored, [np.nan, np.nan, 1, np.nan]), [4], [10]).iloc[0]
+    assert row["fraud_rejected_rate"] == 1.0
+    assert row["reject_precision"] == 1.0
+    row = ts.sweep(ts.build_histogram(scored, [0, np.nan, 1, np.nan]), [4], [10]).iloc[0]
+    assert row["reject_precision"] == 0.5
+    assert row["rejected"] == 3
+
+
+def test_scored_input_is_not_rescored(tmp_path):
+    """A decisions file from run() is swept from its risk_score/reasons columns."""
+    df = _random_frame(500, seed=33)
+    src, out = str(tmp_path / "in.csv"), str(tmp_path / "decisions.csv")
+    df.to_csv(src, index=False)
+    decisions = de.run(src, out, decisions_only=True)
+    from_file = ts.simulate(pd.read_csv(out), range(2, 6), range(4, 10))
+    assert from_file.equals(ts.simulate(decisions, range(2, 6), range(4, 10)))
+    ts.main(["--input", out, "--review", "2:5", "--reject", "4,6,8", "--output", str(tmp_path / "sweep.csv")])
+    assert len(pd.read_csv(str(tmp_path / "sweep.csv"))) == 11
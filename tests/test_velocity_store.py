@@ -0,0 +1,96 @@
+"""
+Tests for the sliding-window velocity store (velocity_store.py) and the velocity_burst rule.
+"""
+import copy
+
+import pandas as pd
+
+import decision_engine as de
+from velocity_store import VelocityStore
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_counts_expire_with_the_window():
+    clock = FakeClock()
+    store = VelocityStore(clock=clock)
+    for _ in range(3):
+        store.record({"ip_address": "10.0.0.1"})
+    assert store.count("ip_address", "10.0.0.1") == 3
+    clock.now += 30 * 60
+    store.record({"ip_address": "10.0.0.1"})
+    assert store.count("ip_address", "10.0.0.1") == 4
+    clock.now += 45 * 60          # the first three are now older than an hour
+    assert store.count("ip_address", "10.0.0.1") == 1
+    clock.now += 10 * 3600
+    assert store.count("ip_address", "10.0.0.1") == 0
+
+
+def test_features_and_enrich():
+    clock = FakeClock()
+    store = VelocityStore(clock=clock)
+    txn = {"customer_id": "c1", "card_bin": "411111", "ip_address": "1.2.3.4", "device_id": "d1"}
+    for _ in range(4):
+        store.record(dict(txn))
+    store.record({"device_id": "d1"})
+    store.record_chargeback("c1")
+    feats = store.features(txn)
+    assert feats == {"customer_txn_30d": 4, "chargeback_count": 1, "velocity_1h": 5}
+    enriched = store.enrich(dict(txn, customer_txn_30d=10, chargeback_count=0))
+    assert enriched["customer_txn_30d"] == 10      # caller history kept when higher
+    assert enriched["chargeback_count"] == 1
+    assert enriched["velocity_1h"] == 5
+    # Transactions without keys contribute nothing
+    assert store.features({}) == {"customer_txn_30d": 0, "chargeback_count": 0, "velocity_1h": 0}
+
+
+def test_key_limit_evicts_least_recent():
+    store = VelocityStore(max_keys=2, clock=FakeClock())
+    store.record({"ip_address": "a"})
+    store.record({"ip_address": "b"})
+    store.record({"ip_address": "a"})
+    store.record({"ip_address": "c"})
+    assert store.count("ip_address", "b") == 0
+    assert store.count("ip_address", "a") == 2
+    assert store.stats()["evictions"] == 1
+
+
+def test_snapshot_round_trip(tmp_path):
+    clock = FakeClock()
+    store = VelocityStore(clock=clock)
+    store.record({"customer_id": "c1", "ip_address": "1.1.1.1"})
+    store.record_chargeback("c1")
+    path = str(tmp_path / "velocity.json")
+    store.snapshot(path)
+    restored = VelocityStore.load(path, clock=clock)
+    assert restored.features({"customer_id": "c1", "ip_address": "1.1.1.1"}) == \
+        store.features({"customer_id": "c1", "ip_address": "1.1.1.1"})
+    clock.now += 2 * 3600
+    assert restored.count("ip_address", "1.1.1.1") == 0
+    assert restored.count("customer", "c1") == 1
+
+
+def test_velocity_burst_rule_in_all_scorers():
+    cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+    cfg["velocity_burst_1h"] = 5
+    row = {"velocity_1h": 6}
+    expected = de.assess_row(pd.Series(row), cfg)
+    assert "velocity_burst:6/1h(+2)" in expected["reasons"]
+    assert de.assess_txn(row, de.compile_config(cfg)) == expected
+    assert de.assess_frame(pd.DataFrame([row]), cfg).iloc[0].to_dict() == expected
+
+
+def test_configs_without_velocity_keys_still_score():
+    cfg = copy.deepcopy(de.DEFAULT_CONFIG)
+    cfg.pop("velocity_burst_1h")
+    cfg["score_weights"].pop("velocity_burst")
+    de.validate_config(cfg)
+    row = {"velocity_1h": 100}
+    assert de.assess_txn(row, de.compile_config(cfg))["reasons"] == ""
+    assert de.assess_row(pd.Series(row), cfg)["reasons"] == ""
@@ -0,0 +1,147 @@
+"""
+Threshold-sweep simulator for score_to_decision.
+
+review_at and reject_at only change how a risk score maps to a decision, so the
+history is scored once and reduced to a histogram of scores. The decision mix for
+any (review_at, reject_at) pair is then a lookup in the cumulative histogram, and
+a whole grid of pairs takes milliseconds. Hard-blocked rows are REJECTED whatever
+the thresholds. If the input has a fraud label column, each point also reports
+how much of the fraud is rejected or flagged. Missing labels (NaN, e.g. outcomes
+not known yet) count as unlabeled and are left out of the fraud figures.
+
+    python threshold_sweep.py --input history.csv --review 2:8 --reject 4:14 --output sweep.csv
+"""
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import decision_engine as de
+
+LABEL_COLUMN = "is_fraud"
+
+
+@dataclass(frozen=True)
+class ScoreHistogram:
+    min_score: int
+    counts: np.ndarray          # rows per score, counts[i] <-> score min_score + i
+    fraud: Optional[np.ndarray]  # labeled fraud per score, None without labels
+    hard_block: int
+    hard_block_fraud: int
+    labeled: Optional[np.ndarray] = None  # rows with a known label per score
+    hard_block_labeled: int = 0
+
+    @property
+    def rows(self) -> int:
+        return int(self.counts.sum()) + self.hard_block
+
+    def at_or_above(self, thresholds: np.ndarray, fraud: bool = False, labeled: bool = False) -> np.ndarray:
+        # Rows (or fraud rows, or labeled rows) whose score is >= each threshold
+        counts = self.fraud if fraud else self.labeled if labeled else self.counts
+        suffix = np.concatenate([np.cumsum(counts[::-1])[::-1], [0]])
+        idx = np.clip(np.asarray(thresholds, dtype=np.int64) - self.min_score, 0, len(counts))
+        return suffix[idx]
+
+
+def build_histogram(scored: pd.DataFrame, labels: Optional[Iterable[Any]] = None) -> ScoreHistogram:
+    """Histogram of scored["risk_score"], keeping hard-blocked rows apart.
+
+    scored is assess_frame output (or a decisions file with risk_score and reasons or reason_mask).
+    """
+    if "reason_mask" in scored.columns:
+        blocked = (scored["reason_mask"].to_numpy() & de.RULE_BITS["hard_block"]) != 0
+    elif "reasons" in scored.columns:
+        blocked = scored["reasons"].fillna("").astype(str).str.startswith(de.HARD_BLOCK_REASON).to_numpy()
+    else:
+        blocked = np.zeros(len(scored), dtype=bool)
+    score = scored["risk_score"].to_numpy(dtype=np.int64)[~blocked]
+    min_score = int(score.min()) if len(score) else 0
+    counts = np.bincount(score - min_score) if len(score) else np.zeros(1, dtype=np.int64)
+    if labels is None:
+        return ScoreHistogram(min_score, counts.astype(np.int64), None, int(blocked.sum()), 0)
+    y = pd.Series(labels).astype(np.float64).to_numpy()
+    known = ~np.isnan(y)
+    is_fraud = known & (y != 0)
+
+    def per_score(flags: np.ndarray) -> np.ndarray:
+        return np.bincount(score - min_score, weights=flags[~blocked], minlength=len(counts)).astype(np.int64)
+
+    return ScoreHistogram(min_score, counts.astype(np.int64), per_score(is_fraud), int(blocked.sum()),
+                          int(is_fraud[blocked].sum()), per_score(known), int(known[blocked].sum()))
+
+
+def sweep(hist: ScoreHistogram, review_at: Iterable[int], reject_at: Iterable[int]) -> pd.DataFrame:
+    """Decision distribution for every review_at <= reject_at pair of the grid."""
+    review, reject = np.meshgrid(np.asarray(list(review_at), dtype=np.int64),
+                                 np.asarray(list(reject_at), dtype=np.int64), indexing="ij")
+    keep = review <= reject
+    review, reject = review[keep], reject[keep]
+    rows = max(hist.rows, 1)
+    rejected = hist.at_or_above(reject) + hist.hard_block
+    in_review = hist.at_or_above(review) - hist.at_or_above(reject)
+    out = pd.DataFrame({
+        "review_at": review,
+        "reject_at": reject,
+        "accepted": hist.rows - rejected - in_review,
+        "in_review": in_review,
+        "rejected": rejected,
+    })
+    for col in (de.DECISION_ACCEPTED, de.DECISION_IN_REVIEW, de.DECISION_REJECTED):
+        out[col.lower() + "_rate"] = out[col.lower()] / rows
+    if hist.fraud is not None:
+        total_fraud = max(int(hist.fraud.sum()) + hist.hard_block_fraud, 1)
+        fraud_rejected = hist.at_or_above(reject, fraud=True) + hist.hard_block_fraud
+        fraud_flagged = hist.at_or_above(review, fraud=True) + hist.hard_block_fraud
+        out["fraud_rejected_rate"] = fraud_rejected / total_fraud
+        out["fraud_flagged_rate"] = fraud_flagged / total_fraud
+        labeled_rejected = hist.at_or_above(reject, labeled=True) + hist.hard_block_labeled
+        out["reject_precision"] = np.divide(fraud_rejected, labeled_rejected, out=np.zeros(len(out)),
+                                            where=labeled_rejected > 0)
+    return out
+
+
+def simulate(df: pd.DataFrame, review_at: Iterable[int], reject_at: Iterable[int],
+             config: Dict[str, Any] = None, label_column: str = LABEL_COLUMN) -> pd.DataFrame:
+    """Score df once (unless it already has risk_score) and sweep the threshold grid."""
+    scored = df if "risk_score" in df.columns else de.assess_frame(df, config or de.DEFAULT_CONFIG, reasons="mask")
+    labels = df[label_column].to_numpy() if label_column in df.columns else None
+    return sweep(build_histogram(scored, labels), review_at, reject_at)
+
+
+def _grid(spec: str) -> List[int]:
+    # "2:8" (inclusive range) or "2,4,6"
+    if ":" in spec:
+        start, stop = spec.split(":", 1)
+        return list(range(int(start), int(stop) + 1))
+    return [int(v) for v in spec.split(",") if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Decision mix for a grid of review_at/reject_at thresholds")
+    ap.add_argument("--input", required=True, help="Transactions (CSV, Parquet or Arrow), or a decisions file from run()")
+    ap.add_argument("--review", default="1:10", help="review_at values, e.g. 2:8 or 2,4,6")
+    ap.add_argument("--reject", default="1:15", help="reject_at values, e.g. 4:14")
+    ap.add_argument("--config", default=None, help="JSON config whose weights are used for scoring")
+    ap.add_argument("--label", default=LABEL_COLUMN, help="Column with the fraud outcome (1/0), if present")
+    ap.add_argument("--output", default=None, help="Write the sweep here as CSV instead of printing it")
+    args = ap.parse_args(argv)
+    config = None
+    if args.config:
+        with open(args.config) as fh:
+            config = json.load(fh)
+        de.validate_config(config)
+    df = de.read_transactions(args.input)
+    result = simulate(df, _grid(args.review), _grid(args.reject), config, args.label)
+    if args.output:
+        result.to_csv(args.output, index=False)
+        print(f"Wrote {len(result)} threshold pairs to {args.output}", file=sys.stderr)
+    else:
+        print(result.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+
+if __name__ == "__main__":
+    main()
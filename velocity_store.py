@@ -0,0 +1,172 @@
+"""
+In-memory sliding-window velocity counters for the decision API.
+
+Each (dimension, key) pair, e.g. ("ip_address", "203.0.113.7"), owns a ring of
+time buckets. Recording and querying are O(1): buckets that fell out of the window
+are cleared lazily when the ring is next touched. Every dimension keeps at most
+`max_keys` keys; the least recently updated key is evicted first. The whole store
+can be snapshotted to a local file and reloaded for warm restarts.
+"""
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+import orjson
+
+
+@dataclass(frozen=True)
+class Window:
+    buckets: int
+    bucket_seconds: int
+
+    @property
+    def seconds(self) -> int:
+        return self.buckets * self.bucket_seconds
+
+
+# dimension -> (transaction field holding its key, window)
+DIMENSIONS: Dict[str, tuple] = {
+    "customer": ("customer_id", Window(30, 86_400)),          # customer_txn_30d
+    "customer_chargeback": ("customer_id", Window(18, 5 * 86_400)),  # chargebacks over 90 days
+    "card_bin": ("card_bin", Window(12, 300)),                 # 1 hour in 5 minute buckets
+    "ip_address": ("ip_address", Window(12, 300)),
+    "device_id": ("device_id", Window(12, 300)),
+}
+# Dimensions fed by every scored transaction and summarized as velocity_1h
+BURST_DIMENSIONS = ("card_bin", "ip_address", "device_id")
+
+
+class _Ring:
+    __slots__ = ("head", "total", "counts")
+
+    def __init__(self, buckets: int, head: int):
+        self.head = head  # absolute index of the newest bucket
+        self.total = 0
+        self.counts = array("I", bytes(4 * buckets))
+
+    def advance(self, now_bucket: int) -> None:
+        n = len(self.counts)
+        gap = now_bucket - self.head
+        if gap <= 0:
+            return
+        if gap >= n:
+            self.counts = array("I", bytes(4 * n))
+            self.total = 0
+        else:
+            for b in range(self.head + 1, now_bucket + 1):
+                i = b % n
+                self.total -= self.counts[i]
+                self.counts[i] = 0
+        self.head = now_bucket
+
+
+class VelocityStore:
+    def __init__(self, max_keys: int = 200_000, clock: Callable[[], float] = time.time,
+                 dimensions: Optional[Dict[str, tuple]] = None):
+        self.max_keys = max_keys
+        self.clock = clock
+        self.dimensions = dimensions or DIMENSIONS
+        self._rings: Dict[str, "OrderedDict[str, _Ring]"] = {d: OrderedDict() for d in self.dimensions}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _bucket(self, dimension: str, now: float) -> int:
+        return int(now // self.dimensions[dimension][1].bucket_seconds)
+
+    def _add(self, dimension: str, key: Any, now: float, amount: int = 1) -> None:
+        if key is None or key == "":
+            return
+        key = str(key)
+        rings = self._rings[dimension]
+        bucket = self._bucket(dimension, now)
+        ring = rings.get(key)
+        if ring is None:
+            ring = rings[key] = _Ring(self.dimensions[dimension][1].buckets, bucket)
+            if len(rings) > self.max_keys:
+                rings.popitem(last=False)
+                self.evictions += 1
+        else:
+            rings.move_to_end(key)
+        ring.advance(bucket)
+        ring.counts[bucket % len(ring.counts)] += amount
+        ring.total += amount
+
+    def count(self, dimension: str, key: Any, now: Optional[float] = None) -> int:
+        if key is None or key == "":
+            return 0
+        now = self.clock() if now is None else now
+        with self._lock:
+            ring = self._rings[dimension].get(str(key))
+            if ring is None:
+                return 0
+            ring.advance(self._bucket(dimension, now))
+            return ring.total
+
+    def record(self, txn: Dict[str, Any], now: Optional[float] = None) -> None:
+        """Count one scored transaction against every dimension whose key it carries."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            for dimension, (field, _) in self.dimensions.items():
+                if dimension != "customer_chargeback":
+                    self._add(dimension, txn.get(field), now)
+
+    def record_chargeback(self, customer_id: str, now: Optional[float] = None) -> None:
+        now = self.clock() if now is None else now
+        with self._lock:
+            self._add("customer_chargeback", customer_id, now)
+
+    def features(self, txn: Dict[str, Any], now: Optional[float] = None) -> Dict[str, int]:
+        """Velocity inputs for the rules, from the history before this transaction."""
+        now = self.clock() if now is None else now
+        customer = txn.get("customer_id")
+        return {
+            "customer_txn_30d": self.count("customer", customer, now),
+            "chargeback_count": self.count("customer_chargeback", customer, now),
+            "velocity_1h": max(self.count(d, txn.get(self.dimensions[d][0]), now) for d in BURST_DIMENSIONS),
+        }
+
+    def enrich(self, txn: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+        # Caller-supplied counts are kept when they are higher (history from before this store)
+        feats = self.features(txn, now)
+        txn["customer_txn_30d"] = max(int(txn.get("customer_txn_30d") or 0), feats["customer_txn_30d"])
+        txn["chargeback_count"] = max(int(txn.get("chargeback_count") or 0), feats["chargeback_count"])
+        txn["velocity_1h"] = feats["velocity_1h"]
+        return txn
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"keys": {d: len(r) for d, r in self._rings.items()}, "evictions": self.evictions}
+
+    # --- Snapshots ---
+
+    def snapshot(self, path: str) -> None:
+        with self._lock:
+            data = {d: [[k, r.head, r.total, list(r.counts)] for k, r in rings.items()]
+                    for d, rings in self._rings.items()}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(orjson.dumps({"version": 1, "saved_at": self.clock(), "dimensions": data}))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "VelocityStore":
+        store = cls(**kwargs)
+        with open(path, "rb") as fh:
+            data = orjson.loads(fh.read())
+        for dimension, entries in data["dimensions"].items():
+            if dimension not in store.dimensions:
+                continue
+            buckets = store.dimensions[dimension][1].buckets
+            rings = store._rings[dimension]
+            for key, head, total, counts in entries[-store.max_keys:]:
+                if len(counts) != buckets:
+                    continue  # window shape changed since the snapshot
+                ring = _Ring(buckets, head)
+                ring.counts = array("I", counts)
+                ring.total = total
+                rings[key] = ring
+        return store